@@ -0,0 +1,469 @@
+"""
+Seleção de modelos mais rápida para o Desafio de atrasos de voos
+UC03 - Atividade 3 (Desafio - Previsão de Atrasos de Aeronaves)
+
+O notebook compara Regressão Logística, Árvore de Decisão e XGBoost e
+ajusta o XGBoost com GridSearchCV: 144 combinações x 3 folds, n_jobs=-1.
+Cada ajuste reconverte o DataFrame, n_estimators triplica a grade mesmo
+para combinações que já vão mal com 50 árvores, e os processos do
+GridSearchCV somados às threads do XGBoost disputam os mesmos núcleos.
+Aqui:
+
+- os dados são codificados (get_dummies) e divididos em folds uma única
+  vez; com mais de um processo, matriz, rótulos e folds vão para memória
+  compartilhada e cada worker monta seus DMatrix a partir dela;
+- n_estimators vira o orçamento do successive halving: todas as
+  combinações treinam com o menor orçamento e só a melhor fração (1/eta)
+  passa para o próximo;
+- early stopping na logloss de validação de cada fold tira da disputa as
+  combinações que já estão sobreajustando;
+- processos x threads do XGBoost nunca passam do número de CPUs.
+
+O vencedor segue a regra do GridSearchCV (maior F1 médio; empate fica com
+a primeira combinação da grade), mas só entre as combinações que chegaram
+ao fim do orçamento: diferente do GridSearchCV, uma combinação parada pelo
+early stopping sai sem nota e não pode vencer, mesmo que o F1 na sua
+melhor iteração fosse o maior (esse modelo, com menos árvores, não é um
+ponto da grade). Com --eta 1 --paciencia 0 nada é descartado e as notas
+são as da busca exaustiva. O comando 'comparar'
+roda também o GridSearchCV do notebook, confere o vencedor e mede o tempo.
+
+Uso:
+    python selecao_modelos.py selecionar
+    python selecao_modelos.py --processos 4 --eta 3 --paciencia 30 selecionar
+    python selecao_modelos.py comparar
+"""
+
+import argparse
+import math
+import multiprocessing as mp
+import os
+import time
+import warnings
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, ParameterGrid, StratifiedKFold, cross_val_score, train_test_split
+from sklearn.tree import DecisionTreeClassifier
+from xgboost import XGBClassifier
+
+RANDOM_STATE = 42
+ARQUIVO_DADOS = 'flights_delays_120 1.csv'
+TARGET = 'delayed'
+
+# Grade da seção "Ajuste de Hiperparâmetros (HPO)" do notebook
+PARAM_GRID = {
+    'max_depth': [3, 4, 6, 8],
+    'learning_rate': [0.01, 0.1, 0.2],
+    'n_estimators': [50, 100, 200],
+    'subsample': [0.8, 1.0],
+    'colsample_bytree': [0.8, 1.0]
+}
+
+
+def preparar_dados(caminho=ARQUIVO_DADOS):
+    """
+    Codificação e divisões do notebook, feitas uma única vez
+
+    Returns:
+        tuple: (X_train_val, y_train_val, X_test, y_test), na mesma ordem de
+            linhas que o notebook passa ao GridSearchCV
+    """
+    df = pd.read_csv(caminho, dtype={TARGET: 'int64'})
+    X_encoded = pd.get_dummies(df.drop(TARGET, axis=1), drop_first=True)
+    y = df[TARGET]
+
+    X_temp, X_test, y_temp, y_test = train_test_split(
+        X_encoded, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y)
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_temp, y_temp, test_size=0.25, random_state=RANDOM_STATE, stratify=y_temp)
+
+    return pd.concat([X_train, X_val]), pd.concat([y_train, y_val]), X_test, y_test
+
+
+def gerar_folds(y, cv=3):
+    """
+    Fold de validação de cada linha, os mesmos do GridSearchCV(cv=3)
+
+    Returns:
+        numpy.ndarray: int8 com valores de 0 a cv-1
+    """
+    folds = np.empty(len(y), dtype=np.int8)
+    for i, (_, validacao) in enumerate(StratifiedKFold(cv).split(np.zeros(len(y)), y)):
+        folds[validacao] = i
+    return folds
+
+
+def divisoes(folds):
+    """
+    Pares (treino, validação) de índices, no formato aceito por cv=
+    """
+    return [(np.flatnonzero(folds != i), np.flatnonzero(folds == i))
+            for i in range(int(folds.max()) + 1)]
+
+
+def planejar_paralelismo(processos=None, tarefas=None):
+    """
+    Divide as CPUs entre processos e threads do XGBoost
+
+    Args:
+        processos (int): Processos desejados (padrão: número de CPUs)
+        tarefas (int): Máximo de tarefas simultâneas úteis
+
+    Returns:
+        tuple: (processos, threads por processo)
+    """
+    cpus = os.cpu_count() or 1
+    processos = max(1, min(processos or cpus, cpus, tarefas or cpus))
+    return processos, max(1, cpus // processos)
+
+
+class FoldsCompartilhados:
+    """
+    Arrays NumPy em blocos de memória compartilhada entre processos
+    """
+
+    def __init__(self, arrays, blocos, dono):
+        self.arrays = arrays
+        self._blocos = blocos
+        self._dono = dono
+
+    @classmethod
+    def criar(cls, **arrays):
+        """
+        Copia os arrays para blocos novos (processo principal)
+        """
+        copias, blocos = {}, {}
+        for nome, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            bloco = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            copias[nome] = np.ndarray(array.shape, dtype=array.dtype, buffer=bloco.buf)
+            copias[nome][...] = array
+            blocos[nome] = bloco
+        return cls(copias, blocos, dono=True)
+
+    def descritor(self):
+        """
+        {nome: (bloco, forma, dtype)} para anexar em outro processo
+        """
+        return {nome: (self._blocos[nome].name, array.shape, array.dtype.str)
+                for nome, array in self.arrays.items()}
+
+    @classmethod
+    def anexar(cls, descritor):
+        """
+        Abre os blocos criados pelo processo principal, sem copiar
+        """
+        arrays, blocos = {}, {}
+        for nome, (bloco, forma, dtype) in descritor.items():
+            blocos[nome] = shared_memory.SharedMemory(name=bloco)
+            arrays[nome] = np.ndarray(forma, dtype=np.dtype(dtype), buffer=blocos[nome].buf)
+        return cls(arrays, blocos, dono=False)
+
+    def fechar(self):
+        """
+        Solta as views e fecha os blocos; o dono também os remove
+        """
+        self.arrays = {}
+        for bloco in self._blocos.values():
+            bloco.close()
+            if self._dono:
+                bloco.unlink()
+        self._blocos = {}
+
+
+def _f1(y, predito):
+    # Mesma conta de sklearn.metrics.f1_score (pos_label=1, zero_division=0)
+    vp = np.count_nonzero(predito & y)
+    denominador = 2 * vp + np.count_nonzero(predito & ~y) + np.count_nonzero(~predito & y)
+    return 2 * vp / denominador if denominador else 0.0
+
+
+class TreinadorFolds:
+    """
+    Treino e avaliação de uma combinação nos folds compartilhados
+    """
+
+    def __init__(self, X, y, folds, nthread=1, paciencia=None):
+        """
+        Args:
+            X (numpy.ndarray): Matriz codificada (float32)
+            y (numpy.ndarray): Alvo binário
+            folds (numpy.ndarray): Fold de validação de cada linha
+            nthread (int): Threads do XGBoost neste processo
+            paciencia (int): Rodadas sem melhora da logloss de validação de
+                um fold até parar a combinação (None ou 0 = sem early stopping)
+        """
+        self.nthread = nthread
+        self.paciencia = paciencia
+        self.dados = []
+        for treino, validacao in divisoes(folds):
+            self.dados.append((xgb.DMatrix(X[treino], label=y[treino], nthread=nthread),
+                               xgb.DMatrix(X[validacao], label=y[validacao], nthread=nthread),
+                               X[validacao], y[validacao].astype(bool)))
+
+    def avaliar(self, indice, params, alvo):
+        """
+        Treina a combinação com `alvo` árvores em cada fold e calcula o F1
+
+        Cada Booster é treinado do início ao fim sem outro no meio: o gerador
+        aleatório do XGBoost é global, então retomar um Booster depois de
+        treinar outros muda a amostragem (subsample) e o modelo deixa de ser
+        o mesmo do XGBClassifier usado no GridSearchCV.
+
+        Returns:
+            tuple: (indice, [F1 de cada fold] ou None se algum fold parou
+                antes de `alvo`, rodadas treinadas somando os folds)
+        """
+        parametros = dict(params, objective='binary:logistic', eval_metric='logloss',
+                          random_state=RANDOM_STATE, nthread=self.nthread)
+        notas, feitas = [], 0
+        for treino, validacao, X_val, y_val in self.dados:
+            booster = xgb.Booster(parametros, [treino])
+            perdas = []
+            for rodada in range(alvo):
+                booster.update(treino, rodada)
+                feitas += 1
+                if self.paciencia:
+                    perdas.append(float(booster.eval(validacao).rsplit(':', 1)[1]))
+                    if rodada - int(np.argmin(perdas)) >= self.paciencia:
+                        return indice, None, feitas
+            notas.append(_f1(y_val, booster.inplace_predict(X_val) > 0.5))
+        return indice, notas, feitas
+
+
+_treinador = None
+
+
+def _inicializar_worker(descritor, nthread, paciencia):
+    global _treinador
+    warnings.filterwarnings('ignore', category=UserWarning)
+    compartilhados = FoldsCompartilhados.anexar(descritor)
+    arrays = compartilhados.arrays
+    _treinador = TreinadorFolds(arrays['X'], arrays['y'], arrays['folds'], nthread, paciencia)
+    compartilhados.fechar()
+
+
+def _avaliar(tarefa):
+    return _treinador.avaliar(*tarefa)
+
+
+def successive_halving(X, y, folds, param_grid=PARAM_GRID, recurso='n_estimators', eta=3,
+                       paciencia=30, processos=None):
+    """
+    Busca da grade com successive halving sobre o número de árvores
+
+    Args:
+        X (numpy.ndarray): Matriz codificada
+        y (numpy.ndarray): Alvo binário
+        folds (numpy.ndarray): Saída de gerar_folds
+        param_grid (dict): Grade no formato do GridSearchCV
+        recurso (str): Hiperparâmetro usado como orçamento
+        eta (int): Fração mantida em cada nível é 1/eta (1 = sem descarte)
+        paciencia (int): Early stopping na logloss de validação (0 = desligado)
+        processos (int): Processos de treino (padrão: número de CPUs)
+
+    Returns:
+        dict: best_params, best_score, best_index (na ordem de ParameterGrid),
+            notas {indice na grade: F1 médio}, niveis, rodadas e paralelismo
+
+    Raises:
+        ValueError: Se o early stopping parou todas as combinações
+    """
+    grade = list(ParameterGrid(param_grid))
+    orcamentos = sorted(param_grid[recurso])
+
+    # Combinações sem o recurso e a posição de cada (combinação, orçamento) na grade
+    combinacoes, indices, posicao = [], {}, {}
+    for indice_grade, params in enumerate(grade):
+        chave = tuple((nome, valor) for nome, valor in params.items() if nome != recurso)
+        if chave not in indices:
+            indices[chave] = len(combinacoes)
+            combinacoes.append(dict(chave))
+        posicao[(indices[chave], params[recurso])] = indice_grade
+
+    processos, nthread = planejar_paralelismo(processos, len(combinacoes))
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+
+    if processos == 1:
+        treinador = TreinadorFolds(X, y, folds, nthread, paciencia)
+        compartilhados = pool = None
+        avaliar = lambda tarefas: [treinador.avaliar(*tarefa) for tarefa in tarefas]
+    else:
+        compartilhados = FoldsCompartilhados.criar(X=X, y=y, folds=folds)
+        pool = mp.get_context('spawn').Pool(
+            processos, initializer=_inicializar_worker,
+            initargs=(compartilhados.descritor(), nthread, paciencia))
+        avaliar = lambda tarefas: pool.map(_avaliar, tarefas)
+
+    notas, niveis, rodadas = {}, [], 0
+    vivas = list(range(len(combinacoes)))
+    try:
+        for orcamento in orcamentos:
+            respostas = avaliar([(c, combinacoes[c], orcamento) for c in vivas])
+
+            medias = {}
+            for c, notas_folds, feitas in respostas:
+                rodadas += feitas
+                if notas_folds is not None:
+                    medias[c] = float(np.mean(notas_folds))
+                    notas[posicao[(c, orcamento)]] = medias[c]
+
+            ordenadas = sorted(medias, key=lambda c: (-medias[c], posicao[(c, orcamento)]))
+            niveis.append({'orcamento': orcamento, 'combinacoes': len(vivas),
+                           'paradas': len(vivas) - len(medias)})
+            vivas = ordenadas[:math.ceil(len(ordenadas) / eta)]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+            compartilhados.fechar()
+
+    if not notas:
+        raise ValueError(f"O early stopping (paciência {paciencia}) parou todas as combinações "
+                         "em todos os níveis; aumente a paciência ou use 0 para desligá-lo")
+
+    best_index = min(notas, key=lambda i: (-notas[i], i))
+    return {
+        'best_params': grade[best_index],
+        'best_score': notas[best_index],
+        'best_index': best_index,
+        'notas': notas,
+        'niveis': niveis,
+        'rodadas': rodadas,
+        'processos': processos,
+        'nthread': nthread
+    }
+
+
+def avaliar_baselines(X, y, folds):
+    """
+    F1 médio dos baselines do notebook nos mesmos folds
+
+    Returns:
+        dict: {nome: F1 médio}
+    """
+    modelos = {
+        'Regressão Logística': LogisticRegression(random_state=RANDOM_STATE, max_iter=1000),
+        'Árvore de Decisão': DecisionTreeClassifier(random_state=RANDOM_STATE, max_depth=5)
+    }
+    return {nome: float(cross_val_score(modelo, X, y, cv=divisoes(folds), scoring='f1').mean())
+            for nome, modelo in modelos.items()}
+
+
+def busca_exaustiva(X_train_val, y_train_val, param_grid=PARAM_GRID):
+    """
+    GridSearchCV como no notebook, usado como referência
+
+    Returns:
+        GridSearchCV: Busca já ajustada
+    """
+    grid_search = GridSearchCV(
+        estimator=XGBClassifier(random_state=RANDOM_STATE, eval_metric='logloss'),
+        param_grid=param_grid,
+        scoring='f1',
+        cv=3,
+        n_jobs=-1
+    )
+    return grid_search.fit(X_train_val, y_train_val)
+
+
+def selecionar(caminho=ARQUIVO_DADOS, eta=3, paciencia=30, processos=None):
+    """
+    Baselines e XGBoost sobre dados codificados e folds gerados uma vez
+
+    Returns:
+        dict: {'baselines': {...}, 'xgboost': saída de successive_halving, 'tempo_s': s}
+    """
+    inicio = time.perf_counter()
+    X_train_val, y_train_val, _, _ = preparar_dados(caminho)
+    X = X_train_val.to_numpy(dtype=np.float32)
+    y = y_train_val.to_numpy()
+    folds = gerar_folds(y)
+
+    baselines = avaliar_baselines(X, y, folds)
+    resultado = successive_halving(X, y, folds, eta=eta, paciencia=paciencia, processos=processos)
+    duracao = time.perf_counter() - inicio
+
+    print("=== SELEÇÃO DE MODELOS (F1 médio, 3 folds) ===")
+    for nome, nota in baselines.items():
+        print(f"  {nome:<20} {nota:.4f}")
+    print(f"  {'XGBoost':<20} {resultado['best_score']:.4f}")
+    print(f"\nMelhores hiperparâmetros: {resultado['best_params']}")
+    print(f"Paralelismo: {resultado['processos']} processo(s) x {resultado['nthread']} thread(s)")
+    for nivel in resultado['niveis']:
+        print(f"  {nivel['orcamento']:>4} árvores: {nivel['combinacoes']:>3} combinações "
+              f"({nivel['paradas']} paradas por early stopping)")
+    print(f"Rodadas de boosting: {resultado['rodadas']:,} | tempo total: {duracao:.2f}s")
+
+    return {'baselines': baselines, 'xgboost': resultado, 'tempo_s': duracao}
+
+
+def comparar(caminho=ARQUIVO_DADOS, eta=3, paciencia=30, processos=None):
+    """
+    Busca exaustiva do notebook vs successive halving: vencedor e tempo
+
+    Returns:
+        bool: True se as duas buscas escolherem a mesma combinação
+    """
+    X_train_val, y_train_val, _, _ = preparar_dados(caminho)
+
+    inicio = time.perf_counter()
+    grid_search = busca_exaustiva(X_train_val, y_train_val)
+    tempo_exaustiva = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    X = X_train_val.to_numpy(dtype=np.float32)
+    y = y_train_val.to_numpy()
+    resultado = successive_halving(X, y, gerar_folds(y), eta=eta, paciencia=paciencia,
+                                   processos=processos)
+    tempo_halving = time.perf_counter() - inicio
+
+    referencia = grid_search.cv_results_['mean_test_score']
+    diferenca = max(abs(referencia[i] - nota) for i, nota in resultado['notas'].items())
+    rodadas_exaustiva = sum(params['n_estimators'] for params in grid_search.cv_results_['params']) * 3
+    mesmo_vencedor = resultado['best_params'] == grid_search.best_params_
+
+    print("=== BUSCA EXAUSTIVA vs SUCCESSIVE HALVING ===")
+    print(f"{'':<20} {'Exaustiva':>14} {'Halving':>14}")
+    print(f"{'Tempo (s)':<20} {tempo_exaustiva:>14.2f} {tempo_halving:>14.2f}")
+    print(f"{'Rodadas de boosting':<20} {rodadas_exaustiva:>14,} {resultado['rodadas']:>14,}")
+    print(f"{'Pontos avaliados':<20} {len(referencia):>14} {len(resultado['notas']):>14}")
+    print(f"{'Melhor F1':<20} {grid_search.best_score_:>14.4f} {resultado['best_score']:>14.4f}")
+    print(f"\nVencedor exaustiva: {grid_search.best_params_}")
+    print(f"Vencedor halving:   {resultado['best_params']}")
+    print(f"Mesmo vencedor: {'sim' if mesmo_vencedor else 'NÃO'} | "
+          f"maior diferença nas notas avaliadas: {diferenca:.2e} | "
+          f"ganho de tempo: {tempo_exaustiva / tempo_halving:.1f}x")
+    return mesmo_vencedor
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Seleção de modelos com successive halving')
+    parser.add_argument('--dados', default=ARQUIVO_DADOS, help='CSV de voos')
+    parser.add_argument('--eta', type=int, default=3, help='Mantém 1/eta das combinações por nível')
+    parser.add_argument('--paciencia', type=int, default=30,
+                        help='Rodadas sem melhora da logloss até parar (0 = sem early stopping)')
+    parser.add_argument('--processos', type=int, help='Processos de treino (padrão: número de CPUs)')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    subparsers.add_parser('selecionar', help='Baselines e XGBoost com successive halving')
+    subparsers.add_parser('comparar', help='Compara com o GridSearchCV do notebook')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+
+    if args.comando == 'selecionar':
+        selecionar(args.dados, args.eta, args.paciencia, args.processos)
+    elif args.comando == 'comparar':
+        comparar(args.dados, args.eta, args.paciencia, args.processos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Artefato único e versionado do modelo de atrasos
+UC03 - Atividade 4 (Implantação e Inferência com XGBoost)
+
+O notebook grava três pickles (xgboost_flight_delay_model.pkl,
+xgboost_flight_delay_model_pickle.pkl, label_encoders.pkl) e o
+model_metadata.json; carregá-los exige joblib/pickle e desserializar
+objetos do scikit-learn. Aqui tudo vai para um único zip sem compressão:
+
+    manifest.json   formato, versão, ordem das features, vocabulário de cada
+                    encoder (listas simples), metadados do treino e o SHA-256
+                    do modelo
+    model.ubj       o Booster no formato nativo do XGBoost (UBJSON)
+
+O carregamento lê o zip, confere o hash e monta o Booster direto do
+formato nativo, sem pickle e sem LabelEncoder.
+
+Uso:
+    python artefato_modelo.py exportar
+    python artefato_modelo.py exportar --versao 2025-11-04
+    python artefato_modelo.py info
+    python artefato_modelo.py benchmark --repeticoes 5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import zipfile
+from datetime import datetime
+
+FORMATO_ARTEFATO = 1
+MODEL_DIR = 'models'
+ARTEFATO_PADRAO = os.path.join(MODEL_DIR, 'flight_delay_model.zip')
+
+
+class ArtefatoModelo:
+    """
+    Conteúdo de um artefato carregado
+    """
+
+    def __init__(self, manifesto, booster):
+        """
+        Args:
+            manifesto (dict): Conteúdo de manifest.json
+            booster (xgboost.Booster): Modelo carregado do formato nativo
+        """
+        self.manifesto = manifesto
+        self.booster = booster
+        self.versao = manifesto['versao']
+        self.feature_names = manifesto['feature_names']
+        self.target_column = manifesto.get('target_column')
+        self.vocabularios = manifesto['vocabularios']
+        self.metadados = manifesto['metadados']
+
+    def preditor(self):
+        """
+        PreditorTempoReal sobre o Booster e os vocabulários do artefato
+
+        O preditor trabalha sobre uma cópia do Booster (nthread=1), então o
+        artefato segue compartilhável entre preditores.
+        """
+        from predicao_tempo_real import PreditorTempoReal
+
+        return PreditorTempoReal(self.booster, self.vocabularios, self.feature_names)
+
+    def preditor_lote(self, nthread=None):
+        """
+        PreditorLote sobre o Booster e os vocabulários do artefato
+
+        Args:
+            nthread (int): Threads do XGBoost; se informado, vale só para uma
+                cópia do Booster, sem afetar self.booster nem outros preditores
+        """
+        from predicao_lote import PreditorLote
+
+        return PreditorLote(self.booster, self.vocabularios, self.feature_names, nthread=nthread)
+
+
+def exportar_artefato(pasta_modelos=MODEL_DIR, destino=ARTEFATO_PADRAO, versao=None):
+    """
+    Empacota modelo, encoders e metadados do notebook em um único arquivo
+
+    Args:
+        pasta_modelos (str): Pasta com os pickles e model_metadata.json
+        destino (str): Caminho do artefato (.zip)
+        versao (str): Identificador da versão (padrão: data do treino)
+
+    Returns:
+        dict: Manifesto gravado
+    """
+    import joblib
+    import xgboost
+
+    with open(os.path.join(pasta_modelos, 'model_metadata.json'), encoding='utf-8') as arquivo:
+        metadados = json.load(arquivo)
+    modelo = joblib.load(os.path.join(pasta_modelos, 'xgboost_flight_delay_model.pkl'))
+    encoders = joblib.load(os.path.join(pasta_modelos, 'label_encoders.pkl'))
+
+    target_column = metadados.get('target_column')
+    bruto = bytes(modelo.get_booster().save_raw(raw_format='ubj'))
+
+    manifesto = {
+        'formato': FORMATO_ARTEFATO,
+        'versao': versao or metadados.get('training_date', datetime.now().isoformat()),
+        'criado_em': datetime.now().isoformat(),
+        'xgboost_version': xgboost.__version__,
+        'feature_names': metadados['feature_names'],
+        'target_column': target_column,
+        'vocabularios': {coluna: encoder.classes_.tolist()
+                         for coluna, encoder in encoders.items() if coluna != target_column},
+        'rotulos': {'0': 'No Horário', '1': 'Atrasado'},
+        'limiar': 0.5,
+        'modelo_sha256': hashlib.sha256(bruto).hexdigest(),
+        'metadados': metadados
+    }
+
+    temporario = destino + '.tmp'
+    with zipfile.ZipFile(temporario, 'w', zipfile.ZIP_STORED) as pacote:
+        pacote.writestr('manifest.json', json.dumps(manifesto, ensure_ascii=False, indent=2))
+        pacote.writestr('model.ubj', bruto)
+    os.replace(temporario, destino)
+    return manifesto
+
+
+def ler_manifesto(caminho=ARTEFATO_PADRAO):
+    """
+    Lê apenas o manifest.json do artefato (sem carregar o modelo)
+    """
+    with zipfile.ZipFile(caminho) as pacote:
+        return json.loads(pacote.read('manifest.json'))
+
+
+def carregar_artefato(caminho=ARTEFATO_PADRAO, verificar_hash=True):
+    """
+    Carrega o artefato: manifesto + Booster do formato nativo
+
+    Args:
+        caminho (str): Caminho do artefato
+        verificar_hash (bool): Confere o SHA-256 do modelo antes de carregar
+
+    Returns:
+        ArtefatoModelo: Modelo pronto para predição
+
+    Raises:
+        ValueError: Formato não suportado ou modelo corrompido
+    """
+    with zipfile.ZipFile(caminho) as pacote:
+        manifesto = json.loads(pacote.read('manifest.json'))
+        if manifesto.get('formato') != FORMATO_ARTEFATO:
+            raise ValueError(f"Formato de artefato não suportado: {manifesto.get('formato')} "
+                             f"(esperado {FORMATO_ARTEFATO})")
+        bruto = pacote.read('model.ubj')
+
+    if verificar_hash and hashlib.sha256(bruto).hexdigest() != manifesto['modelo_sha256']:
+        raise ValueError(f"SHA-256 do modelo não confere em {caminho}")
+
+    import xgboost
+
+    booster = xgboost.Booster()
+    booster.load_model(bytearray(bruto))
+    return ArtefatoModelo(manifesto, booster)
+
+
+# Programas medidos em processos novos: do início do interpretador até a
+# primeira predição do voo de exemplo
+_PARTIDA_JOBLIB = """
+import json, warnings
+warnings.filterwarnings('ignore')
+import joblib
+import pandas as pd
+modelo = joblib.load('{modelos}/xgboost_flight_delay_model.pkl')
+encoders = joblib.load('{modelos}/label_encoders.pkl')
+with open('{modelos}/model_metadata.json') as f:
+    metadados = json.load(f)
+voo = {voo}
+df = pd.DataFrame([voo])
+for col, enc in encoders.items():
+    if col in df.columns:
+        df[col] = enc.transform(df[col])
+df = df.reindex(columns=metadados['feature_names'], fill_value=0)
+print(float(modelo.predict_proba(df)[0][1]))
+"""
+
+_PARTIDA_ARTEFATO = """
+from artefato_modelo import carregar_artefato
+artefato = carregar_artefato('{artefato}')
+print(artefato.preditor().probabilidade_atraso({voo}))
+"""
+
+
+def _medir_partida(programa, repeticoes):
+    tempos = []
+    saida = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = subprocess.run([sys.executable, '-c', programa], capture_output=True,
+                                   text=True, check=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        tempos.append(time.perf_counter() - inicio)
+        saida = float(resultado.stdout.strip().splitlines()[-1])
+    return tempos, saida
+
+
+def benchmark(pasta_modelos=MODEL_DIR, caminho=ARTEFATO_PADRAO, repeticoes=5):
+    """
+    Tempo de partida a frio até a primeira predição: pickles vs artefato
+
+    Cada repetição roda em um interpretador novo. Também mede, no processo
+    atual, só a desserialização (imports já feitos).
+
+    Returns:
+        dict: {'joblib': [s, ...], 'artefato': [s, ...], 'desserializacao': {...}}
+    """
+    from predicao_tempo_real import VOO_EXEMPLO
+
+    pasta_modelos = os.path.abspath(pasta_modelos)
+    caminho = os.path.abspath(caminho)
+    if not os.path.exists(caminho):
+        exportar_artefato(pasta_modelos, caminho)
+
+    voo = repr(VOO_EXEMPLO)
+    tempos_joblib, prob_joblib = _medir_partida(
+        _PARTIDA_JOBLIB.format(modelos=pasta_modelos, voo=voo), repeticoes)
+    tempos_artefato, prob_artefato = _medir_partida(
+        _PARTIDA_ARTEFATO.format(artefato=caminho, voo=voo), repeticoes)
+
+    import warnings
+    import joblib
+    warnings.filterwarnings('ignore', category=UserWarning)
+
+    desserializacao = {}
+    for nome, funcao in (
+            ('joblib', lambda: (joblib.load(os.path.join(pasta_modelos, 'xgboost_flight_delay_model.pkl')),
+                                joblib.load(os.path.join(pasta_modelos, 'label_encoders.pkl')))),
+            ('artefato', lambda: carregar_artefato(caminho))):
+        funcao()
+        inicio = time.perf_counter()
+        for _ in range(20):
+            funcao()
+        desserializacao[nome] = (time.perf_counter() - inicio) / 20
+
+    print(f"Partida a frio até a 1ª predição (mediana de {repeticoes}):")
+    print(f"  joblib + pickles: {statistics.median(tempos_joblib) * 1000:8.1f} ms")
+    print(f"  artefato:         {statistics.median(tempos_artefato) * 1000:8.1f} ms")
+    print("Só desserialização (imports já carregados):")
+    print(f"  joblib + pickles: {desserializacao['joblib'] * 1000:8.2f} ms")
+    print(f"  artefato:         {desserializacao['artefato'] * 1000:8.2f} ms")
+    print(f"Mesma probabilidade: {'sim' if abs(prob_joblib - prob_artefato) < 1e-6 else 'NÃO'} "
+          f"({prob_artefato:.6f})")
+
+    return {'joblib': tempos_joblib, 'artefato': tempos_artefato,
+            'desserializacao': desserializacao}
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Artefato único e versionado do modelo')
+    parser.add_argument('--modelos', default=MODEL_DIR, help='Pasta dos pickles do notebook')
+    parser.add_argument('--artefato', default=ARTEFATO_PADRAO, help='Caminho do artefato')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    exportar = subparsers.add_parser('exportar', help='Gera o artefato a partir dos pickles')
+    exportar.add_argument('--versao', help='Identificador da versão (padrão: data do treino)')
+
+    subparsers.add_parser('info', help='Mostra o manifesto do artefato')
+
+    medir = subparsers.add_parser('benchmark', help='Partida a frio: pickles vs artefato')
+    medir.add_argument('--repeticoes', type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.comando == 'exportar':
+        import warnings
+        warnings.filterwarnings('ignore', category=UserWarning)
+        manifesto = exportar_artefato(args.modelos, args.artefato, args.versao)
+        tamanho = os.path.getsize(args.artefato) / 1024
+        print(f"Artefato salvo em: {args.artefato} ({tamanho:.1f} KB)")
+        print(f"  Versão: {manifesto['versao']}")
+        print(f"  Features: {manifesto['feature_names']}")
+    elif args.comando == 'info':
+        manifesto = ler_manifesto(args.artefato)
+        resumo = {chave: valor for chave, valor in manifesto.items() if chave != 'metadados'}
+        print(json.dumps(resumo, ensure_ascii=False, indent=2))
+    elif args.comando == 'benchmark':
+        benchmark(args.modelos, args.artefato, args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Avaliador vetorizado do ensemble de árvores em NumPy puro
+UC03 - Atividade 4 (Implantação e Inferência com XGBoost)
+
+Para o ensemble pequeno da atividade (100 árvores, max_depth 6), o custo de
+cada chamada ao XGBoost é dominado pelo overhead e não pelas árvores. O
+exportador converte o Booster em arrays planos de nós (feature, limiar,
+filho esquerdo, filho direito, valor da folha) com todas as árvores
+concatenadas; o avaliador percorre um nível por iteração, para todas as
+linhas e todas as árvores de uma vez. O arquivo exportado (.npz) só precisa
+de NumPy para ser carregado e avaliado.
+
+A soma das folhas segue a ordem e a precisão (float32) do XGBoost e a
+sigmoide reproduz o expf da glibc, então as probabilidades coincidem bit a
+bit com predict_proba no Linux (em outras plataformas a libm do XGBoost pode
+diferir em 1 ulp, ~6e-8).
+
+Uso:
+    python arvores_numpy.py exportar
+    python arvores_numpy.py verificar
+    python arvores_numpy.py benchmark
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+FORMATO_ARVORES = 1
+ARVORES_PADRAO = os.path.join('models', 'arvores_numpy.npz')
+
+# Constantes do expf da glibc (tabela 2^(i/32) e polinômio de grau 3), que o
+# XGBoost usa na sigmoide em float32. O np.exp em float32 difere dele em
+# ~1 ulp em boa parte das entradas, o que quebraria a igualdade bit a bit.
+_N_TABELA = 32
+with localcontext() as _contexto:
+    _contexto.prec = 60
+    _TABELA_EXP2 = np.array([float(Decimal(2) ** (Decimal(i) / _N_TABELA))
+                             for i in range(_N_TABELA)])
+_INV_LN2_N = float.fromhex('0x1.71547652b82fep+0') * _N_TABELA
+_POLINOMIO = (float.fromhex('0x1.c6af84b912394p-5') / _N_TABELA ** 3,
+              float.fromhex('0x1.ebfce50fac4f3p-3') / _N_TABELA ** 2,
+              float.fromhex('0x1.62e42ff0c52d6p-1') / _N_TABELA)
+_DESLOCAMENTO = float.fromhex('0x1.8p+52')
+
+
+def exp_float32(x):
+    """
+    exp em float32 com o mesmo algoritmo (e arredondamento) do expf da glibc
+    """
+    z = _INV_LN2_N * np.asarray(x, dtype=np.float32).astype(np.float64)
+    k = (z + _DESLOCAMENTO) - _DESLOCAMENTO
+    r = z - k
+    k = k.astype(np.int64)
+    escala = np.ldexp(_TABELA_EXP2[k % _N_TABELA], k >> 5)
+    c0, c1, c2 = _POLINOMIO
+    y = (c0 * r + c1) * (r * r) + (c2 * r + 1)
+    return (y * escala).astype(np.float32)
+
+
+def sigmoide(margens):
+    """
+    Sigmoide em float32 como common::Sigmoid do XGBoost
+    """
+    x = np.minimum(-np.asarray(margens, dtype=np.float32), np.float32(88.7))
+    denominador = exp_float32(x) + np.float32(1) + np.float32(1e-16)
+    return np.float32(1) / denominador
+
+
+def exportar_arvores(booster):
+    """
+    Converte um Booster binary:logistic em arrays planos de nós
+
+    Args:
+        booster (xgboost.Booster): Modelo treinado
+
+    Returns:
+        dict: Arrays 'feature', 'limiar', 'esquerda', 'direita', 'padrao_esquerda',
+            'valor', 'raizes' e os escalares 'margem_base' e 'profundidade'
+    """
+    modelo = json.loads(bytes(booster.save_raw(raw_format='json')))['learner']
+    if modelo['objective']['name'] != 'binary:logistic':
+        raise ValueError(f"Objetivo não suportado: {modelo['objective']['name']}")
+
+    arvores = modelo['gradient_booster']['model']['trees']
+    if any(arvore['categories_nodes'] for arvore in arvores):
+        raise ValueError("Splits categóricos nativos não são suportados")
+
+    feature, limiar, esquerda, direita, padrao_esquerda, valor, raizes = [], [], [], [], [], [], []
+    profundidade = 0
+    deslocamento = 0
+    for arvore in arvores:
+        filhos_esq = np.array(arvore['left_children'], dtype=np.int64)
+        filhos_dir = np.array(arvore['right_children'], dtype=np.int64)
+        folhas = filhos_esq == -1
+        ids = np.arange(len(filhos_esq)) + deslocamento
+
+        # Folhas apontam para si mesmas: percorrer níveis extras não as tira do lugar
+        esquerda.append(np.where(folhas, ids, filhos_esq + deslocamento))
+        direita.append(np.where(folhas, ids, filhos_dir + deslocamento))
+        feature.append(np.where(folhas, 0, arvore['split_indices']))
+        # Nas folhas, split_conditions guarda o valor da folha
+        condicoes = np.array(arvore['split_conditions'], dtype=np.float32)
+        limiar.append(np.where(folhas, np.float32(np.inf), condicoes))
+        valor.append(np.where(folhas, condicoes, np.float32(0)))
+        padrao_esquerda.append(np.array(arvore['default_left'], dtype=bool))
+        raizes.append(deslocamento)
+
+        profundidade = max(profundidade, _profundidade(filhos_esq, filhos_dir))
+        deslocamento += len(filhos_esq)
+
+    base_score = np.float32(modelo['learner_model_param']['base_score'].strip('[]'))
+    # Mesma conversão probabilidade -> margem do XGBoost (em float32)
+    margem_base = np.float32(-np.log(np.float32(1) / base_score - np.float32(1)))
+
+    return {
+        'feature': np.concatenate(feature).astype(np.int32),
+        'limiar': np.concatenate(limiar).astype(np.float32),
+        'esquerda': np.concatenate(esquerda).astype(np.int32),
+        'direita': np.concatenate(direita).astype(np.int32),
+        'padrao_esquerda': np.concatenate(padrao_esquerda),
+        'valor': np.concatenate(valor).astype(np.float32),
+        'raizes': np.array(raizes, dtype=np.int32),
+        'margem_base': margem_base,
+        'profundidade': np.int32(profundidade)
+    }
+
+
+def _profundidade(filhos_esq, filhos_dir):
+    profundidade = 0
+    nivel = [0]
+    while True:
+        proximos = [filho for no in nivel for filho in (filhos_esq[no], filhos_dir[no]) if filho != -1]
+        if not proximos:
+            return profundidade
+        profundidade += 1
+        nivel = proximos
+
+
+class AvaliadorArvores:
+    """
+    Avaliação vetorizada do ensemble exportado
+    """
+
+    def __init__(self, arrays, feature_names=None, tamanho_bloco=2048):
+        """
+        Args:
+            arrays (dict): Saída de exportar_arvores
+            feature_names (list): Ordem das colunas esperada (opcional)
+            tamanho_bloco (int): Linhas avaliadas por vez (blocos pequenos cabem no cache)
+        """
+        self.feature = arrays['feature']
+        self.limiar = arrays['limiar']
+        self.esquerda = arrays['esquerda']
+        self.direita = arrays['direita']
+        self.padrao_esquerda = arrays['padrao_esquerda']
+        self.valor = arrays['valor']
+        self.raizes = arrays['raizes']
+        self.margem_base = np.float32(arrays['margem_base'])
+        self.profundidade = int(arrays['profundidade'])
+        self.feature_names = feature_names
+        self.tamanho_bloco = tamanho_bloco
+
+        internos = self.esquerda != np.arange(len(self.esquerda))
+        self._irmaos_consecutivos = bool(np.all(self.direita[internos] == self.esquerda[internos] + 1))
+
+    @classmethod
+    def carregar(cls, caminho=ARVORES_PADRAO):
+        """
+        Carrega as árvores exportadas (só NumPy)
+        """
+        with np.load(caminho) as dados:
+            arrays = {nome: dados[nome] for nome in dados.files if nome != 'manifesto'}
+            manifesto = json.loads(str(dados['manifesto']))
+        if manifesto.get('formato') != FORMATO_ARVORES:
+            raise ValueError(f"Formato não suportado: {manifesto.get('formato')}")
+        return cls(arrays, manifesto.get('feature_names'))
+
+    def salvar(self, caminho=ARVORES_PADRAO, **extras):
+        """
+        Grava as árvores em .npz com um manifesto JSON
+        """
+        manifesto = {'formato': FORMATO_ARVORES, 'feature_names': self.feature_names,
+                     'arvores': len(self.raizes), 'nos': len(self.feature), **extras}
+        temporario = caminho + '.tmp.npz'
+        np.savez(temporario, feature=self.feature, limiar=self.limiar, esquerda=self.esquerda,
+                 direita=self.direita, padrao_esquerda=self.padrao_esquerda, valor=self.valor,
+                 raizes=self.raizes, margem_base=self.margem_base,
+                 profundidade=np.int32(self.profundidade),
+                 manifesto=np.array(json.dumps(manifesto, ensure_ascii=False)))
+        os.replace(temporario, caminho)
+
+    def _folhas(self, X):
+        """
+        Nó folha alcançado por cada linha em cada árvore (n_árvores x n_linhas)
+
+        Um nível por iteração, para todas as árvores e linhas ao mesmo tempo.
+        """
+        plano = X.ravel()
+        inicio_linha = np.arange(len(X), dtype=np.int64) * X.shape[1]
+        nos = np.repeat(self.raizes[:, None], len(X), axis=1)
+
+        if self._irmaos_consecutivos and np.isfinite(plano).all():
+            # Caminho comum: filho direito = esquerdo + 1 e sem valores ausentes
+            for _ in range(self.profundidade):
+                x = plano[inicio_linha + self.feature[nos]]
+                nos = self.esquerda[nos] + (x >= self.limiar[nos])
+            return nos
+
+        for _ in range(self.profundidade):
+            x = plano[inicio_linha + self.feature[nos]]
+            esquerda = np.where(np.isnan(x), self.padrao_esquerda[nos], x < self.limiar[nos])
+            nos = np.where(esquerda, self.esquerda[nos], self.direita[nos])
+        return nos
+
+    def margem(self, X):
+        """
+        Margem (log-odds) de cada linha, como predict(output_margin=True)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        margens = np.empty(len(X), dtype=np.float32)
+        for inicio in range(0, len(X), self.tamanho_bloco):
+            bloco = X[inicio:inicio + self.tamanho_bloco]
+            folhas = self.valor[self._folhas(bloco)]
+            # Redução no eixo 0 (não contíguo) é sequencial: soma árvore a
+            # árvore em float32, partindo da margem base, como o XGBoost
+            margens[inicio:inicio + len(bloco)] = folhas.sum(axis=0, initial=self.margem_base)
+        return margens
+
+    def probabilidade_atraso(self, X):
+        """
+        Probabilidade da classe 1 para cada linha
+        """
+        return sigmoide(self.margem(X))
+
+    def predict_proba(self, X):
+        """
+        Matriz (n, 2) como XGBClassifier.predict_proba
+        """
+        positiva = self.probabilidade_atraso(X)
+        return np.column_stack([np.float32(1) - positiva, positiva])
+
+
+def exportar(caminho_artefato=None, destino=ARVORES_PADRAO):
+    """
+    Exporta as árvores do artefato do modelo para .npz
+
+    Returns:
+        AvaliadorArvores: Avaliador com as árvores exportadas
+    """
+    from artefato_modelo import ARTEFATO_PADRAO, carregar_artefato, exportar_artefato
+
+    caminho_artefato = caminho_artefato or ARTEFATO_PADRAO
+    if not os.path.exists(caminho_artefato):
+        exportar_artefato(destino=caminho_artefato)
+    artefato = carregar_artefato(caminho_artefato)
+
+    avaliador = AvaliadorArvores(exportar_arvores(artefato.booster), artefato.feature_names)
+    avaliador.salvar(destino, versao_modelo=artefato.versao,
+                     modelo_sha256=artefato.manifesto['modelo_sha256'])
+    return avaliador
+
+
+def verificar(caminho=ARVORES_PADRAO, pasta_modelos='models'):
+    """
+    Compara com XGBClassifier.predict_proba em data/test_data.csv (bit a bit)
+    """
+    import pandas as pd
+    from predicao_tempo_real import carregar_artefatos
+    from tabela_predicoes import eixos_entrada
+
+    modelo, encoders, metadados = carregar_artefatos(pasta_modelos)
+    teste = pd.read_csv(os.path.join('data', 'test_data.csv'))
+    X = teste[metadados['feature_names']]
+
+    esperado = modelo.predict_proba(X)
+    obtido = AvaliadorArvores.carregar(caminho).predict_proba(X.to_numpy())
+
+    identicos = np.array_equal(esperado, obtido)
+    diferenca = float(np.abs(esperado - obtido).max())
+    print(f"data/test_data.csv ({len(X)} voos): "
+          f"{'idêntico bit a bit' if identicos else f'DIVERGENTE (diferença máxima {diferenca:.2e})'}")
+
+    # Também sobre o espaço inteiro de entradas, que exercita todos os ramos
+    # Eixos dos vocabulários dos encoders e de DOMINIOS_NUMERICOS, como na tabela
+    vocabularios = {coluna: list(encoder.classes_) for coluna, encoder in encoders.items()
+                    if coluna != metadados.get('target_column')}
+    eixos = eixos_entrada({'feature_names': metadados['feature_names'],
+                           'vocabularios': vocabularios})
+    grade = np.stack([e.ravel() for e in np.meshgrid(*eixos, indexing='ij')], axis=1).astype(np.float32)
+    grade = pd.DataFrame(grade, columns=metadados['feature_names'])
+    identicos_grade = np.array_equal(modelo.predict_proba(grade),
+                                     AvaliadorArvores.carregar(caminho).predict_proba(grade.to_numpy()))
+    print(f"Produto cartesiano ({len(grade):,} combinações): "
+          f"{'idêntico bit a bit' if identicos_grade else 'DIVERGENTE'}")
+    return identicos and identicos_grade
+
+
+def benchmark(caminho=ARVORES_PADRAO, pasta_modelos='models', requisicoes=5000):
+    """
+    Latência de uma linha e vazão em lote: NumPy vs XGBoost
+    """
+    from predicao_tempo_real import carregar_artefatos
+
+    modelo, _, _ = carregar_artefatos(pasta_modelos)
+    booster = modelo.get_booster()
+    avaliador = AvaliadorArvores.carregar(caminho)
+
+    gerador = np.random.default_rng(42)
+    X = np.column_stack([gerador.integers(0, 5, 200_000), gerador.integers(0, 5, 200_000),
+                         gerador.integers(0, 5, 200_000), gerador.integers(0, 24, 200_000),
+                         gerador.integers(1, 8, 200_000), gerador.integers(0, 5, 200_000)]
+                        ).astype(np.float32)
+
+    print(f"{'Método':<22} {'1 linha p50 (µs)':>17} {'lote (linhas/s)':>16}")
+    metodos = (
+        ('XGBoost predict_proba', modelo.predict_proba),
+        ('XGBoost inplace', lambda x: booster.inplace_predict(x, validate_features=False)),
+        ('NumPy', avaliador.probabilidade_atraso)
+    )
+    for nome, funcao in metodos:
+        linha = X[:1]
+        funcao(linha)
+        tempos = np.empty(requisicoes)
+        for i in range(requisicoes):
+            inicio = time.perf_counter()
+            funcao(linha)
+            tempos[i] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        funcao(X)
+        duracao = time.perf_counter() - inicio
+        print(f"{nome:<22} {np.percentile(tempos, 50) * 1e6:>17.1f} {len(X) / duracao:>16,.0f}")
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Avaliador de árvores em NumPy puro')
+    parser.add_argument('--arvores', default=ARVORES_PADRAO, help='Arquivo .npz das árvores')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    exportar_cmd = subparsers.add_parser('exportar', help='Converte o artefato em arrays planos')
+    exportar_cmd.add_argument('--artefato', help='Artefato do modelo (padrão: models/flight_delay_model.zip)')
+    subparsers.add_parser('verificar', help='Compara com predict_proba (bit a bit)')
+    subparsers.add_parser('benchmark', help='Latência e vazão: NumPy vs XGBoost')
+    args = parser.parse_args()
+
+    import warnings
+    warnings.filterwarnings('ignore', category=UserWarning)
+
+    if args.comando == 'exportar':
+        avaliador = exportar(args.artefato, args.arvores)
+        print(f"Árvores salvas em: {args.arvores}")
+        print(f"  {len(avaliador.raizes)} árvores, {len(avaliador.feature):,} nós, "
+              f"profundidade {avaliador.profundidade}")
+    elif args.comando == 'verificar':
+        sys.exit(0 if verificar(args.arvores) else 1)
+    elif args.comando == 'benchmark':
+        benchmark(args.arvores)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""
+Suíte de benchmark de latência e vazão dos caminhos de predição
+UC03 - Atividade 4 (Implantação e Inferência com XGBoost)
+
+O results/comparison_analysis.json do notebook compara tempo real e batch
+com uma única execução sobre 5 e 30 registros, sem aquecimento, sem
+percentis e sem registrar a máquina: não dá para tirar conclusão nem
+repetir a medida. Esta suíte mede os quatro caminhos de serviço com
+entradas sorteadas de flights_delays_120.csv (semente fixa):
+
+    single      um voo por requisição (PreditorTempoReal)
+    micro       micro-lotes de voos em dicionários -> DataFrame -> PreditorLote
+    batch       DataFrame já em memória (PreditorLote)
+    streaming   CSV sintético lido em blocos e gravado (prever_arquivo)
+
+single e micro variam o número de clientes simultâneos (threads, cada um
+com seu preditor de uma thread do XGBoost); micro e batch variam o tamanho
+do lote, e batch usa todos os núcleos em um único preditor. Cada cenário
+informa p50/p95/p99 da latência por chamada, registros por segundo e o
+pico de memória alocada (tracemalloc, medido numa passada separada para
+não distorcer os tempos). O streaming reutiliza um pool já carregado
+(criar_pool), então a carga do modelo fica fora das latências; como o
+trabalho roda nos workers, seu peak_memory_mb é null e o cenário traz
+'worker_peak_rss_mb' (maior RSS de um worker, quando a plataforma informa). O JSON gravado mantém as chaves do
+comparison_analysis.json e acrescenta 'environment', 'config' e
+'scenarios'; o comando 'comparar' aponta regressões entre dois arquivos.
+
+Uso:
+    python benchmark_servico.py executar
+    python benchmark_servico.py executar --concorrencia 1 2 4 8 --lotes 1000 100000 1000000
+    python benchmark_servico.py comparar results/comparison_analysis.json results/benchmark_servico.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from predicao_lote import PreditorLote, criar_pool, gerar_entrada_sintetica, prever_arquivo
+from predicao_tempo_real import MODEL_DIR, RESULTS_DIR, PreditorTempoReal, carregar_artefatos
+
+SAIDA_PADRAO = os.path.join(RESULTS_DIR, 'benchmark_servico.json')
+ARQUIVO_VOOS = 'flights_delays_120.csv'
+
+# Métrica -> 1 se subir é pior, -1 se cair é pior
+METRICAS_COMPARADAS = {
+    'avg_time_ms': 1,
+    'p50_ms': 1,
+    'p95_ms': 1,
+    'p99_ms': 1,
+    'throughput_per_second': -1,
+    'peak_memory_mb': 1
+}
+
+
+def coletar_ambiente(pasta_modelos=MODEL_DIR):
+    """
+    Máquina, versões das bibliotecas e identidade do modelo medido
+    """
+    import sklearn
+    import xgboost
+
+    with open(os.path.join(pasta_modelos, 'xgboost_flight_delay_model.pkl'), 'rb') as arquivo:
+        modelo_sha256 = hashlib.sha256(arquivo.read()).hexdigest()
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'xgboost': xgboost.__version__,
+        'scikit_learn': sklearn.__version__,
+        'model_sha256': modelo_sha256,
+        'git_commit': commit
+    }
+
+
+def _executar_clientes(fabrica, cargas, concorrencia):
+    """
+    Divide as cargas entre `concorrencia` threads, cada uma com sua função
+
+    Returns:
+        tuple: (latência de cada chamada em ms, duração total em s)
+    """
+    if not 1 <= concorrencia <= len(cargas):
+        raise ValueError(f"Concorrência {concorrencia} inválida para {len(cargas)} carga(s): "
+                         "cada cliente precisa de pelo menos uma")
+
+    partes = [cargas[i::concorrencia] for i in range(concorrencia)]
+    funcoes = [fabrica() for _ in range(concorrencia)]
+    for funcao, parte in zip(funcoes, partes):
+        funcao(parte[0])  # aquecimento
+
+    latencias = [None] * concorrencia
+    barreira = threading.Barrier(concorrencia + 1)
+
+    def cliente(i):
+        funcao, parte = funcoes[i], partes[i]
+        tempos = np.empty(len(parte))
+        barreira.wait()
+        for j, carga in enumerate(parte):
+            inicio = time.perf_counter()
+            funcao(carga)
+            tempos[j] = time.perf_counter() - inicio
+        latencias[i] = tempos
+
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    barreira.wait()
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return np.concatenate(latencias) * 1000, time.perf_counter() - inicio
+
+
+def _pico_memoria(funcao):
+    # Pico de memória alocada (Python + NumPy/pandas) durante a chamada, em MB
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / 2 ** 20
+
+
+def _pico_rss_filhos():
+    # Maior RSS entre os processos filhos já encerrados, em MB (None sem o módulo resource)
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss vem em bytes no macOS e em KB no Linux
+    return pico / 2 ** 20 if sys.platform == 'darwin' else pico / 2 ** 10
+
+
+def _cenario(caminho, tamanho_lote, concorrencia, latencias_ms, registros, duracao_s, pico_mb,
+             workers=None):
+    return {
+        'path': caminho,
+        'batch_size': tamanho_lote,
+        'concurrency': concorrencia,
+        'workers': workers,
+        'calls': len(latencias_ms),
+        'records_processed': registros,
+        'total_time_ms': duracao_s * 1000,
+        'avg_time_ms': float(np.mean(latencias_ms)),
+        'p50_ms': float(np.percentile(latencias_ms, 50)),
+        'p95_ms': float(np.percentile(latencias_ms, 95)),
+        'p99_ms': float(np.percentile(latencias_ms, 99)),
+        'throughput_per_second': registros / duracao_s if duracao_s > 0 else 0.0,
+        'peak_memory_mb': pico_mb
+    }
+
+
+def _chave(cenario):
+    chave = f"{cenario['path']}[lote={cenario['batch_size']}, clientes={cenario['concurrency']}"
+    if cenario.get('workers'):
+        chave += f", workers={cenario['workers']}"
+    return chave + ']'
+
+
+def executar(pasta_modelos=MODEL_DIR, requisicoes=5000, chamadas_micro=300, tamanhos_micro=(8, 64, 512),
+             lotes=(1_000, 10_000, 100_000, 1_000_000), concorrencias=(1, 2, 4), linhas_streaming=200_000,
+             repeticoes=3, workers=None, semente=42):
+    """
+    Roda todos os cenários e monta o resultado no formato do comparison_analysis.json
+
+    Args:
+        pasta_modelos (str): Pasta dos modelos do notebook
+        requisicoes (int): Voos por cenário do caminho single
+        chamadas_micro (int): Micro-lotes por cenário do caminho micro
+        tamanhos_micro (tuple): Tamanhos de micro-lote
+        lotes (tuple): Tamanhos de lote em memória
+        concorrencias (tuple): Números de clientes simultâneos (single e micro)
+        linhas_streaming (int): Linhas do CSV sintético (0 = sem streaming)
+        repeticoes (int): Repetições de cada lote em memória e do streaming
+        workers (int): Processos do streaming (padrão: número de CPUs)
+        semente (int): Semente do sorteio das entradas
+
+    Returns:
+        dict: Resultado pronto para gravar em JSON
+    """
+    modelo, encoders, metadados = carregar_artefatos(pasta_modelos)
+    feature_names, target_column = metadados['feature_names'], metadados.get('target_column')
+
+    # Os preditores copiam o Booster ao fixar nthread: o modelo carregado não muda
+    preditor_lote = PreditorLote(modelo, encoders, feature_names, target_column, nthread=0)
+
+    base = pd.read_csv(ARQUIVO_VOOS).drop(columns=[target_column], errors='ignore')
+    gerador = np.random.default_rng(semente)
+
+    def sortear(n):
+        return base.iloc[gerador.integers(0, len(base), n)].reset_index(drop=True)
+
+    cenarios = []
+
+    def registrar(cenario):
+        cenarios.append(cenario)
+        pico = cenario['peak_memory_mb']
+        if pico is None:
+            pico = cenario.get('worker_peak_rss_mb')
+            memoria = f"{pico:8.2f} MB RSS/worker" if pico is not None else f"{'-':>8}"
+        else:
+            memoria = f"{pico:8.2f} MB"
+        print(f"  {_chave(cenario):<46} p50 {cenario['p50_ms']:9.3f}  p95 {cenario['p95_ms']:9.3f}  "
+              f"p99 {cenario['p99_ms']:9.3f} ms  {cenario['throughput_per_second']:12,.0f} reg/s  "
+              f"{memoria}")
+
+    print("Caminho single (um voo por requisição):")
+    voos = sortear(requisicoes).to_dict('records')
+    fabrica = lambda: PreditorTempoReal(modelo, encoders, feature_names, target_column).prever
+    for concorrencia in concorrencias:
+        latencias, duracao = _executar_clientes(fabrica, voos, concorrencia)
+        pico = _pico_memoria(lambda: _executar_clientes(fabrica, voos[:concorrencia * 50], concorrencia))
+        registrar(_cenario('single', 1, concorrencia, latencias, len(voos), duracao, pico))
+
+    print("Caminho micro (lista de voos -> DataFrame -> modelo):")
+
+    def fabrica():
+        # Um preditor por cliente, com uma thread, como no caminho single
+        preditor = PreditorLote(modelo, encoders, feature_names, target_column, nthread=1)
+        return lambda lote: preditor.prever(pd.DataFrame(lote))
+
+    for tamanho in tamanhos_micro:
+        micro_lotes = [sortear(tamanho).to_dict('records') for _ in range(chamadas_micro)]
+        for concorrencia in concorrencias:
+            latencias, duracao = _executar_clientes(fabrica, micro_lotes, concorrencia)
+            pico = _pico_memoria(lambda: _executar_clientes(fabrica, micro_lotes[:concorrencia * 5],
+                                                            concorrencia))
+            registrar(_cenario('micro', tamanho, concorrencia, latencias, tamanho * len(micro_lotes),
+                               duracao, pico))
+
+    print("Caminho batch (DataFrame em memória):")
+    for tamanho in lotes:
+        lote = sortear(tamanho)
+        latencias, duracao = _executar_clientes(lambda: preditor_lote.prever, [lote] * repeticoes, 1)
+        pico = _pico_memoria(lambda: preditor_lote.prever(lote))
+        registrar(_cenario('batch', tamanho, 1, latencias, tamanho * repeticoes, duracao, pico))
+
+    if linhas_streaming:
+        workers = workers or os.cpu_count() or 1
+        print(f"Caminho streaming (CSV -> blocos -> CSV, workers={workers}):")
+        with tempfile.TemporaryDirectory() as pasta:
+            entrada = os.path.join(pasta, 'entrada.csv')
+            saida = os.path.join(pasta, 'saida.csv')
+            gerar_entrada_sintetica(entrada, linhas_streaming, encoders, semente=semente)
+            # Pool criado (e o modelo carregado) antes de medir: as repetições
+            # medem só leitura, pontuação e gravação
+            pool = criar_pool(pasta_modelos, workers)
+            try:
+                arquivo = lambda _: prever_arquivo(entrada, saida, pool=pool)
+                latencias, duracao = _executar_clientes(lambda: arquivo, [None] * repeticoes, 1)
+            finally:
+                pool.close()
+                pool.join()
+        cenario = _cenario('streaming', linhas_streaming, 1, latencias,
+                           linhas_streaming * repeticoes, duracao, None, workers=workers)
+        cenario['worker_peak_rss_mb'] = _pico_rss_filhos()
+        registrar(cenario)
+
+    # Consistência: os mesmos voos pelo caminho single e pelo batch
+    amostra = voos[:1000]
+    preditor = PreditorTempoReal(modelo, encoders, feature_names, target_column)
+    individuais = np.array([preditor.probabilidade_atraso(voo) for voo in amostra])
+    em_lote = preditor_lote.prever(pd.DataFrame(amostra))['probability_delay'].to_numpy()
+
+    tempo_real = next(c for c in cenarios if c['path'] == 'single' and c['concurrency'] == concorrencias[0])
+    batch = max((c for c in cenarios if c['path'] == 'batch'), key=lambda c: c['batch_size'])
+    # Tamanho de lote e concorrência ficam registrados: 'comparar' só confronta
+    # execuções medidas na mesma configuração
+    real_time_metrics = {
+        'concurrency': tempo_real['concurrency'],
+        'records_processed': tempo_real['records_processed'],
+        'avg_time_ms': tempo_real['avg_time_ms'],
+        'total_time_ms': tempo_real['total_time_ms'],
+        'throughput_per_second': tempo_real['throughput_per_second']
+    }
+    batch_metrics = {
+        'batch_size': batch['batch_size'],
+        'records_processed': batch['records_processed'],
+        'avg_time_ms': batch['total_time_ms'] / batch['records_processed'],
+        'total_time_ms': batch['total_time_ms'],
+        'throughput_per_second': batch['throughput_per_second']
+    }
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'real_time_metrics': real_time_metrics,
+        'batch_metrics': batch_metrics,
+        'consistency_analysis': {
+            'correlation': float(np.corrcoef(individuais, em_lote)[0, 1]),
+            'samples_compared': len(amostra),
+            'max_abs_difference': float(np.abs(individuais - em_lote).max())
+        },
+        'performance_ratio': {
+            'speed_improvement': real_time_metrics['avg_time_ms'] / batch_metrics['avg_time_ms'],
+            'throughput_improvement': (batch_metrics['throughput_per_second']
+                                       / real_time_metrics['throughput_per_second'])
+        },
+        'environment': coletar_ambiente(pasta_modelos),
+        'config': {
+            'seed': semente,
+            'single_requests': requisicoes,
+            'micro_calls': chamadas_micro,
+            'micro_batch_sizes': list(tamanhos_micro),
+            'batch_sizes': list(lotes),
+            'concurrency_levels': list(concorrencias),
+            'streaming_rows': linhas_streaming,
+            'repetitions': repeticoes,
+            'peak_memory': 'tracemalloc (Python + NumPy/pandas) do processo principal; '
+                           'streaming: null, com worker_peak_rss_mb (ru_maxrss dos workers)'
+        },
+        'scenarios': cenarios
+    }
+
+
+def comparar_resultados(base, novo, tolerancia=0.10):
+    """
+    Compara dois resultados e aponta regressões acima da tolerância
+
+    Compara real_time_metrics, batch_metrics e cada cenário presente nos
+    dois arquivos (mesmo caminho, tamanho de lote e concorrência). Métricas
+    agregadas medidas com tamanho de lote ou concorrência diferentes são
+    puladas com um aviso. Aceita como base o comparison_analysis.json
+    original do notebook.
+
+    Args:
+        base (dict): Resultado de referência
+        novo (dict): Resultado a avaliar
+        tolerancia (float): Variação relativa tolerada (0.10 = 10%)
+
+    Returns:
+        list: Regressões {'item', 'metric', 'base', 'new', 'variation'}
+    """
+    pares = []
+    for item, campo in (('real_time_metrics', 'concurrency'), ('batch_metrics', 'batch_size')):
+        antes, depois = base.get(item, {}), novo.get(item, {})
+        if campo in antes and campo in depois and antes[campo] != depois[campo]:
+            print(f"Aviso: {item} com {campo} diferente ({antes[campo]} -> {depois[campo]}); "
+                  "não comparado")
+            continue
+        pares.append((item, antes, depois))
+    cenarios_base = {_chave(c): c for c in base.get('scenarios', [])}
+    pares += [(chave, cenarios_base[chave], cenario)
+              for chave, cenario in ((_chave(c), c) for c in novo.get('scenarios', []))
+              if chave in cenarios_base]
+
+    ambiente_base, ambiente_novo = base.get('environment'), novo.get('environment')
+    if not ambiente_base or not ambiente_novo:
+        print("Aviso: arquivo sem 'environment'; não dá para saber se a máquina é a mesma")
+    else:
+        for campo in ('cpu_count', 'processor', 'python', 'xgboost', 'model_sha256'):
+            if ambiente_base.get(campo) != ambiente_novo.get(campo):
+                print(f"Aviso: ambiente diferente em '{campo}': "
+                      f"{ambiente_base.get(campo)} -> {ambiente_novo.get(campo)}")
+
+    regressoes = []
+    print(f"{'Item':<48} {'Métrica':<22} {'Base':>12} {'Novo':>12} {'Variação':>9}")
+    for item, antes, depois in pares:
+        for metrica, sentido in METRICAS_COMPARADAS.items():
+            if not antes.get(metrica) or depois.get(metrica) is None:
+                continue
+            variacao = (depois[metrica] - antes[metrica]) / antes[metrica]
+            regressao = sentido * variacao > tolerancia
+            print(f"{item:<48} {metrica:<22} {antes[metrica]:>12.4g} {depois[metrica]:>12.4g} "
+                  f"{variacao:>+8.1%}{'  REGRESSÃO' if regressao else ''}")
+            if regressao:
+                regressoes.append({'item': item, 'metric': metrica, 'base': antes[metrica],
+                                   'new': depois[metrica], 'variation': variacao})
+
+    correlacao = novo.get('consistency_analysis', {}).get('correlation')
+    if correlacao is not None and correlacao < 0.999:
+        regressoes.append({'item': 'consistency_analysis', 'metric': 'correlation',
+                           'base': base.get('consistency_analysis', {}).get('correlation'),
+                           'new': correlacao, 'variation': None})
+        print(f"Consistência single x batch abaixo de 0.999: {correlacao:.6f}  REGRESSÃO")
+
+    print(f"\n{len(regressoes)} regressão(ões) acima de {tolerancia:.0%}")
+    return regressoes
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Benchmark de latência e vazão da predição de atrasos')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    rodar = subparsers.add_parser('executar', help='Mede todos os caminhos e grava o JSON')
+    rodar.add_argument('--modelos', default=MODEL_DIR, help='Pasta dos modelos')
+    rodar.add_argument('--saida', default=SAIDA_PADRAO, help='JSON de resultados')
+    rodar.add_argument('--requisicoes', type=int, default=5000, help='Voos por cenário single')
+    rodar.add_argument('--chamadas-micro', type=int, default=300, help='Micro-lotes por cenário')
+    rodar.add_argument('--micro', type=int, nargs='+', default=[8, 64, 512], help='Tamanhos de micro-lote')
+    rodar.add_argument('--lotes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000],
+                       help='Tamanhos de lote em memória')
+    rodar.add_argument('--concorrencia', type=int, nargs='+', default=[1, 2, 4],
+                       help='Clientes simultâneos (single e micro)')
+    rodar.add_argument('--streaming', type=int, default=200_000,
+                       help='Linhas do CSV sintético (0 = sem streaming)')
+    rodar.add_argument('--repeticoes', type=int, default=3)
+    rodar.add_argument('--workers', type=int, help='Processos do streaming (padrão: número de CPUs)')
+    rodar.add_argument('--semente', type=int, default=42)
+
+    comparar = subparsers.add_parser('comparar', help='Aponta regressões entre dois resultados')
+    comparar.add_argument('base', help='JSON de referência')
+    comparar.add_argument('novo', help='JSON a avaliar')
+    comparar.add_argument('--tolerancia', type=float, default=0.10,
+                          help='Variação relativa tolerada (padrão: 0.10)')
+    args = parser.parse_args()
+
+    if args.comando == 'executar':
+        if min(args.concorrencia) < 1:
+            parser.error("--concorrencia precisa ser pelo menos 1")
+        if max(args.concorrencia) > min(args.requisicoes, args.chamadas_micro):
+            parser.error(f"--concorrencia {max(args.concorrencia)} maior que --requisicoes "
+                         f"({args.requisicoes}) ou --chamadas-micro ({args.chamadas_micro}): "
+                         "cada cliente precisa de pelo menos uma chamada")
+        # Pickles gerados com outra versão do scikit-learn/XGBoost
+        warnings.filterwarnings('ignore', category=UserWarning)
+        resultado = executar(args.modelos, args.requisicoes, args.chamadas_micro, args.micro, args.lotes,
+                             args.concorrencia, args.streaming, args.repeticoes, args.workers, args.semente)
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        razao = resultado['performance_ratio']
+        print(f"\nBatch: {razao['speed_improvement']:.1f}x menos tempo por predição, "
+              f"{razao['throughput_improvement']:.1f}x mais vazão")
+        print(f"Correlação single x batch: {resultado['consistency_analysis']['correlation']:.6f}")
+        print(f"Resultados salvos em: {args.saida}")
+    elif args.comando == 'comparar':
+        with open(args.base, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        with open(args.novo, encoding='utf-8') as arquivo:
+            novo = json.load(arquivo)
+        if comparar_resultados(base, novo, args.tolerancia):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
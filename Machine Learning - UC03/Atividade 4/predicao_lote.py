@@ -0,0 +1,423 @@
+"""
+Inferência em lote vetorizada e em fluxo (streaming)
+UC03 - Atividade 4 (Implantação e Inferência com XGBoost)
+
+O batch_predict do notebook codifica cada valor com .apply(safe_transform),
+chamando encoder.transform([valor]) por célula, e exige o lote inteiro em
+memória. Aqui cada coluna categórica é codificada de uma vez (pd.Categorical
+com as classes do encoder; -1 marca valor desconhecido e vira 0, o padrão do
+notebook) e arquivos grandes são lidos em blocos, pontuados por um pool de
+processos e acrescentados ao CSV de resultados à medida que ficam prontos.
+
+Uso:
+    python predicao_lote.py flights_delays_120.csv
+    python predicao_lote.py voos.csv --saida results/batch_predictions_results.csv --workers 4
+    python predicao_lote.py --benchmark --linhas 1000000 10000000
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from predicao_tempo_real import (MODEL_DIR, RESULTS_DIR, ROTULOS, carregar_artefatos, compilar_encoders,
+                                 obter_booster)
+
+DESCONHECIDO = -1
+
+# Espera máxima (s) pela carga do modelo em cada worker de criar_pool
+TEMPO_MAX_INICIALIZACAO = 300
+
+
+class PreditorLote:
+    """
+    Pontuação vetorizada de blocos de voos
+    """
+
+    def __init__(self, modelo, encoders, feature_names, target_column=None, nthread=None):
+        """
+        Args:
+            modelo: XGBClassifier treinado ou xgboost.Booster
+            encoders (dict): {coluna: LabelEncoder} ou {coluna: lista de classes}
+            feature_names (list): Ordem das features usada no treino
+            target_column (str): Coluna alvo (ignorada na entrada)
+            nthread (int): Threads do XGBoost (padrão: as do modelo); se
+                informado, o Booster é copiado e o modelo recebido não muda
+        """
+        self.feature_names = list(feature_names)
+        self.target_column = target_column
+        self.classes = {coluna: list(mapa) for coluna, mapa in
+                        compilar_encoders(encoders, target_column).items()}
+
+        self.booster = obter_booster(modelo)
+        if nthread is not None:
+            self.booster = self.booster.copy()
+            self.booster.set_param({'nthread': nthread})
+
+    @classmethod
+    def carregar(cls, pasta_modelos=MODEL_DIR, nthread=None):
+        """
+        Carrega modelo, encoders e metadados salvos pelo notebook
+        """
+        modelo, encoders, metadados = carregar_artefatos(pasta_modelos)
+        return cls(modelo, encoders, metadados['feature_names'],
+                   metadados.get('target_column'), nthread)
+
+    def codificar_coluna(self, nome, serie):
+        """
+        Códigos de uma coluna categórica inteira (DESCONHECIDO para valores fora do vocabulário)
+
+        Colunas que já chegam inteiras (como data/test_data.csv) são tratadas
+        como códigos prontos; códigos fora do intervalo viram DESCONHECIDO.
+        """
+        classes = self.classes[nome]
+        if pd.api.types.is_integer_dtype(serie.dtype):
+            codigos = serie.to_numpy(dtype=np.int64)
+            return np.where((codigos >= 0) & (codigos < len(classes)), codigos, DESCONHECIDO)
+        return pd.Categorical(serie, categories=classes).codes.astype(np.int64)
+
+    def matriz(self, bloco):
+        """
+        Matriz float32 de features na ordem do treino
+
+        Returns:
+            tuple: (numpy.ndarray, {coluna: número de valores desconhecidos})
+        """
+        matriz = np.zeros((len(bloco), len(self.feature_names)), dtype=np.float32)
+        desconhecidos = {}
+
+        for posicao, nome in enumerate(self.feature_names):
+            if nome not in bloco.columns:
+                continue  # reindex(fill_value=0) do notebook
+            if nome in self.classes:
+                codigos = self.codificar_coluna(nome, bloco[nome])
+                ausentes = codigos == DESCONHECIDO
+                if ausentes.any():
+                    desconhecidos[nome] = int(ausentes.sum())
+                    codigos[ausentes] = 0
+                matriz[:, posicao] = codigos
+            else:
+                matriz[:, posicao] = pd.to_numeric(bloco[nome], errors='coerce').fillna(0)
+
+        return matriz, desconhecidos
+
+    def prever(self, bloco):
+        """
+        Predições de um bloco de voos
+
+        Args:
+            bloco (pandas.DataFrame): Voos com valores originais ou já codificados
+
+        Returns:
+            pandas.DataFrame: Entrada mais as colunas de batch_predict
+        """
+        matriz, _ = self.matriz(bloco)
+        probabilidades = self.booster.inplace_predict(matriz, validate_features=False)
+
+        predicoes = (probabilidades > 0.5).astype(np.int64)
+        resultado = bloco.copy()
+        resultado['prediction'] = predicoes
+        resultado['prediction_label'] = np.where(predicoes == 1, ROTULOS[1], ROTULOS[0])
+        resultado['probability_no_delay'] = 1 - probabilidades
+        resultado['probability_delay'] = probabilidades
+        resultado['confidence'] = np.maximum(probabilidades, 1 - probabilidades)
+        return resultado
+
+
+# Estado de cada processo do pool (carregado uma vez no initializer)
+_preditor = None
+
+
+def _inicializar_worker(pasta_modelos, prontos=None):
+    global _preditor
+    warnings.filterwarnings('ignore', category=UserWarning)
+    # Um processo por núcleo: cada um com uma thread evita disputa de CPU
+    try:
+        _preditor = PreditorLote.carregar(pasta_modelos, nthread=1)
+    except Exception as erro:
+        if prontos is not None:
+            prontos.put((os.getpid(), f"{type(erro).__name__}: {erro}"))
+        raise
+    if prontos is not None:
+        prontos.put((os.getpid(), None))
+
+
+def criar_pool(pasta_modelos=MODEL_DIR, workers=None):
+    """
+    Pool com o modelo já carregado em todos os workers
+
+    Só retorna depois que todos os initializers terminaram. Passado a
+    prever_arquivo, evita recarregar o modelo a cada arquivo; quem cria o
+    pool é quem o fecha.
+
+    Args:
+        pasta_modelos (str): Pasta dos modelos
+        workers (int): Processos do pool (padrão: número de CPUs)
+
+    Returns:
+        multiprocessing.pool.Pool: Pool pronto para prever_arquivo
+
+    Raises:
+        RuntimeError: Se a carga do modelo falhar em algum worker ou não
+            terminar em TEMPO_MAX_INICIALIZACAO segundos (o pool recriaria
+            o worker indefinidamente)
+    """
+    workers = workers or os.cpu_count() or 1
+    contexto = mp.get_context('spawn')
+    prontos = contexto.Queue()
+    pool = contexto.Pool(workers, initializer=_inicializar_worker, initargs=(pasta_modelos, prontos))
+    try:
+        for _ in range(workers):
+            try:
+                pid, erro = prontos.get(timeout=TEMPO_MAX_INICIALIZACAO)
+            except queue.Empty:
+                raise RuntimeError(f"Os workers não carregaram o modelo em "
+                                   f"{TEMPO_MAX_INICIALIZACAO}s") from None
+            if erro is not None:
+                raise RuntimeError(f"Falha ao carregar o modelo no worker {pid}: {erro}")
+    except BaseException:
+        pool.terminate()
+        raise
+    return pool
+
+
+def _prever_bloco(bloco):
+    """
+    Pontua um bloco e devolve o CSV já formatado (sem cabeçalho)
+    """
+    resultado = _preditor.prever(bloco)
+    return len(resultado), resultado.to_csv(index=False, header=False)
+
+
+def prever_arquivo(caminho_entrada, caminho_saida=None, pasta_modelos=MODEL_DIR,
+                   tamanho_bloco=500_000, workers=None, pool=None):
+    """
+    Pontua um CSV em blocos, acrescentando os resultados ao CSV de saída
+
+    Os blocos são lidos no processo principal, pontuados e formatados pelos
+    workers, e gravados na ordem de entrada assim que cada um fica pronto.
+
+    Args:
+        caminho_entrada (str): CSV de voos
+        caminho_saida (str): CSV de resultados (padrão: results/batch_predictions_results.csv)
+        pasta_modelos (str): Pasta dos modelos
+        tamanho_bloco (int): Linhas por bloco
+        workers (int): Processos do pool (padrão: número de CPUs; 1 = sem pool)
+        pool (multiprocessing.pool.Pool): Pool de criar_pool a reutilizar; se
+            informado, pasta_modelos e workers são ignorados e o pool não é fechado
+
+    Returns:
+        dict: Linhas processadas, tempo total e linhas por segundo
+    """
+    caminho_saida = caminho_saida or os.path.join(RESULTS_DIR, 'batch_predictions_results.csv')
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(os.path.dirname(os.path.abspath(caminho_saida)), exist_ok=True)
+
+    inicio = time.perf_counter()
+    blocos = pd.read_csv(caminho_entrada, chunksize=tamanho_bloco)
+    primeiro = next(blocos, None)
+    if primeiro is None:
+        raise ValueError(f"Arquivo sem linhas: {caminho_entrada}")
+
+    linhas = 0
+    proprio = None
+    with open(caminho_saida, 'w', encoding='utf-8', newline='') as saida:
+        if pool is not None:
+            resultados = pool.imap(_prever_bloco, _encadear(primeiro, blocos))
+        elif workers == 1:
+            _inicializar_worker(pasta_modelos)
+            _preditor.booster.set_param({'nthread': 0})
+            resultados = map(_prever_bloco, _encadear(primeiro, blocos))
+        else:
+            contexto = mp.get_context('spawn')
+            proprio = contexto.Pool(workers, initializer=_inicializar_worker,
+                                    initargs=(pasta_modelos,))
+            resultados = proprio.imap(_prever_bloco, _encadear(primeiro, blocos))
+
+        try:
+            cabecalho = _cabecalho(primeiro)
+            saida.write(cabecalho)
+            for n, texto in resultados:
+                saida.write(texto)
+                linhas += n
+        finally:
+            if proprio is not None:
+                proprio.close()
+                proprio.join()
+
+    duracao = time.perf_counter() - inicio
+    return {
+        'linhas': linhas,
+        'tempo_s': duracao,
+        'linhas_por_segundo': linhas / duracao if duracao > 0 else 0.0
+    }
+
+
+def _encadear(primeiro, blocos):
+    yield primeiro
+    yield from blocos
+
+
+def _cabecalho(bloco):
+    # Pelo pandas, com as mesmas regras de aspas das linhas gravadas pelos workers
+    colunas = list(bloco.columns) + ['prediction', 'prediction_label', 'probability_no_delay',
+                                     'probability_delay', 'confidence']
+    return pd.DataFrame(columns=colunas).to_csv(index=False)
+
+
+def batch_predict(model, encoders, batch_data, feature_names, target_column=None):
+    """
+    Versão do notebook, usada como referência na verificação e no benchmark
+    """
+    batch_df = batch_data.copy()
+    for col, encoder in encoders.items():
+        if col in batch_df.columns and col != target_column:
+            def safe_transform(value):
+                if value in encoder.classes_:
+                    return encoder.transform([value])[0]
+                return 0
+            batch_df[col] = batch_df[col].apply(safe_transform)
+
+    batch_df = batch_df.reindex(columns=feature_names, fill_value=0)
+    probabilities = model.predict_proba(batch_df)
+    results_df = batch_data.copy()
+    results_df['prediction'] = model.predict(batch_df)
+    results_df['probability_delay'] = probabilities[:, 1]
+    return results_df
+
+
+def gerar_entrada_sintetica(caminho, linhas, encoders, tamanho_bloco=1_000_000, semente=42):
+    """
+    Gera um CSV de voos sorteando valores do vocabulário dos encoders
+    """
+    gerador = np.random.default_rng(semente)
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        for inicio in range(0, linhas, tamanho_bloco):
+            n = min(tamanho_bloco, linhas - inicio)
+            bloco = pd.DataFrame({
+                'airline': gerador.choice(encoders['airline'].classes_, n),
+                'origin': gerador.choice(encoders['origin'].classes_, n),
+                'destination': gerador.choice(encoders['destination'].classes_, n),
+                'departure_hour': gerador.integers(0, 24, n),
+                'day_of_week': gerador.integers(1, 8, n),
+                'weather': gerador.choice(encoders['weather'].classes_, n)
+            })
+            bloco.to_csv(arquivo, index=False, header=inicio == 0)
+
+
+def verificar(caminho_csv, pasta_modelos=MODEL_DIR):
+    """
+    Confere o lote vetorizado contra o batch_predict do notebook
+    """
+    modelo, encoders, metadados = carregar_artefatos(pasta_modelos)
+    preditor = PreditorLote(modelo, encoders, metadados['feature_names'],
+                            metadados.get('target_column'))
+    dados = pd.read_csv(caminho_csv).drop(columns=[metadados.get('target_column')], errors='ignore')
+
+    # O batch_predict do notebook só entende valores em texto: com colunas já
+    # codificadas (data/test_data.csv) todos os códigos cairiam no padrão 0
+    referencia = dados.copy()
+    for coluna in preditor.classes:
+        if coluna in referencia and pd.api.types.is_integer_dtype(referencia[coluna].dtype):
+            referencia[coluna] = encoders[coluna].inverse_transform(referencia[coluna])
+
+    esperado = batch_predict(modelo, encoders, referencia, metadados['feature_names'],
+                             metadados.get('target_column'))
+    obtido = preditor.prever(dados)
+
+    iguais = (np.array_equal(obtido['prediction'], esperado['prediction'])
+              and np.allclose(obtido['probability_delay'], esperado['probability_delay'], atol=1e-6))
+    print(f"Verificação ({len(dados)} voos): {'OK' if iguais else 'DIVERGENTE'}")
+    return iguais
+
+
+def benchmark(tamanhos, pasta_modelos=MODEL_DIR, workers=None, tamanho_bloco=500_000,
+              pasta_temporaria='.'):
+    """
+    Linhas por segundo do fluxo completo (ler CSV, pontuar, gravar CSV)
+
+    Também compara, em memória, a codificação vetorizada com o
+    batch_predict do notebook num lote de 20.000 voos.
+    """
+    modelo, encoders, metadados = carregar_artefatos(pasta_modelos)
+    preditor = PreditorLote(modelo, encoders, metadados['feature_names'],
+                            metadados.get('target_column'))
+
+    entrada = os.path.join(pasta_temporaria, '_benchmark_entrada.csv')
+    saida = os.path.join(pasta_temporaria, '_benchmark_saida.csv')
+    resultados = {}
+
+    try:
+        gerar_entrada_sintetica(entrada, 20_000, encoders)
+        lote = pd.read_csv(entrada)
+        tempos = {}
+        for nome, funcao in (('notebook', lambda: batch_predict(modelo, encoders, lote,
+                                                                metadados['feature_names'])),
+                             ('vetorizado', lambda: preditor.prever(lote))):
+            inicio = time.perf_counter()
+            funcao()
+            tempos[nome] = time.perf_counter() - inicio
+        print(f"Lote em memória ({len(lote):,} voos):")
+        for nome, duracao in tempos.items():
+            print(f"  {nome:<11} {duracao:8.3f}s  {len(lote) / duracao:14,.0f} linhas/s")
+        resultados['memoria'] = {nome: len(lote) / duracao for nome, duracao in tempos.items()}
+
+        print(f"\nFluxo a partir de CSV (workers={workers or os.cpu_count()}):")
+        for linhas in tamanhos:
+            gerar_entrada_sintetica(entrada, linhas, encoders)
+            metricas = prever_arquivo(entrada, saida, pasta_modelos, tamanho_bloco, workers)
+            resultados[linhas] = metricas
+            print(f"  {linhas:>12,} linhas  {metricas['tempo_s']:8.2f}s  "
+                  f"{metricas['linhas_por_segundo']:14,.0f} linhas/s")
+    finally:
+        for caminho in (entrada, saida):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+    return resultados
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Inferência em lote vetorizada e em fluxo')
+    parser.add_argument('arquivo', nargs='?', help='CSV de voos a pontuar')
+    parser.add_argument('--saida', default=os.path.join(RESULTS_DIR, 'batch_predictions_results.csv'),
+                        help='CSV de resultados')
+    parser.add_argument('--modelos', default=MODEL_DIR, help='Pasta dos modelos')
+    parser.add_argument('--workers', type=int, help='Processos do pool (padrão: número de CPUs)')
+    parser.add_argument('--bloco', type=int, default=500_000, help='Linhas por bloco')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Compara com o batch_predict do notebook')
+    parser.add_argument('--benchmark', action='store_true', help='Mede linhas/s com dados sintéticos')
+    parser.add_argument('--linhas', type=int, nargs='+', default=[1_000_000],
+                        help='Tamanhos do benchmark (ex.: 1000000 10000000 100000000)')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore', category=UserWarning)
+
+    if args.benchmark:
+        benchmark(args.linhas, args.modelos, args.workers, args.bloco)
+        return
+
+    if not args.arquivo:
+        parser.error('informe o arquivo de entrada ou --benchmark')
+
+    if args.verificar:
+        verificar(args.arquivo, args.modelos)
+        return
+
+    metricas = prever_arquivo(args.arquivo, args.saida, args.modelos, args.bloco, args.workers)
+    print(f"{metricas['linhas']:,} voos pontuados em {metricas['tempo_s']:.2f}s "
+          f"({metricas['linhas_por_segundo']:,.0f} linhas/s)")
+    print(f"Resultados salvos em: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Predição de um único voo com baixa latência
+UC03 - Atividade 4 (Implantação e Inferência com XGBoost)
+
+O predict_single_flight do notebook monta um DataFrame por requisição, roda
+LabelEncoder.transform coluna a coluna, reordena com reindex e chama
+predict e predict_proba (duas passagens pelo modelo), ~5 ms por voo em
+results/real_time_predictions.csv. Aqui os encoders viram dicionários
+{valor: código} no carregamento, a linha de entrada é um vetor NumPy
+pré-alocado e reutilizado, e o modelo é consultado uma única vez; o rótulo
+sai da própria probabilidade (limiar 0.5, como XGBClassifier.predict).
+
+Uso:
+    python predicao_tempo_real.py
+    python predicao_tempo_real.py --benchmark --requisicoes 5000
+
+No notebook:
+    from predicao_tempo_real import PreditorTempoReal
+    preditor = PreditorTempoReal.carregar('models')
+    preditor.prever({'airline': 'SkyWings', 'origin': 'GRU', 'destination': 'REC',
+                     'departure_hour': 15, 'day_of_week': 5, 'weather': 'Rain'})
+"""
+
+import argparse
+import json
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = 'models'
+RESULTS_DIR = 'results'
+
+ROTULOS = {0: 'No Horário', 1: 'Atrasado'}
+
+# Voo de exemplo da seção "Teste Final de Validação" do notebook
+VOO_EXEMPLO = {
+    'airline': 'SkyWings',
+    'origin': 'GRU',
+    'destination': 'REC',
+    'departure_hour': 15,
+    'day_of_week': 5,
+    'weather': 'Rain'
+}
+
+
+def carregar_artefatos(pasta_modelos=MODEL_DIR):
+    """
+    Carrega os arquivos salvos pelo notebook
+
+    Returns:
+        tuple: (XGBClassifier, {coluna: LabelEncoder}, metadados)
+    """
+    with open(os.path.join(pasta_modelos, 'model_metadata.json'), encoding='utf-8') as arquivo:
+        metadados = json.load(arquivo)
+
+    modelo = joblib.load(os.path.join(pasta_modelos, 'xgboost_flight_delay_model.pkl'))
+    encoders = joblib.load(os.path.join(pasta_modelos, 'label_encoders.pkl'))
+    return modelo, encoders, metadados
+
+
+def compilar_encoders(encoders, target_column=None):
+    """
+    Converte os LabelEncoders em dicionários {valor: código}
+
+    Args:
+        encoders (dict): {coluna: LabelEncoder} salvo em label_encoders.pkl, ou
+            {coluna: lista de classes} como no artefato empacotado
+        target_column (str): Coluna alvo, que é ignorada
+
+    Returns:
+        dict: {coluna: {valor: código}}
+    """
+    return {
+        coluna: {valor: codigo for codigo, valor in
+                 enumerate(np.asarray(getattr(encoder, 'classes_', encoder)).tolist())}
+        for coluna, encoder in encoders.items()
+        if coluna != target_column
+    }
+
+
+def obter_booster(modelo):
+    """
+    Booster de um XGBClassifier (ou o próprio Booster)
+    """
+    return modelo.get_booster() if hasattr(modelo, 'get_booster') else modelo
+
+
+class PreditorTempoReal:
+    """
+    Pontuação de um voo por vez com encoders compilados e linha reutilizada
+
+    Cada chamada preenche a mesma linha pré-alocada (self.linha), então uma
+    instância não pode ser compartilhada entre threads: crie uma por thread.
+    O Booster é copiado, e o nthread=1 fixado aqui não altera o modelo
+    recebido.
+    """
+
+    def __init__(self, modelo, encoders, feature_names, target_column=None):
+        """
+        Args:
+            modelo: XGBClassifier treinado ou xgboost.Booster
+            encoders (dict): {coluna: LabelEncoder} ou {coluna: lista de classes}
+            feature_names (list): Ordem das features usada no treino
+            target_column (str): Coluna alvo (ignorada na entrada)
+        """
+        self.modelo = modelo
+        self.feature_names = list(feature_names)
+        self.mapas = compilar_encoders(encoders, target_column)
+
+        # (posição, coluna, mapa) das categóricas e (posição, coluna) das numéricas
+        self._categoricas = [(i, nome, self.mapas[nome])
+                             for i, nome in enumerate(self.feature_names) if nome in self.mapas]
+        self._numericas = [(i, nome)
+                           for i, nome in enumerate(self.feature_names) if nome not in self.mapas]
+
+        # Para uma linha, o custo é dominado pelo overhead e não pelo cálculo;
+        # uma thread evita acordar o pool do XGBoost a cada requisição
+        self.booster = obter_booster(modelo).copy()
+        self.booster.set_param({'nthread': 1})
+        self.linha = np.zeros((1, len(self.feature_names)), dtype=np.float32)
+
+    @classmethod
+    def carregar(cls, pasta_modelos=MODEL_DIR):
+        """
+        Carrega modelo, encoders e metadados salvos pelo notebook
+        """
+        modelo, encoders, metadados = carregar_artefatos(pasta_modelos)
+        return cls(modelo, encoders, metadados['feature_names'], metadados.get('target_column'))
+
+    def codificar(self, voo):
+        """
+        Preenche a linha pré-alocada com as features do voo
+
+        Valores categóricos não vistos no treino viram 0, como no notebook.
+        Colunas ausentes também ficam com 0 (reindex com fill_value=0).
+
+        Returns:
+            list: Colunas cujo valor não estava no vocabulário do encoder
+        """
+        linha = self.linha[0]
+        desconhecidos = []
+
+        for posicao, nome, mapa in self._categoricas:
+            valor = voo.get(nome)
+            codigo = mapa.get(valor)
+            if codigo is None:
+                if valor is not None:
+                    desconhecidos.append(nome)
+                codigo = 0
+            linha[posicao] = codigo
+
+        for posicao, nome in self._numericas:
+            linha[posicao] = voo.get(nome, 0)
+
+        return desconhecidos
+
+    def probabilidade_atraso(self, voo, desconhecidos=None):
+        """
+        Probabilidade de atraso de um voo (uma única consulta ao modelo)
+
+        Args:
+            voo (dict): Dados do voo com os valores originais (não codificados)
+            desconhecidos (list): Se informada, recebe as colunas cujo valor
+                não estava no vocabulário do encoder
+        """
+        colunas = self.codificar(voo)
+        if desconhecidos is not None:
+            desconhecidos.extend(colunas)
+        # Mesma chamada que XGBClassifier.predict_proba faz internamente,
+        # sem a validação do wrapper do scikit-learn
+        return float(self.booster.inplace_predict(self.linha, validate_features=False)[0])
+
+    def prever(self, voo):
+        """
+        Predição de um único voo
+
+        Args:
+            voo (dict): Dados do voo com os valores originais (não codificados)
+
+        Returns:
+            dict: Mesmas chaves de predict_single_flight
+        """
+        desconhecidos = []
+        try:
+            probabilidade = self.probabilidade_atraso(voo, desconhecidos)
+        except Exception as e:
+            return {'error': str(e), 'input_data': voo}
+
+        for nome in desconhecidos:
+            print(f"Aviso: Valor '{voo[nome]}' não encontrado em {nome}. Usando valor padrão.")
+
+        predicao = int(probabilidade > 0.5)
+        return {
+            'prediction': predicao,
+            'prediction_label': ROTULOS[predicao],
+            'probability_no_delay': 1.0 - probabilidade,
+            'probability_delay': probabilidade,
+            'confidence': max(probabilidade, 1.0 - probabilidade),
+            'input_data': voo
+        }
+
+
+def predict_single_flight(model, encoders, flight_data, feature_names, target_column=None):
+    """
+    Versão do notebook, usada como referência na verificação e no benchmark
+    """
+    input_df = pd.DataFrame([flight_data])
+    for col, encoder in encoders.items():
+        if col in input_df.columns and col != target_column:
+            if input_df[col].iloc[0] in encoder.classes_:
+                input_df[col] = encoder.transform(input_df[col])
+            else:
+                input_df[col] = 0
+
+    input_df = input_df.reindex(columns=feature_names, fill_value=0)
+    prediction = model.predict(input_df)[0]
+    probabilities = model.predict_proba(input_df)[0]
+    return {
+        'prediction': int(prediction),
+        'probability_delay': float(probabilities[1])
+    }
+
+
+def voos_de_teste(encoders, caminho_teste=os.path.join('data', 'test_data.csv')):
+    """
+    Voos de data/test_data.csv com as categorias decodificadas para texto
+    """
+    teste = pd.read_csv(caminho_teste)
+    for coluna, encoder in encoders.items():
+        if coluna in teste.columns:
+            teste[coluna] = encoder.inverse_transform(teste[coluna])
+    return teste.to_dict('records')
+
+
+def verificar(preditor, encoders, voos, metadados):
+    """
+    Confere se a predição rápida coincide com predict_single_flight
+    """
+    divergencias = 0
+    for voo in voos:
+        esperado = predict_single_flight(preditor.modelo, encoders, voo,
+                                         metadados['feature_names'], metadados.get('target_column'))
+        obtido = preditor.prever(voo)
+        if (obtido['prediction'] != esperado['prediction']
+                or abs(obtido['probability_delay'] - esperado['probability_delay']) > 1e-6):
+            divergencias += 1
+
+    print(f"Verificação: {len(voos) - divergencias}/{len(voos)} predições idênticas ao notebook")
+    return divergencias == 0
+
+
+def _latencias(funcao, voos, requisicoes):
+    funcao(voos[0])
+    tempos = np.empty(requisicoes)
+    for i in range(requisicoes):
+        voo = voos[i % len(voos)]
+        inicio = time.perf_counter()
+        funcao(voo)
+        tempos[i] = time.perf_counter() - inicio
+    return tempos * 1000
+
+
+def benchmark(preditor, encoders, voos, metadados, requisicoes=2000):
+    """
+    Latência por requisição (p50/p99 em ms) do notebook e do caminho rápido
+
+    Returns:
+        dict: {método: {'p50_ms', 'p99_ms', 'media_ms', 'throughput_per_second'}}
+    """
+    metodos = {
+        'notebook': lambda voo: predict_single_flight(preditor.modelo, encoders, voo,
+                                                      metadados['feature_names'],
+                                                      metadados.get('target_column')),
+        'rapido': preditor.prever
+    }
+
+    resultados = {}
+    print(f"{'Método':<10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'Média (ms)':>11} {'Req/s':>10}")
+    for nome, funcao in metodos.items():
+        n = requisicoes if nome == 'rapido' else max(requisicoes // 10, 100)
+        tempos = _latencias(funcao, voos, n)
+        resultados[nome] = {
+            'p50_ms': float(np.percentile(tempos, 50)),
+            'p99_ms': float(np.percentile(tempos, 99)),
+            'media_ms': float(tempos.mean()),
+            'throughput_per_second': float(1000 / tempos.mean())
+        }
+        r = resultados[nome]
+        print(f"{nome:<10} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} "
+              f"{r['media_ms']:>11.3f} {r['throughput_per_second']:>10.0f}")
+
+    print(f"\nGanho na mediana: {resultados['notebook']['p50_ms'] / resultados['rapido']['p50_ms']:.1f}x")
+    return resultados
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Predição de um voo com baixa latência')
+    parser.add_argument('--modelos', default=MODEL_DIR, help='Pasta dos modelos')
+    parser.add_argument('--benchmark', action='store_true', help='Mede a latência p50/p99')
+    parser.add_argument('--requisicoes', type=int, default=2000,
+                        help='Requisições no benchmark (padrão: 2000)')
+    args = parser.parse_args()
+
+    # Pickles gerados com outra versão do scikit-learn/XGBoost
+    warnings.filterwarnings('ignore', category=UserWarning)
+
+    modelo, encoders, metadados = carregar_artefatos(args.modelos)
+    preditor = PreditorTempoReal(modelo, encoders, metadados['feature_names'],
+                                 metadados.get('target_column'))
+
+    resultado = preditor.prever(VOO_EXEMPLO)
+    print(f"Dados: {VOO_EXEMPLO}")
+    print(f"  Predição: {resultado['prediction_label']}")
+    print(f"  Probabilidade de atraso: {resultado['probability_delay']:.3f}")
+    print(f"  Confiança: {resultado['confidence']:.3f}\n")
+
+    voos = voos_de_teste(encoders)
+    verificar(preditor, encoders, voos, metadados)
+
+    if args.benchmark:
+        print()
+        benchmark(preditor, encoders, voos, metadados, args.requisicoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Tabela pré-calculada de predições sobre todo o espaço de entrada
+UC03 - Atividade 4 (Implantação e Inferência com XGBoost)
+
+As seis features do modelo (model_metadata.json) têm domínios pequenos:
+5 companhias, 5 origens, 5 destinos, 5 condições de tempo, 24 horas e 7
+dias da semana, ou 105.000 combinações. A etapa de compilação avalia o
+modelo uma única vez sobre o produto cartesiano e guarda as probabilidades
+em um array denso indexado pelas features codificadas. Servir uma predição
+vira uma indexação O(1), sem XGBoost em tempo de execução. Entradas fora
+do vocabulário ou do domínio numérico caem no modelo (artefato_modelo).
+
+Uso:
+    python tabela_predicoes.py compilar
+    python tabela_predicoes.py verificar --amostra 5000
+    python tabela_predicoes.py verificar --voos voos_do_dia.csv
+    python tabela_predicoes.py benchmark
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from artefato_modelo import ARTEFATO_PADRAO, carregar_artefato, exportar_artefato, ler_manifesto
+
+FORMATO_TABELA = 1
+TABELA_PADRAO = os.path.join('models', 'tabela_predicoes.npz')
+ARQUIVO_VOOS = 'flights_delays_120.csv'
+
+ROTULOS = {0: 'No Horário', 1: 'Atrasado'}
+
+# Domínio das features inteiras: [início, fim) como em range()
+DOMINIOS_NUMERICOS = {
+    'departure_hour': (0, 24),
+    'day_of_week': (1, 8)
+}
+
+
+def eixos_entrada(manifesto, dominios=DOMINIOS_NUMERICOS):
+    """
+    Códigos de cada eixo da tabela, na ordem das features
+
+    Categóricas vão de 0 a n-1 (códigos do encoder); inteiras usam o próprio valor.
+
+    Args:
+        manifesto (dict): Precisa de 'feature_names' e 'vocabularios' ({coluna: classes})
+        dominios (dict): {feature inteira: (início, fim)}
+    """
+    eixos = []
+    for nome in manifesto['feature_names']:
+        if nome in manifesto['vocabularios']:
+            eixos.append(np.arange(len(manifesto['vocabularios'][nome])))
+        elif nome in dominios:
+            eixos.append(np.arange(*dominios[nome]))
+        else:
+            raise ValueError(f"Feature '{nome}' sem vocabulário nem domínio numérico; "
+                             "informe-a em DOMINIOS_NUMERICOS")
+    return eixos
+
+
+def compilar_tabela(caminho_artefato=ARTEFATO_PADRAO, destino=TABELA_PADRAO,
+                    dominios=DOMINIOS_NUMERICOS):
+    """
+    Avalia o modelo sobre o produto cartesiano das features e grava a tabela
+
+    Returns:
+        dict: Manifesto da tabela
+    """
+    if not os.path.exists(caminho_artefato):
+        exportar_artefato(destino=caminho_artefato)
+    artefato = carregar_artefato(caminho_artefato)
+    eixos = eixos_entrada(artefato.manifesto, dominios)
+    forma = tuple(len(eixo) for eixo in eixos)
+    grade = np.stack([eixo.ravel() for eixo in np.meshgrid(*eixos, indexing='ij')],
+                     axis=1).astype(np.float32)
+
+    probabilidades = artefato.booster.inplace_predict(grade, validate_features=False)
+    tabela = probabilidades.astype(np.float32).reshape(forma)
+
+    manifesto = {
+        'formato': FORMATO_TABELA,
+        'versao_modelo': artefato.versao,
+        'modelo_sha256': artefato.manifesto['modelo_sha256'],
+        'feature_names': artefato.feature_names,
+        'vocabularios': artefato.vocabularios,
+        'dominios': {nome: list(intervalo) for nome, intervalo in dominios.items()
+                     if nome in artefato.feature_names},
+        'combinacoes': int(tabela.size)
+    }
+
+    temporario = destino + '.tmp.npz'
+    np.savez(temporario, probabilidades=tabela, manifesto=np.array(json.dumps(manifesto)))
+    os.replace(temporario, destino)
+    return manifesto
+
+
+class TabelaPredicoes:
+    """
+    Predições servidas por indexação na tabela compilada
+    """
+
+    def __init__(self, caminho=TABELA_PADRAO, caminho_artefato=ARTEFATO_PADRAO):
+        """
+        Args:
+            caminho (str): Tabela gerada por compilar_tabela
+            caminho_artefato (str): Artefato usado como fallback (carregado sob demanda)
+        """
+        with np.load(caminho) as dados:
+            self.probabilidades = dados['probabilidades']
+            self.manifesto = json.loads(str(dados['manifesto']))
+
+        if self.manifesto.get('formato') != FORMATO_TABELA:
+            raise ValueError(f"Formato de tabela não suportado: {self.manifesto.get('formato')}")
+
+        self.feature_names = self.manifesto['feature_names']
+        self.caminho_artefato = caminho_artefato
+        self._preditor = None
+        self._preditor_lote = None
+
+        # Para cada feature: dicionário valor -> índice no eixo
+        self._indices = []
+        for nome in self.feature_names:
+            if nome in self.manifesto['vocabularios']:
+                valores = self.manifesto['vocabularios'][nome]
+            else:
+                valores = range(*self.manifesto['dominios'][nome])
+            self._indices.append((nome, {valor: i for i, valor in enumerate(valores)}))
+
+    def _fallback(self):
+        if self._preditor is None:
+            artefato = carregar_artefato(self.caminho_artefato)
+            if artefato.manifesto['modelo_sha256'] != self.manifesto['modelo_sha256']:
+                print("Aviso: a tabela foi compilada com outra versão do modelo; recompile-a.")
+            self._preditor = artefato.preditor()
+            self._preditor_lote = artefato.preditor_lote()
+        return self._preditor
+
+    def indice(self, voo):
+        """
+        Posição do voo na tabela, ou None se algum valor estiver fora dela
+        """
+        posicao = []
+        for nome, mapa in self._indices:
+            i = mapa.get(voo.get(nome))
+            if i is None:
+                return None
+            posicao.append(i)
+        return tuple(posicao)
+
+    def probabilidade_atraso(self, voo):
+        """
+        Probabilidade de atraso: tabela se possível, modelo caso contrário
+        """
+        posicao = self.indice(voo)
+        if posicao is None:
+            return self._fallback().probabilidade_atraso(voo)
+        return float(self.probabilidades[posicao])
+
+    def prever(self, voo):
+        """
+        Predição de um único voo
+
+        Returns:
+            dict: Mesmas chaves de predict_single_flight, mais 'source'
+                ('tabela' ou 'modelo')
+        """
+        posicao = self.indice(voo)
+        if posicao is None:
+            resultado = self._fallback().prever(voo)
+            resultado['source'] = 'modelo'
+            return resultado
+
+        probabilidade = float(self.probabilidades[posicao])
+        predicao = int(probabilidade > 0.5)
+        return {
+            'prediction': predicao,
+            'prediction_label': ROTULOS[predicao],
+            'probability_no_delay': 1.0 - probabilidade,
+            'probability_delay': probabilidade,
+            'confidence': max(probabilidade, 1.0 - probabilidade),
+            'input_data': voo,
+            'source': 'tabela'
+        }
+
+    def probabilidades_lote(self, bloco):
+        """
+        Probabilidades de um DataFrame de voos (valores originais)
+
+        Returns:
+            numpy.ndarray: Probabilidade de atraso por linha
+        """
+        indices = []
+        validos = np.ones(len(bloco), dtype=bool)
+        for nome, mapa in self._indices:
+            if nome in self.manifesto['vocabularios']:
+                codigos = pd.Categorical(bloco[nome], categories=list(mapa)).codes.astype(np.int64)
+            else:
+                inicio, fim = self.manifesto['dominios'][nome]
+                valores = pd.to_numeric(bloco[nome], errors='coerce').to_numpy(dtype=np.float64)
+                inteiros = (valores == np.round(valores)) & (valores >= inicio) & (valores < fim)
+                codigos = np.where(inteiros, valores - inicio, -1).astype(np.int64)
+            validos &= codigos >= 0
+            indices.append(np.where(codigos >= 0, codigos, 0))
+
+        probabilidades = self.probabilidades[tuple(indices)].astype(np.float64)
+        if not validos.all():
+            self._fallback()
+            fora = bloco.loc[~validos]
+            matriz, _ = self._preditor_lote.matriz(fora)
+            probabilidades[~validos] = self._preditor_lote.booster.inplace_predict(
+                matriz, validate_features=False)
+        return probabilidades
+
+
+def verificar_consistencia(caminho=TABELA_PADRAO, caminho_artefato=ARTEFATO_PADRAO,
+                           amostra=2000, semente=42, tolerancia=1e-6, arquivo_voos=ARQUIVO_VOOS):
+    """
+    Compara a tabela com o modelo ao vivo, um voo por vez
+
+    Confere a versão do modelo (SHA-256), uma amostra aleatória de
+    combinações e os voos de arquivo_voos (CSV com as colunas originais).
+
+    Returns:
+        bool: True se todas as diferenças estiverem dentro da tolerância
+    """
+    tabela = TabelaPredicoes(caminho, caminho_artefato)
+    preditor = carregar_artefato(caminho_artefato).preditor()
+
+    mesmo_modelo = ler_manifesto(caminho_artefato)['modelo_sha256'] == tabela.manifesto['modelo_sha256']
+    print(f"Versão do modelo: {'OK' if mesmo_modelo else 'DIFERENTE (recompile a tabela)'}")
+
+    gerador = np.random.default_rng(semente)
+    voos = []
+    for _ in range(amostra):
+        voos.append({nome: list(mapa)[gerador.integers(len(mapa))] for nome, mapa in tabela._indices})
+    voos += pd.read_csv(arquivo_voos).to_dict('records')
+
+    diferencas = np.array([abs(tabela.probabilidade_atraso(voo) - preditor.probabilidade_atraso(voo))
+                           for voo in voos])
+    consistente = mesmo_modelo and diferencas.max() <= tolerancia
+    print(f"Voos comparados: {len(voos)} | diferença máxima: {diferencas.max():.2e} | "
+          f"{'OK' if consistente else 'DIVERGENTE'}")
+    return consistente
+
+
+def benchmark(caminho=TABELA_PADRAO, caminho_artefato=ARTEFATO_PADRAO, requisicoes=20000,
+              arquivo_voos=ARQUIVO_VOOS):
+    """
+    Latência por voo e vazão em lote: tabela vs modelo
+    """
+    tabela = TabelaPredicoes(caminho, caminho_artefato)
+    artefato = carregar_artefato(caminho_artefato)
+    preditor = artefato.preditor()
+    preditor_lote = artefato.preditor_lote()
+
+    voos = pd.read_csv(arquivo_voos).drop(columns=['delayed'], errors='ignore').to_dict('records')
+
+    print(f"{'Método':<8} {'p50 (µs)':>10} {'p99 (µs)':>10}")
+    for nome, funcao in (('modelo', preditor.prever), ('tabela', tabela.prever)):
+        funcao(voos[0])
+        tempos = np.empty(requisicoes)
+        for i in range(requisicoes):
+            inicio = time.perf_counter()
+            funcao(voos[i % len(voos)])
+            tempos[i] = time.perf_counter() - inicio
+        tempos *= 1e6
+        print(f"{nome:<8} {np.percentile(tempos, 50):>10.1f} {np.percentile(tempos, 99):>10.1f}")
+
+    lote = pd.DataFrame(voos).sample(1_000_000, replace=True, random_state=42)
+    print(f"\nLote de {len(lote):,} voos:")
+    for nome, funcao in (('modelo', lambda: preditor_lote.prever(lote)),
+                         ('tabela', lambda: tabela.probabilidades_lote(lote))):
+        inicio = time.perf_counter()
+        funcao()
+        duracao = time.perf_counter() - inicio
+        print(f"  {nome:<8} {duracao:7.3f}s  {len(lote) / duracao:14,.0f} linhas/s")
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Tabela pré-calculada de predições')
+    parser.add_argument('--tabela', default=TABELA_PADRAO, help='Caminho da tabela')
+    parser.add_argument('--artefato', default=ARTEFATO_PADRAO, help='Artefato do modelo')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    subparsers.add_parser('compilar', help='Avalia o modelo em todas as combinações')
+    verificar = subparsers.add_parser('verificar', help='Compara a tabela com o modelo')
+    verificar.add_argument('--amostra', type=int, default=2000)
+    verificar.add_argument('--voos', default=ARQUIVO_VOOS,
+                           help=f'CSV de voos comparados além da amostra (padrão: {ARQUIVO_VOOS})')
+    benchmark_parser = subparsers.add_parser('benchmark', help='Latência e vazão: tabela vs modelo')
+    benchmark_parser.add_argument('--voos', default=ARQUIVO_VOOS,
+                                  help=f'CSV de voos usados nas requisições (padrão: {ARQUIVO_VOOS})')
+    args = parser.parse_args()
+
+    if args.comando == 'compilar':
+        inicio = time.perf_counter()
+        manifesto = compilar_tabela(args.artefato, args.tabela)
+        print(f"Tabela salva em: {args.tabela}")
+        print(f"  {manifesto['combinacoes']:,} combinações "
+              f"({os.path.getsize(args.tabela) / 1024:.0f} KB) em {time.perf_counter() - inicio:.2f}s")
+    elif args.comando == 'verificar':
+        verificar_consistencia(args.tabela, args.artefato, args.amostra, arquivo_voos=args.voos)
+    elif args.comando == 'benchmark':
+        benchmark(args.tabela, args.artefato, arquivo_voos=args.voos)
+
+
+if __name__ == "__main__":
+    main()
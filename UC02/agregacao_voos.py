@@ -0,0 +1,434 @@
+"""
+Agregação de atrasos de voos em blocos (out-of-core)
+UC02 - Laboratório 3
+
+Reproduz as saídas dos notebooks Atv2/Atv3 (pontualidade_por_companhia.csv e
+resumo_analise_voos.csv) lendo o CSV em blocos, com tipos explícitos, e
+mantendo apenas agregados combináveis por companhia, rota e dia da semana.
+O uso de memória depende do número de grupos, não do número de linhas.
+
+Uso:
+    python agregacao_voos.py "atividade3 - Dataset_sint_tico_de_voos.csv"
+    python agregacao_voos.py voos_2024_01.csv --bloco 500000 --saida resultados
+"""
+
+import argparse
+import math
+import os
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Tipos explícitos: evita inferência por bloco e strings como object
+DTYPES = {
+    'FL_DATE': 'string',
+    'OP_UNIQUE_CARRIER': 'category',
+    'TAIL_NUM': 'string',
+    'ORIGIN': 'category',
+    'DEST': 'category',
+    'CRS_DEP_TIME': 'float32',
+    'DEP_DELAY': 'float32',
+    'ARR_DELAY': 'float32',
+    'DISTANCE': 'float32'
+}
+
+COLUNAS = ['FL_DATE', 'OP_UNIQUE_CARRIER', 'ORIGIN', 'DEST', 'DEP_DELAY', 'ARR_DELAY', 'DISTANCE']
+
+DIAS_SEMANA = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira',
+               'Sexta-feira', 'Sábado', 'Domingo']
+
+MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 'Julho',
+         'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
+
+SEPARADOR_ROTA = ' → '
+
+
+def _contar(serie):
+    """
+    Contagem por valor, sem as categorias ausentes do bloco
+    """
+    contagens = serie.value_counts(sort=False)
+    return contagens[contagens > 0].to_dict()
+
+
+class Agregado:
+    """
+    Estatísticas combináveis de uma série numérica
+
+    Guarda contagem, soma e soma dos quadrados dos desvios (M2, algoritmo
+    de Chan) e um histograma esparso com resolução fixa, usado para mediana
+    e quantis aproximados. Com resolução de 1 minuto os quantis são exatos
+    para atrasos inteiros, como nos dados de voos.
+    """
+
+    def __init__(self, resolucao=1.0):
+        self.resolucao = resolucao
+        self.n = 0
+        self.soma = 0.0
+        self.m2 = 0.0
+        self.histograma = Counter()
+
+    @property
+    def media(self):
+        if self.n == 0:
+            return float('nan')
+        return self.soma / self.n
+
+    def atualizar(self, valores):
+        """
+        Incorpora um vetor de valores (NaN são ignorados)
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if valores.size == 0:
+            return self
+
+        bloco = Agregado(self.resolucao)
+        bloco.n = int(valores.size)
+        bloco.soma = float(valores.sum())
+        bloco.m2 = float(((valores - bloco.media) ** 2).sum())
+
+        caixas, contagens = np.unique(np.round(valores / self.resolucao).astype(np.int64),
+                                      return_counts=True)
+        bloco.histograma = Counter(dict(zip(caixas.tolist(), contagens.tolist())))
+
+        return self.combinar(bloco)
+
+    def combinar(self, outro):
+        """
+        Combina outro agregado neste (resultado igual a processar tudo junto)
+        """
+        if outro.resolucao != self.resolucao:
+            raise ValueError("Agregados com resoluções diferentes não podem ser combinados")
+        if outro.n == 0:
+            return self
+        if self.n > 0:
+            delta = outro.media - self.media
+            self.m2 += delta ** 2 * self.n * outro.n / (self.n + outro.n)
+
+        self.n += outro.n
+        self.soma += outro.soma
+        self.m2 += outro.m2
+        self.histograma.update(outro.histograma)
+        return self
+
+    def remover(self, outro):
+        """
+        Desfaz um combinar(outro) anterior (ex.: retirar um dia já agregado)
+        """
+        if outro.n == 0:
+            return self
+        if outro.n > self.n:
+            raise ValueError("Não é possível remover mais valores do que o agregado contém")
+
+        n = self.n - outro.n
+        if n == 0:
+            self.n, self.soma, self.m2 = 0, 0.0, 0.0
+            self.histograma = Counter()
+            return self
+
+        soma = self.soma - outro.soma
+        delta = outro.media - soma / n
+        self.m2 -= outro.m2 + delta ** 2 * n * outro.n / self.n
+        self.n = n
+        self.soma = soma
+        self.histograma.subtract(outro.histograma)
+        self.histograma = +self.histograma
+        return self
+
+    def desvio(self):
+        """
+        Desvio padrão amostral (ddof=1, como no pandas)
+        """
+        if self.n < 2:
+            return float('nan')
+        return math.sqrt(max(self.m2, 0.0) / (self.n - 1))
+
+    def quantil(self, q):
+        """
+        Quantil com interpolação linear entre posições (método padrão do pandas)
+        """
+        if self.n == 0:
+            return float('nan')
+
+        posicao = q * (self.n - 1)
+        inferior, superior = math.floor(posicao), math.ceil(posicao)
+
+        valores = {}
+        acumulado = 0
+        for caixa in sorted(self.histograma):
+            acumulado += self.histograma[caixa]
+            for rank in (inferior, superior):
+                if rank not in valores and rank < acumulado:
+                    valores[rank] = caixa * self.resolucao
+            if superior in valores:
+                break
+
+        return valores[inferior] + (valores[superior] - valores[inferior]) * (posicao - inferior)
+
+    def mediana(self):
+        return self.quantil(0.5)
+
+
+class AgregadorVoos:
+    """
+    Agregados combináveis dos voos por companhia, rota e dia da semana
+    """
+
+    def __init__(self, resolucao=1.0):
+        self.resolucao = resolucao
+
+        self.total_voos = 0
+        self.distancia = Agregado(resolucao)
+
+        self.companhias = Counter()
+        self.origens = Counter()
+        self.destinos = Counter()
+        self.rotas = Counter()
+        self.meses = Counter()
+        self.dias_semana = Counter()
+
+        # Estatísticas de atraso só com voos sem nulos em DEP_DELAY/ARR_DELAY
+        self.atrasos = {'DEP_DELAY': Agregado(resolucao), 'ARR_DELAY': Agregado(resolucao)}
+        self.por_companhia = {}
+        self.por_rota = {}
+        self.por_dia_semana = {}
+
+    def _atualizar_grupos(self, grupos, chaves, bloco):
+        for chave, indices in bloco.groupby(chaves, observed=True, sort=False).indices.items():
+            if chave not in grupos:
+                grupos[chave] = {coluna: Agregado(self.resolucao) for coluna in self.atrasos}
+            for coluna in self.atrasos:
+                grupos[chave][coluna].atualizar(bloco[coluna].to_numpy()[indices])
+
+    def processar_bloco(self, bloco):
+        """
+        Incorpora um bloco (DataFrame) lido do CSV
+        """
+        datas = pd.to_datetime(bloco['FL_DATE'])
+        rotas = bloco['ORIGIN'].astype(str) + SEPARADOR_ROTA + bloco['DEST'].astype(str)
+
+        self.total_voos += len(bloco)
+        self.distancia.atualizar(bloco['DISTANCE'].to_numpy())
+        self.companhias.update(_contar(bloco['OP_UNIQUE_CARRIER']))
+        self.origens.update(_contar(bloco['ORIGIN']))
+        self.destinos.update(_contar(bloco['DEST']))
+        self.rotas.update(_contar(rotas))
+        self.meses.update(_contar(datas.dt.month))
+        self.dias_semana.update(_contar(datas.dt.dayofweek))
+
+        limpo = bloco.dropna(subset=['DEP_DELAY', 'ARR_DELAY'])
+        if limpo.empty:
+            return self
+
+        for coluna, agregado in self.atrasos.items():
+            agregado.atualizar(limpo[coluna].to_numpy())
+
+        self._atualizar_grupos(self.por_companhia, limpo['OP_UNIQUE_CARRIER'].astype(str), limpo)
+        self._atualizar_grupos(self.por_rota, rotas.loc[limpo.index], limpo)
+        self._atualizar_grupos(self.por_dia_semana, datas.loc[limpo.index].dt.dayofweek, limpo)
+
+        return self
+
+    def combinar(self, outro):
+        """
+        Combina os agregados de outro AgregadorVoos (ex.: outro arquivo/processo)
+        """
+        self.total_voos += outro.total_voos
+        self.distancia.combinar(outro.distancia)
+        self.companhias.update(outro.companhias)
+        self.origens.update(outro.origens)
+        self.destinos.update(outro.destinos)
+        self.rotas.update(outro.rotas)
+        self.meses.update(outro.meses)
+        self.dias_semana.update(outro.dias_semana)
+
+        for coluna, agregado in self.atrasos.items():
+            agregado.combinar(outro.atrasos[coluna])
+
+        for grupos, grupos_outro in ((self.por_companhia, outro.por_companhia),
+                                     (self.por_rota, outro.por_rota),
+                                     (self.por_dia_semana, outro.por_dia_semana)):
+            for chave, colunas in grupos_outro.items():
+                if chave not in grupos:
+                    grupos[chave] = {coluna: Agregado(self.resolucao) for coluna in self.atrasos}
+                for coluna, agregado in colunas.items():
+                    grupos[chave][coluna].combinar(agregado)
+
+        return self
+
+    def remover(self, outro):
+        """
+        Desfaz um combinar(outro) anterior, sem reprocessar os demais dados
+        """
+        self.total_voos -= outro.total_voos
+        self.distancia.remover(outro.distancia)
+        for contador, contador_outro in ((self.companhias, outro.companhias),
+                                         (self.origens, outro.origens),
+                                         (self.destinos, outro.destinos),
+                                         (self.rotas, outro.rotas),
+                                         (self.meses, outro.meses),
+                                         (self.dias_semana, outro.dias_semana)):
+            contador.subtract(contador_outro)
+            for chave in [chave for chave, valor in contador.items() if valor <= 0]:
+                del contador[chave]
+
+        for coluna, agregado in self.atrasos.items():
+            agregado.remover(outro.atrasos[coluna])
+
+        for grupos, grupos_outro in ((self.por_companhia, outro.por_companhia),
+                                     (self.por_rota, outro.por_rota),
+                                     (self.por_dia_semana, outro.por_dia_semana)):
+            for chave, colunas in grupos_outro.items():
+                for coluna, agregado in colunas.items():
+                    grupos[chave][coluna].remover(agregado)
+                if grupos[chave]['DEP_DELAY'].n == 0:
+                    del grupos[chave]
+
+        return self
+
+    def _tabela_grupos(self, grupos, nome_indice):
+        linhas = {}
+        for chave, colunas in grupos.items():
+            partida, chegada = colunas['DEP_DELAY'], colunas['ARR_DELAY']
+            linhas[chave] = {
+                'Atraso_Partida_Média': partida.media,
+                'Atraso_Partida_Mediana': partida.mediana(),
+                'Atraso_Partida_Desvio': partida.desvio(),
+                'Num_Voos': partida.n,
+                'Atraso_Chegada_Média': chegada.media,
+                'Atraso_Chegada_Mediana': chegada.mediana(),
+                'Atraso_Chegada_Desvio': chegada.desvio()
+            }
+
+        tabela = pd.DataFrame.from_dict(linhas, orient='index').sort_index().round(2)
+        tabela.index.name = nome_indice
+        return tabela
+
+    def pontualidade_por_companhia(self):
+        """
+        Mesma tabela de pontualidade_por_companhia.csv do notebook Atv3
+        """
+        return self._tabela_grupos(self.por_companhia, 'OP_UNIQUE_CARRIER')
+
+    def pontualidade_por_rota(self):
+        """
+        Estatísticas de atraso por rota (ORIGEM → DESTINO)
+        """
+        return self._tabela_grupos(self.por_rota, 'ROTA')
+
+    def pontualidade_por_dia_semana(self):
+        """
+        Estatísticas de atraso por dia da semana
+        """
+        tabela = self._tabela_grupos(self.por_dia_semana, 'DIA_SEMANA')
+        tabela.index = [DIAS_SEMANA[dia] for dia in tabela.index]
+        tabela.index.name = 'DIA_SEMANA'
+        return tabela
+
+    def resumo(self):
+        """
+        Mesmo resumo executivo de resumo_analise_voos.csv do notebook Atv3
+
+        Sem nenhum voo agregado, as métricas de "mais frequente" ficam None.
+        """
+        voos_por_dia = pd.Series(self.dias_semana).reindex(range(7))
+        atrasos_ok = self.atrasos['DEP_DELAY'].n > 0
+
+        resumo_executivo = {
+            'Total_Voos': self.total_voos,
+            'Companhias_Aereas': len(self.companhias),
+            'Aeroportos_Origem': len(self.origens),
+            'Aeroportos_Destino': len(self.destinos),
+            'Distancia_Media_Milhas': self.distancia.media,
+            'Atraso_Medio_Partida_Min': self.atrasos['DEP_DELAY'].media if atrasos_ok else None,
+            'Atraso_Medio_Chegada_Min': self.atrasos['ARR_DELAY'].media if atrasos_ok else None,
+            'Companhia_Mais_Voos': _mais_comum(self.companhias),
+            'Rota_Mais_Popular': _mais_comum(self.rotas),
+            'Mes_Mais_Movimentado': None,
+            'Dia_Semana_Mais_Movimentado': None
+        }
+        # Sem voos (ex.: todos os dias removidos) os "mais" ficam vazios
+        if self.meses:
+            resumo_executivo['Mes_Mais_Movimentado'] = MESES[_mais_comum(self.meses) - 1]
+        if self.dias_semana:
+            resumo_executivo['Dia_Semana_Mais_Movimentado'] = DIAS_SEMANA[int(voos_por_dia.idxmax())]
+
+        resumo_df = pd.DataFrame([resumo_executivo]).T
+        resumo_df.columns = ['Valor']
+        resumo_df.index.name = 'Métrica'
+        return resumo_df
+
+
+def _mais_comum(contador):
+    """
+    Chave mais frequente de um Counter, ou None se ele estiver vazio
+    """
+    if not contador:
+        return None
+    return contador.most_common(1)[0][0]
+
+
+def ler_em_blocos(caminho_csv, tamanho_bloco=1_000_000):
+    """
+    Lê o CSV de voos em blocos com tipos explícitos
+    """
+    return pd.read_csv(caminho_csv, usecols=COLUNAS, dtype=DTYPES,
+                       chunksize=tamanho_bloco)
+
+
+def agregar_arquivo(caminho_csv, tamanho_bloco=1_000_000, resolucao=1.0):
+    """
+    Agrega um CSV inteiro, um bloco por vez
+
+    Returns:
+        AgregadorVoos: Agregados do arquivo
+    """
+    agregador = AgregadorVoos(resolucao)
+    for bloco in ler_em_blocos(caminho_csv, tamanho_bloco):
+        agregador.processar_bloco(bloco)
+    return agregador
+
+
+def salvar_saidas(agregador, pasta_saida='.'):
+    """
+    Grava pontualidade_por_companhia.csv e resumo_analise_voos.csv
+    """
+    os.makedirs(pasta_saida, exist_ok=True)
+
+    caminho_pontualidade = os.path.join(pasta_saida, 'pontualidade_por_companhia.csv')
+    caminho_resumo = os.path.join(pasta_saida, 'resumo_analise_voos.csv')
+
+    agregador.pontualidade_por_companhia().to_csv(caminho_pontualidade)
+    agregador.resumo().to_csv(caminho_resumo)
+
+    return caminho_pontualidade, caminho_resumo
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Agregação de atrasos de voos em blocos')
+    parser.add_argument('arquivos', nargs='+', help='CSV(s) de voos')
+    parser.add_argument('--bloco', type=int, default=1_000_000,
+                        help='Linhas por bloco (padrão: 1.000.000)')
+    parser.add_argument('--saida', default='.', help='Pasta de saída dos CSVs')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    agregador = AgregadorVoos()
+    for caminho in args.arquivos:
+        print(f"Processando: {caminho}")
+        agregador.combinar(agregar_arquivo(caminho, args.bloco))
+
+    for caminho in salvar_saidas(agregador, args.saida):
+        print(f"Salvo: {caminho}")
+
+    print(f"\nVoos processados: {agregador.total_voos:,} em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Atualização incremental dos resumos de pontualidade
+UC02 - Laboratório 3
+
+Mantém em disco o estado agregado (agregacao_voos.AgregadorVoos) de cada dia
+de voos, além do total acumulado. Acrescentar um arquivo diário combina só
+os dias novos ao total e regrava pontualidade_por_companhia.csv e
+resumo_analise_voos.csv, sem reler o histórico. Um dia reenviado pode ser
+substituído e um dia pode ser retirado.
+
+total.pkl é gravado por último e guarda a assinatura (tamanho e mtime) de
+cada arquivo diário incluído; se uma atualização for interrompida no meio,
+a próxima abertura percebe a divergência e reconstrói o total.
+
+Uso:
+    python atualizacao_diaria.py adicionar voos_2023-01-05.csv
+    python atualizacao_diaria.py adicionar voos_2023-01-05.csv --substituir
+    python atualizacao_diaria.py remover 2023-01-05
+    python atualizacao_diaria.py listar
+    python atualizacao_diaria.py reconstruir
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+import pandas as pd
+
+from agregacao_voos import AgregadorVoos, ler_em_blocos, salvar_saidas
+
+
+def agregar_por_dia(caminho_csv, tamanho_bloco=1_000_000, resolucao=1.0):
+    """
+    Agrega um CSV separando os voos por FL_DATE
+
+    Returns:
+        dict: {'AAAA-MM-DD': AgregadorVoos}
+    """
+    parciais = {}
+    for bloco in ler_em_blocos(caminho_csv, tamanho_bloco):
+        dias = pd.to_datetime(bloco['FL_DATE']).dt.strftime('%Y-%m-%d')
+        for dia, voos_dia in bloco.groupby(dias, sort=False):
+            if dia not in parciais:
+                parciais[dia] = AgregadorVoos(resolucao)
+            parciais[dia].processar_bloco(voos_dia)
+    return parciais
+
+
+def _gravar(objeto, caminho):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as arquivo:
+        pickle.dump(objeto, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+
+
+def _ler(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return pickle.load(arquivo)
+
+
+def _assinatura(caminho):
+    estado = os.stat(caminho)
+    return estado.st_size, estado.st_mtime_ns
+
+
+class EstadoIncremental:
+    """
+    Estado persistido: um agregado por dia e o total acumulado
+    """
+
+    def __init__(self, pasta='estado_voos', resolucao=1.0):
+        """
+        Abre (ou cria) o estado na pasta informada
+        """
+        self.pasta = pasta
+        self.pasta_dias = os.path.join(pasta, 'dias')
+        self.caminho_total = os.path.join(pasta, 'total.pkl')
+        os.makedirs(self.pasta_dias, exist_ok=True)
+
+        self.total = AgregadorVoos(resolucao)
+        registrados = {}
+        if os.path.exists(self.caminho_total):
+            salvo = _ler(self.caminho_total)
+            self.total, registrados = salvo['total'], salvo['dias']
+        if registrados != self._assinaturas():
+            print("Aviso: o total não corresponde aos arquivos diários "
+                  "(atualização interrompida?); reconstruindo")
+            self.reconstruir()
+
+    def _caminho_dia(self, dia):
+        return os.path.join(self.pasta_dias, f'{dia}.pkl')
+
+    def dias(self):
+        """
+        Dias presentes no estado, em ordem
+        """
+        return sorted(nome[:-4] for nome in os.listdir(self.pasta_dias) if nome.endswith('.pkl'))
+
+    def _assinaturas(self):
+        return {dia: _assinatura(self._caminho_dia(dia)) for dia in self.dias()}
+
+    def _gravar_total(self):
+        # Sempre depois dos arquivos diários: é o registro de que a operação terminou
+        _gravar({'dias': self._assinaturas(), 'total': self.total}, self.caminho_total)
+
+    def presentes(self, dias):
+        """
+        Quais dos dias informados já estão no estado
+        """
+        return sorted(dia for dia in dias if os.path.exists(self._caminho_dia(dia)))
+
+    def adicionar_arquivo(self, caminho_csv, substituir=False, tamanho_bloco=1_000_000):
+        """
+        Incorpora os voos de um arquivo (normalmente um dia)
+
+        Args:
+            caminho_csv (str): CSV com os voos novos
+            substituir (bool): Se True, dias já presentes são trocados pelos
+                novos dados; caso contrário geram erro
+            tamanho_bloco (int): Linhas por bloco na leitura
+
+        Returns:
+            list: Dias adicionados ou substituídos
+        """
+        parciais = agregar_por_dia(caminho_csv, tamanho_bloco, self.total.resolucao)
+        return self.incorporar(parciais, substituir)
+
+    def incorporar(self, parciais, substituir=False):
+        """
+        Incorpora agregados diários já calculados (saída de agregar_por_dia)
+
+        Returns:
+            list: Dias adicionados ou substituídos
+        """
+        existentes = self.presentes(parciais)
+        if existentes and not substituir:
+            raise ValueError(f"Dias já presentes no estado: {', '.join(existentes)}")
+
+        for dia in existentes:
+            self.total.remover(_ler(self._caminho_dia(dia)))
+
+        for dia, parcial in parciais.items():
+            self.total.combinar(parcial)
+            _gravar(parcial, self._caminho_dia(dia))
+
+        self._gravar_total()
+        return sorted(parciais)
+
+    def remover_dia(self, dia):
+        """
+        Retira um dia do estado (ex.: dados entregues por engano)
+        """
+        caminho = self._caminho_dia(dia)
+        if not os.path.exists(caminho):
+            raise KeyError(f"Dia não encontrado no estado: {dia}")
+
+        self.total.remover(_ler(caminho))
+        os.remove(caminho)
+        self._gravar_total()
+
+    def reconstruir(self):
+        """
+        Recalcula o total a partir dos agregados diários
+
+        As remoções acumulam pequenos erros de ponto flutuante no desvio
+        padrão; reconstruir periodicamente os elimina.
+        """
+        total = AgregadorVoos(self.total.resolucao)
+        for dia in self.dias():
+            total.combinar(_ler(self._caminho_dia(dia)))
+
+        self.total = total
+        self._gravar_total()
+
+    def salvar_saidas(self, pasta_saida='.'):
+        """
+        Regrava pontualidade_por_companhia.csv e resumo_analise_voos.csv
+        """
+        return salvar_saidas(self.total, pasta_saida)
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Atualização incremental dos resumos de voos')
+    parser.add_argument('--estado', default='estado_voos', help='Pasta do estado agregado')
+    parser.add_argument('--saida', default='.', help='Pasta de saída dos CSVs')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    adicionar = subparsers.add_parser('adicionar', help='Acrescenta arquivos diários')
+    adicionar.add_argument('arquivos', nargs='+')
+    adicionar.add_argument('--substituir', action='store_true',
+                           help='Substitui dias que já estão no estado')
+
+    remover = subparsers.add_parser('remover', help='Retira dias do estado')
+    remover.add_argument('dias', nargs='+', help='Datas no formato AAAA-MM-DD')
+
+    subparsers.add_parser('reconstruir', help='Recalcula o total a partir dos dias')
+    subparsers.add_parser('listar', help='Lista os dias presentes no estado')
+
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    estado = EstadoIncremental(args.estado)
+
+    if args.comando == 'listar':
+        dias = estado.dias()
+        print(f"{len(dias)} dia(s), {estado.total.total_voos:,} voos")
+        for dia in dias:
+            print(f"  {dia}")
+        return
+
+    # Todos os argumentos são conferidos antes de alterar o estado: um erro
+    # no meio deixaria dias gravados sem os CSVs de saída atualizados
+    if args.comando == 'adicionar':
+        lidos, vistos = [], set()
+        for caminho in args.arquivos:
+            try:
+                parciais = agregar_por_dia(caminho, resolucao=estado.total.resolucao)
+            except (OSError, ValueError) as erro:
+                parser.error(f"{caminho}: {erro}")
+            repetidos = sorted(set(estado.presentes(parciais)) | (vistos & set(parciais)))
+            if repetidos and not args.substituir:
+                parser.error(f"{caminho}: dias já presentes no estado: {', '.join(repetidos)}. "
+                             "Use --substituir para trocá-los.")
+            vistos |= set(parciais)
+            lidos.append((caminho, parciais))
+
+        for caminho, parciais in lidos:
+            dias = estado.incorporar(parciais, substituir=args.substituir)
+            print(f"{caminho}: {len(dias)} dia(s) incorporado(s)")
+    elif args.comando == 'remover':
+        dias = list(dict.fromkeys(args.dias))
+        ausentes = [dia for dia in dias if dia not in estado.presentes(dias)]
+        if ausentes:
+            parser.error(f"Dia(s) não encontrado(s) no estado: {', '.join(ausentes)}")
+
+        for dia in dias:
+            estado.remover_dia(dia)
+            print(f"Dia removido: {dia}")
+    elif args.comando == 'reconstruir':
+        estado.reconstruir()
+        print(f"Total reconstruído a partir de {len(estado.dias())} dia(s)")
+
+    for caminho in estado.salvar_saidas(args.saida):
+        print(f"Salvo: {caminho}")
+    print(f"\nTempo: {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Cache colunar tipado para os datasets de voos
+UC02 - Laboratório 3
+
+Converte um CSV de voos em uma pasta com um arquivo binário por coluna:
+companhias/aeroportos como códigos categóricos, atrasos em int16, FL_DATE
+como datetime64 e as colunas derivadas YEAR/MONTH/DAY_OF_WEEK já prontas.
+As colunas são abertas com np.memmap, então recarregar é quase imediato.
+O cache é refeito automaticamente quando o CSV de origem muda.
+
+Uso:
+    python cache_colunar.py "atividade3 - Dataset_sint_tico_de_voos.csv"
+    python cache_colunar.py flights_delays_120.csv --benchmark
+
+No notebook:
+    from cache_colunar import carregar
+    df = carregar('atividade3 - Dataset_sint_tico_de_voos.csv')
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+VERSAO_FORMATO = 1
+PASTA_CACHE = '.cache_colunar'
+
+# Tipo de armazenamento por coluna; colunas desconhecidas são inferidas
+ESQUEMA = {
+    # UC02 - voos sintéticos
+    'FL_DATE': 'data',
+    'OP_UNIQUE_CARRIER': 'categoria',
+    'TAIL_NUM': 'categoria',
+    'ORIGIN': 'categoria',
+    'DEST': 'categoria',
+    'CRS_DEP_TIME': 'int16',
+    'DEP_DELAY': 'int16',
+    'ARR_DELAY': 'int16',
+    'DISTANCE': 'int16',
+    # UC03 - flights_delays_120
+    'airline': 'categoria',
+    'origin': 'categoria',
+    'destination': 'categoria',
+    'weather': 'categoria',
+    'departure_hour': 'int8',
+    'day_of_week': 'int8',
+    'delayed': 'int8'
+}
+
+# Colunas derivadas de FL_DATE (mesmas do notebook Atv3)
+DERIVADAS_DATA = {
+    'YEAR': ('int16', lambda datas: datas.dt.year),
+    'MONTH': ('int8', lambda datas: datas.dt.month),
+    'DAY_OF_WEEK': ('int8', lambda datas: datas.dt.dayofweek)
+}
+
+# Valor reservado para nulos nas colunas inteiras
+SENTINELAS = {tipo: np.iinfo(tipo).min for tipo in ('int8', 'int16', 'int32')}
+
+
+def pasta_do_cache(caminho_csv, pasta_cache=None):
+    """
+    Pasta onde fica o cache de um CSV (padrão: .cache_colunar/<nome> ao lado do CSV)
+    """
+    if pasta_cache:
+        return pasta_cache
+    pasta, nome = os.path.split(os.path.abspath(caminho_csv))
+    return os.path.join(pasta, PASTA_CACHE, nome)
+
+
+def _assinatura(caminho_csv):
+    estado = os.stat(caminho_csv)
+    return {'tamanho': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+
+
+def cache_valido(caminho_csv, pasta_cache=None):
+    """
+    Indica se o cache existe e corresponde à versão atual do CSV
+    """
+    caminho_manifesto = os.path.join(pasta_do_cache(caminho_csv, pasta_cache), 'manifesto.json')
+    if not os.path.exists(caminho_manifesto):
+        return False
+
+    with open(caminho_manifesto, encoding='utf-8') as arquivo:
+        manifesto = json.load(arquivo)
+
+    return (manifesto.get('versao') == VERSAO_FORMATO
+            and manifesto.get('origem') == _assinatura(caminho_csv))
+
+
+def _tipo_coluna(nome, serie):
+    if nome in ESQUEMA:
+        return ESQUEMA[nome]
+    if pd.api.types.is_numeric_dtype(serie):
+        return 'float32'
+    return 'categoria'
+
+
+def _para_inteiro(serie, tipo):
+    valores = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=np.float64)
+    nulos = np.isnan(valores)
+    limites = np.iinfo(tipo)
+    if not nulos.all():
+        minimo, maximo = valores[~nulos].min(), valores[~nulos].max()
+        if minimo <= limites.min or maximo > limites.max:
+            raise ValueError(f"Valores de '{serie.name}' fora do intervalo de {tipo}: "
+                             f"{minimo}..{maximo}")
+    inteiros = np.round(np.where(nulos, 0, valores)).astype(tipo)
+    inteiros[nulos] = SENTINELAS[tipo]
+    return inteiros, int(nulos.sum())
+
+
+def converter_csv(caminho_csv, pasta_cache=None, tamanho_bloco=1_000_000):
+    """
+    Converte o CSV em cache colunar, lendo em blocos
+
+    Returns:
+        dict: Manifesto do cache gerado
+    """
+    destino = pasta_do_cache(caminho_csv, pasta_cache)
+    temporario = destino + '.tmp'
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+
+    assinatura = _assinatura(caminho_csv)
+    colunas = {}
+    vocabularios = {}
+    arquivos = {}
+    linhas = 0
+
+    try:
+        for bloco in pd.read_csv(caminho_csv, chunksize=tamanho_bloco):
+            saida = {}
+
+            for nome in bloco.columns:
+                if nome not in colunas:
+                    colunas[nome] = {'tipo': _tipo_coluna(nome, bloco[nome]), 'nulos': 0}
+                tipo = colunas[nome]['tipo']
+                serie = bloco[nome]
+
+                if tipo == 'categoria':
+                    vocabulario = vocabularios.setdefault(nome, {})
+                    for valor in serie.dropna().astype(str).unique():
+                        vocabulario.setdefault(valor, len(vocabulario))
+                    codigos = pd.Categorical(serie.astype('string'),
+                                             categories=list(vocabulario)).codes
+                    saida[nome] = codigos.astype(np.int32)
+                    colunas[nome]['nulos'] += int((codigos < 0).sum())
+
+                elif tipo == 'data':
+                    datas = pd.to_datetime(serie)
+                    saida[nome] = datas.to_numpy(dtype='datetime64[ns]')
+                    colunas[nome]['nulos'] += int(datas.isna().sum())
+                    for derivada, (tipo_derivada, funcao) in DERIVADAS_DATA.items():
+                        valores, nulos = _para_inteiro(funcao(datas).rename(derivada), tipo_derivada)
+                        colunas.setdefault(derivada, {'tipo': tipo_derivada, 'nulos': 0})
+                        colunas[derivada]['nulos'] += nulos
+                        saida[derivada] = valores
+
+                elif tipo in SENTINELAS:
+                    saida[nome], nulos = _para_inteiro(serie, tipo)
+                    colunas[nome]['nulos'] += nulos
+
+                else:
+                    saida[nome] = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=tipo)
+
+            for nome, valores in saida.items():
+                if nome not in arquivos:
+                    arquivos[nome] = open(os.path.join(temporario, f'{nome}.bin'), 'wb')
+                valores.tofile(arquivos[nome])
+
+            linhas += len(bloco)
+    finally:
+        for arquivo in arquivos.values():
+            arquivo.close()
+
+    for nome, info in colunas.items():
+        armazenamento = {'categoria': 'int32', 'data': 'datetime64[ns]'}
+        info['dtype'] = armazenamento.get(info['tipo'], info['tipo'])
+        if nome in vocabularios:
+            info['categorias'] = list(vocabularios[nome])
+
+    manifesto = {
+        'versao': VERSAO_FORMATO,
+        'origem': assinatura,
+        'linhas': linhas,
+        'colunas': colunas
+    }
+    with open(os.path.join(temporario, 'manifesto.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporario, destino)
+    return manifesto
+
+
+def abrir_colunas(caminho_csv, pasta_cache=None, colunas=None, mmap=True):
+    """
+    Abre as colunas brutas do cache (códigos, inteiros com sentinela, datas)
+
+    Returns:
+        tuple: (manifesto, {nome: numpy.ndarray ou numpy.memmap})
+    """
+    if not cache_valido(caminho_csv, pasta_cache):
+        converter_csv(caminho_csv, pasta_cache)
+
+    pasta = pasta_do_cache(caminho_csv, pasta_cache)
+    with open(os.path.join(pasta, 'manifesto.json'), encoding='utf-8') as arquivo:
+        manifesto = json.load(arquivo)
+
+    arrays = {}
+    for nome, info in manifesto['colunas'].items():
+        if colunas is not None and nome not in colunas:
+            continue
+
+        caminho = os.path.join(pasta, f'{nome}.bin')
+        if mmap and manifesto['linhas'] > 0:
+            arrays[nome] = np.memmap(caminho, dtype=info['dtype'], mode='r',
+                                     shape=(manifesto['linhas'],))
+        else:
+            arrays[nome] = np.fromfile(caminho, dtype=info['dtype'])
+
+    return manifesto, arrays
+
+
+def carregar(caminho_csv, pasta_cache=None, colunas=None, mmap=True):
+    """
+    Carrega o dataset a partir do cache, gerando-o se necessário
+
+    Args:
+        caminho_csv (str): CSV de origem
+        pasta_cache (str): Pasta do cache (opcional)
+        colunas (list): Subconjunto de colunas a carregar (opcional)
+        mmap (bool): Abre as colunas por memory map em vez de ler para a RAM
+
+    Returns:
+        pandas.DataFrame: Dados com tipos compactos
+    """
+    manifesto, arrays = abrir_colunas(caminho_csv, pasta_cache, colunas, mmap)
+
+    dados = {}
+    for nome, valores in arrays.items():
+        info = manifesto['colunas'][nome]
+        if info['tipo'] == 'categoria':
+            dados[nome] = pd.Categorical.from_codes(valores, categories=info['categorias'])
+        elif info['tipo'] in SENTINELAS and info['nulos'] > 0:
+            dados[nome] = pd.arrays.IntegerArray(np.asarray(valores),
+                                                 np.asarray(valores) == SENTINELAS[info['tipo']])
+        else:
+            dados[nome] = valores
+
+    return pd.DataFrame(dados, copy=False)
+
+
+def _rss_mb():
+    if resource is None:
+        return float('nan')
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _medir_read_csv(caminho_csv):
+    rss_antes = _rss_mb()
+    inicio = time.perf_counter()
+    df = pd.read_csv(caminho_csv)
+    if 'FL_DATE' in df.columns:
+        df['FL_DATE'] = pd.to_datetime(df['FL_DATE'])
+    return time.perf_counter() - inicio, _rss_mb() - rss_antes, len(df)
+
+
+def _medir_cache(caminho_csv):
+    rss_antes = _rss_mb()
+    inicio = time.perf_counter()
+    df = carregar(caminho_csv)
+    return time.perf_counter() - inicio, _rss_mb() - rss_antes, len(df)
+
+
+def benchmark(caminho_csv, repeticoes=3):
+    """
+    Compara tempo de carga e aumento de RSS: read_csv vs cache colunar
+
+    Cada medição roda em um processo novo para isolar o pico de memória.
+    """
+    if not cache_valido(caminho_csv):
+        inicio = time.perf_counter()
+        converter_csv(caminho_csv)
+        print(f"Conversão para o cache: {time.perf_counter() - inicio:.3f}s")
+
+    contexto = mp.get_context('spawn')
+    resultados = {}
+    with contexto.Pool(1, maxtasksperchild=1) as pool:
+        for nome, funcao in (('read_csv', _medir_read_csv), ('cache', _medir_cache)):
+            medicoes = [pool.apply(funcao, (caminho_csv,)) for _ in range(repeticoes)]
+            tempos = [tempo for tempo, _, _ in medicoes]
+            resultados[nome] = {
+                'tempo_s': min(tempos),
+                'rss_mb': max(rss for _, rss, _ in medicoes),
+                'linhas': medicoes[0][2]
+            }
+
+    print(f"\n{'Método':<10} {'Linhas':>12} {'Tempo (s)':>12} {'RSS (MB)':>10}")
+    for nome, resultado in resultados.items():
+        print(f"{nome:<10} {resultado['linhas']:>12,} {resultado['tempo_s']:>12.4f} "
+              f"{resultado['rss_mb']:>10.1f}")
+    print(f"\nAceleração da carga: {resultados['read_csv']['tempo_s'] / resultados['cache']['tempo_s']:.1f}x")
+    print("(com mmap, páginas só entram no RSS quando as colunas são lidas)")
+
+    return resultados
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Cache colunar tipado para CSVs de voos')
+    parser.add_argument('arquivo', help='CSV de voos')
+    parser.add_argument('--bloco', type=int, default=1_000_000,
+                        help='Linhas por bloco na conversão (padrão: 1.000.000)')
+    parser.add_argument('--forcar', action='store_true', help='Reconverte mesmo com cache válido')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Compara carga e memória contra pd.read_csv')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.forcar or not cache_valido(args.arquivo):
+        inicio = time.perf_counter()
+        manifesto = converter_csv(args.arquivo, tamanho_bloco=args.bloco)
+        print(f"Cache gerado em {pasta_do_cache(args.arquivo)} "
+              f"({manifesto['linhas']:,} linhas, {time.perf_counter() - inicio:.2f}s)")
+    else:
+        print(f"Cache válido em {pasta_do_cache(args.arquivo)}")
+
+    if args.benchmark:
+        benchmark(args.arquivo, args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
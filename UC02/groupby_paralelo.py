@@ -0,0 +1,463 @@
+"""
+Group-by paralelo com esboços combináveis
+UC02 - Laboratório 3
+
+Divide as linhas do cache colunar (cache_colunar.py) em fatias processadas
+por um pool de processos. Cada worker abre as colunas por memory map e
+devolve um esboço parcial por grupo: contagem, soma, soma dos quadrados e
+um histograma esparso dos valores (para mediana/quantis). Os esboços são
+combinados no processo principal. Para atrasos inteiros (int16) todas as
+estatísticas, inclusive a mediana, são exatas.
+
+Uso:
+    python groupby_paralelo.py "atividade3 - Dataset_sint_tico_de_voos.csv" --verificar
+    python groupby_paralelo.py voos.csv --chaves ORIGIN DEST --workers 8
+    python groupby_paralelo.py voos.csv --benchmark
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache_colunar import DERIVADAS_DATA, SENTINELAS, abrir_colunas, carregar
+
+ESTATISTICAS = ('mean', 'median', 'std', 'count')
+
+# Deslocamento que torna as caixas do histograma não negativas
+DESLOCAMENTO_CAIXA = 2 ** 31
+
+# Chave do histograma = grupo * 2^32 + caixa: com até 2^31 grupos cabe em int64
+MAX_GRUPOS = 2 ** 31
+
+# Limite de linhas por fatia: mantém Σx² de atrasos int16 abaixo de 2^53,
+# onde a acumulação em float64 ainda é exata
+MAX_LINHAS_FATIA = 2_000_000
+
+
+class EsbocoGrupos:
+    """
+    Estatísticas parciais por grupo de uma ou mais colunas de valores
+
+    'grupos' são os identificadores inteiros (ordenados) dos grupos presentes;
+    os demais vetores estão alinhados a eles. 'histogramas' guarda, por
+    coluna, pares (chave, contagem) com chave = grupo * 2^32 + caixa.
+    """
+
+    def __init__(self, grupos, n, somas, quadrados, histogramas, resolucao):
+        self.grupos = grupos
+        self.n = n
+        self.somas = somas
+        self.quadrados = quadrados
+        self.histogramas = histogramas
+        self.resolucao = resolucao
+
+    @classmethod
+    def de_valores(cls, ids, valores, resolucao=1.0):
+        """
+        Calcula o esboço de uma fatia
+
+        Args:
+            ids (numpy.ndarray): Identificador do grupo de cada linha
+            valores (dict): {coluna: numpy.ndarray float64 ou int64}, sem nulos
+            resolucao (float): Largura da caixa do histograma
+        """
+        grupos, inverso = np.unique(ids, return_inverse=True)
+        n = np.bincount(inverso, minlength=len(grupos)).astype(np.int64)
+
+        somas, quadrados, histogramas = {}, {}, {}
+        for coluna, v in valores.items():
+            somas[coluna] = np.bincount(inverso, weights=v, minlength=len(grupos))
+            quadrados[coluna] = np.bincount(inverso, weights=v * v, minlength=len(grupos))
+            if v.dtype.kind == 'i':
+                # Valores inteiros: as somas da fatia são exatas e passam a
+                # ser acumuladas em int64 na combinação
+                somas[coluna] = np.rint(somas[coluna]).astype(np.int64)
+                quadrados[coluna] = np.rint(quadrados[coluna]).astype(np.int64)
+                caixas = v
+            else:
+                caixas = np.round(v / resolucao).astype(np.int64)
+
+            chaves = ids.astype(np.int64) * 2 ** 32 + (caixas + DESLOCAMENTO_CAIXA)
+            histogramas[coluna] = np.unique(chaves, return_counts=True)
+
+        return cls(grupos, n, somas, quadrados, histogramas, resolucao)
+
+    @classmethod
+    def combinar(cls, esbocos):
+        """
+        Combina uma lista de esboços (resultado igual a processar tudo junto)
+        """
+        esbocos = [esboco for esboco in esbocos if len(esboco.grupos) > 0]
+        if not esbocos:
+            return None
+
+        todos = np.concatenate([esboco.grupos for esboco in esbocos])
+        grupos, inverso = np.unique(todos, return_inverse=True)
+        partes = np.split(inverso, np.cumsum([len(esboco.grupos) for esboco in esbocos])[:-1])
+
+        n = np.zeros(len(grupos), dtype=np.int64)
+        somas = {coluna: np.zeros(len(grupos), dtype=v.dtype)
+                 for coluna, v in esbocos[0].somas.items()}
+        quadrados = {coluna: np.zeros(len(grupos), dtype=v.dtype)
+                     for coluna, v in esbocos[0].quadrados.items()}
+
+        for esboco, posicoes in zip(esbocos, partes):
+            n[posicoes] += esboco.n
+            for coluna in somas:
+                somas[coluna][posicoes] += esboco.somas[coluna]
+                quadrados[coluna][posicoes] += esboco.quadrados[coluna]
+
+        histogramas = {}
+        for coluna in somas:
+            chaves = np.concatenate([esboco.histogramas[coluna][0] for esboco in esbocos])
+            contagens = np.concatenate([esboco.histogramas[coluna][1] for esboco in esbocos])
+            unicas, inverso = np.unique(chaves, return_inverse=True)
+            histogramas[coluna] = (unicas, np.bincount(inverso, weights=contagens).astype(np.int64))
+
+        return cls(grupos, n, somas, quadrados, histogramas, esbocos[0].resolucao)
+
+    def media(self, coluna):
+        return self.somas[coluna] / self.n
+
+    def desvio(self, coluna):
+        """
+        Desvio padrão amostral (ddof=1)
+        """
+        n = self.n.astype(np.float64)
+        soma = self.somas[coluna]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if soma.dtype.kind == 'i':
+                # n * Σx² - (Σx)² em inteiros (Python) evita cancelamento
+                numerador = np.array([int(ni) * int(q) - int(s) ** 2 for ni, q, s in
+                                      zip(self.n, self.quadrados[coluna], soma)], dtype=np.float64)
+                variancia = numerador / (n * (n - 1))
+            else:
+                variancia = (self.quadrados[coluna] - soma ** 2 / n) / (n - 1)
+            return np.where(n > 1, np.sqrt(np.maximum(variancia, 0)), np.nan)
+
+    def quantil(self, coluna, q):
+        """
+        Quantil por grupo com interpolação linear (método padrão do pandas)
+        """
+        chaves, contagens = self.histogramas[coluna]
+        caixas = (chaves % 2 ** 32) - DESLOCAMENTO_CAIXA
+        valores = caixas if self.somas[coluna].dtype.kind == 'i' else caixas * self.resolucao
+
+        # Histogramas ordenados por grupo: o deslocamento de cada grupo é a
+        # soma das contagens dos grupos anteriores
+        acumulado = np.cumsum(contagens)
+        deslocamento = np.cumsum(self.n) - self.n
+
+        posicao = q * (self.n - 1)
+        inferior = np.searchsorted(acumulado, deslocamento + np.floor(posicao), side='right')
+        superior = np.searchsorted(acumulado, deslocamento + np.ceil(posicao), side='right')
+
+        fracao = posicao - np.floor(posicao)
+        return valores[inferior] + (valores[superior] - valores[inferior]) * fracao
+
+    def mediana(self, coluna):
+        return self.quantil(coluna, 0.5)
+
+
+def _dominios_chaves(manifesto, arrays, chaves):
+    """
+    Valores presentes (ordenados) de cada chave inteira, sem o sentinela de nulo
+
+    A cardinalidade das chaves inteiras vem desses valores, e não da faixa
+    do tipo: um int16 tem 65.536 valores possíveis, o que estouraria o id
+    em base mista com poucas chaves.
+
+    Returns:
+        dict: {coluna: numpy.ndarray int64}
+    """
+    dominios = {}
+    for nome in chaves:
+        tipo = manifesto['colunas'][nome]['tipo']
+        if tipo in SENTINELAS:
+            coluna = np.asarray(arrays[nome])
+            dominios[nome] = np.unique(coluna[coluna != SENTINELAS[tipo]]).astype(np.int64)
+    return dominios
+
+
+def _decodificadores(manifesto, chaves, dominios):
+    """
+    (rótulos, cardinalidade) de cada chave, na ordem da base mista
+    """
+    decodificadores = []
+    for nome in chaves:
+        info = manifesto['colunas'][nome]
+        if info['tipo'] == 'categoria':
+            rotulos = np.asarray(info['categorias'], dtype=object)
+        elif info['tipo'] in SENTINELAS:
+            if nome not in dominios:
+                raise ValueError(f"Sem o domínio da chave inteira '{nome}'; use o manifesto "
+                                 "devolvido por calcular_esboco")
+            rotulos = dominios[nome]
+        else:
+            raise ValueError(f"Coluna '{nome}' não pode ser usada como chave")
+        decodificadores.append((rotulos, max(len(rotulos), 1)))
+
+    n_grupos = 1
+    for _, cardinalidade in decodificadores:
+        n_grupos *= cardinalidade
+    if n_grupos > MAX_GRUPOS:
+        raise ValueError(f"Combinações possíveis de {chaves} ({n_grupos:,}) passam de "
+                         f"{MAX_GRUPOS:,}: o id do grupo não cabe na chave do histograma")
+    return decodificadores
+
+
+def _codificar_chaves(manifesto, arrays, chaves, dominios):
+    """
+    Combina as colunas-chave em um único id inteiro denso (base mista)
+
+    Args:
+        manifesto (dict): Manifesto do cache colunar
+        arrays (dict): Colunas da fatia
+        chaves (list): Colunas do agrupamento
+        dominios (dict): Saída de _dominios_chaves (calculada sobre todas as linhas)
+
+    Returns:
+        tuple: (ids, válidos)
+    """
+    ids = None
+    validos = None
+
+    for nome, (rotulos, cardinalidade) in zip(chaves, _decodificadores(manifesto, chaves, dominios)):
+        info = manifesto['colunas'][nome]
+        coluna = np.asarray(arrays[nome])
+        if info['tipo'] == 'categoria':
+            codigos = coluna.astype(np.int64)
+            validos_coluna = codigos >= 0
+        else:
+            validos_coluna = coluna != SENTINELAS[info['tipo']]
+            codigos = np.minimum(np.searchsorted(rotulos, coluna), cardinalidade - 1)
+        codigos = np.where(validos_coluna, codigos, 0)
+
+        ids = codigos if ids is None else ids * cardinalidade + codigos
+        validos = validos_coluna if validos is None else validos & validos_coluna
+
+    return ids, validos
+
+
+def _decodificar(ids, decodificadores):
+    rotulos = []
+    for valores, cardinalidade in reversed(decodificadores):
+        rotulos.append(valores[ids % cardinalidade])
+        ids = ids // cardinalidade
+    return list(reversed(rotulos))
+
+
+def _processar_fatia(caminho_csv, inicio, fim, chaves, valores, resolucao, dominios):
+    """
+    Executado em cada worker: esboço das linhas [inicio, fim)
+    """
+    manifesto, arrays = abrir_colunas(caminho_csv, colunas=list(chaves) + list(valores))
+    fatia = {nome: array[inicio:fim] for nome, array in arrays.items()}
+
+    ids, validos = _codificar_chaves(manifesto, fatia, chaves, dominios)
+
+    # Como df.dropna(subset=valores): descarta linhas com qualquer valor nulo
+    colunas_valores = {}
+    for nome in valores:
+        info = manifesto['colunas'][nome]
+        coluna = np.asarray(fatia[nome])
+        if info['tipo'] in SENTINELAS:
+            validos &= coluna != SENTINELAS[info['tipo']]
+            colunas_valores[nome] = coluna.astype(np.int64)
+        else:
+            coluna = coluna.astype(np.float64)
+            validos &= ~np.isnan(coluna)
+            colunas_valores[nome] = coluna
+
+    colunas_valores = {nome: coluna[validos] for nome, coluna in colunas_valores.items()}
+    return EsbocoGrupos.de_valores(ids[validos], colunas_valores, resolucao)
+
+
+def agrupar(caminho_csv, chaves=('OP_UNIQUE_CARRIER',), valores=('DEP_DELAY', 'ARR_DELAY'),
+            estatisticas=ESTATISTICAS, workers=None, fatias_por_worker=4, resolucao=1.0):
+    """
+    Group-by paralelo sobre o cache colunar do CSV
+
+    Equivale a df.dropna(subset=valores).groupby(chaves)[valores].agg(estatisticas)
+
+    Args:
+        caminho_csv (str): CSV de voos (o cache é criado se necessário)
+        chaves (tuple): Colunas categóricas ou inteiras do agrupamento
+        valores (tuple): Colunas numéricas agregadas
+        estatisticas (tuple): Subconjunto de 'mean', 'median', 'std', 'count'
+        workers (int): Processos do pool; 1 executa no próprio processo
+        fatias_por_worker (int): Fatias por worker, para balancear a carga
+        resolucao (float): Largura da caixa do histograma em colunas float
+
+    Returns:
+        pandas.DataFrame: Índice = grupos, colunas = (valor, estatística)
+    """
+    chaves, valores = list(chaves), list(valores)
+    esboco, manifesto = calcular_esboco(caminho_csv, chaves, valores, workers,
+                                        fatias_por_worker, resolucao)
+    return _tabela(esboco, manifesto, chaves, valores, estatisticas)
+
+
+def calcular_esboco(caminho_csv, chaves, valores, workers=None, fatias_por_worker=4,
+                    resolucao=1.0):
+    """
+    Esboço combinado de todas as fatias (para quantis além da mediana)
+
+    Returns:
+        tuple: (EsbocoGrupos ou None se não houver linhas, manifesto do cache
+            com 'dominios_chaves', usado por indice_grupos)
+    """
+    chaves, valores = list(chaves), list(valores)
+    manifesto, arrays = abrir_colunas(caminho_csv, colunas=chaves)
+    linhas = manifesto['linhas']
+
+    # Domínios das chaves inteiras sobre todas as linhas, para que todas as
+    # fatias usem os mesmos ids; valida também o número de grupos
+    dominios = _dominios_chaves(manifesto, arrays, chaves)
+    _decodificadores(manifesto, chaves, dominios)
+    manifesto = dict(manifesto, dominios_chaves=dominios)
+
+    workers = workers or os.cpu_count() or 1
+    num_fatias = max(workers * fatias_por_worker, -(-linhas // MAX_LINHAS_FATIA))
+    num_fatias = max(1, min(num_fatias, linhas))
+    limites = np.linspace(0, linhas, num_fatias + 1).astype(np.int64)
+    tarefas = [(caminho_csv, int(inicio), int(fim), chaves, valores, resolucao, dominios)
+               for inicio, fim in zip(limites[:-1], limites[1:])]
+
+    if workers == 1:
+        esbocos = [_processar_fatia(*tarefa) for tarefa in tarefas]
+    else:
+        # spawn, como nos demais módulos paralelos: o comportamento não muda
+        # com a plataforma e os workers não herdam o estado do processo pai
+        with mp.get_context('spawn').Pool(workers) as pool:
+            esbocos = pool.starmap(_processar_fatia, tarefas)
+
+    return EsbocoGrupos.combinar(esbocos), manifesto
+
+
+def indice_grupos(manifesto, chaves, grupos):
+    """
+    Converte ids de grupos em um índice do pandas com os rótulos originais
+    """
+    decodificadores = _decodificadores(manifesto, chaves, manifesto.get('dominios_chaves', {}))
+    rotulos = _decodificar(grupos, decodificadores)
+    if len(chaves) == 1:
+        return pd.Index(rotulos[0], name=chaves[0])
+    return pd.MultiIndex.from_arrays(rotulos, names=chaves)
+
+
+def _tabela(esboco, manifesto, chaves, valores, estatisticas):
+    colunas = pd.MultiIndex.from_product([valores, list(estatisticas)])
+    if esboco is None:
+        return pd.DataFrame(columns=colunas)
+
+    indice = indice_grupos(manifesto, chaves, esboco.grupos)
+
+    calculos = {
+        'mean': esboco.media,
+        'median': esboco.mediana,
+        'std': esboco.desvio,
+        'count': lambda coluna: esboco.n
+    }
+    dados = {(coluna, estatistica): calculos[estatistica](coluna)
+             for coluna in valores for estatistica in estatisticas}
+
+    return pd.DataFrame(dados, index=indice, columns=colunas).sort_index()
+
+
+def verificar(caminho_csv, chaves=('OP_UNIQUE_CARRIER',), valores=('DEP_DELAY', 'ARR_DELAY'),
+              workers=None):
+    """
+    Compara o resultado paralelo com o groupby do pandas sobre o CSV
+
+    Returns:
+        bool: True se todas as estatísticas coincidem
+    """
+    chaves, valores = list(chaves), list(valores)
+    df = pd.read_csv(caminho_csv)
+    if 'FL_DATE' in df.columns:
+        datas = pd.to_datetime(df['FL_DATE'])
+        for derivada, (_, funcao) in DERIVADAS_DATA.items():
+            df[derivada] = funcao(datas)
+
+    esperado = (df.dropna(subset=valores)
+                  .groupby(chaves)[valores]
+                  .agg(list(ESTATISTICAS)))
+
+    obtido = agrupar(caminho_csv, chaves, valores, workers=workers)
+    obtido = obtido.reindex(index=esperado.index)
+
+    iguais = np.allclose(obtido.to_numpy(dtype=np.float64), esperado.to_numpy(dtype=np.float64),
+                         rtol=1e-9, atol=1e-9, equal_nan=True)
+    print(f"Verificação {chaves} x {valores}: {'OK' if iguais else 'DIVERGENTE'} "
+          f"({len(esperado)} grupos)")
+    if not iguais:
+        print((obtido - esperado).abs().max())
+    return iguais
+
+
+def benchmark(caminho_csv, chaves=('OP_UNIQUE_CARRIER',), valores=('DEP_DELAY', 'ARR_DELAY'),
+              max_workers=None, repeticoes=3):
+    """
+    Mede o tempo do group-by paralelo para 1, 2, 4, ... workers e o do pandas
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    agrupar(caminho_csv, chaves, valores, workers=1)  # garante o cache
+
+    df = carregar(caminho_csv, colunas=list(chaves) + list(valores))
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        df.dropna(subset=list(valores)).groupby(list(chaves), observed=True)[list(valores)] \
+          .agg(list(ESTATISTICAS))
+    tempo_pandas = (time.perf_counter() - inicio) / repeticoes
+    print(f"Linhas: {len(df):,}")
+    print(f"pandas (1 núcleo, dados em cache): {tempo_pandas:.3f}s")
+
+    tempos = {}
+    workers = 1
+    while workers <= max_workers:
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            agrupar(caminho_csv, chaves, valores, workers=workers)
+        tempos[workers] = (time.perf_counter() - inicio) / repeticoes
+        print(f"{workers:>3} worker(s): {tempos[workers]:.3f}s "
+              f"(aceleração {tempos[1] / tempos[workers]:.2f}x, "
+              f"eficiência {tempos[1] / tempos[workers] / workers:.0%})")
+        workers *= 2
+
+    return tempo_pandas, tempos
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Group-by paralelo de atrasos de voos')
+    parser.add_argument('arquivo', help='CSV de voos')
+    parser.add_argument('--chaves', nargs='+', default=['OP_UNIQUE_CARRIER'])
+    parser.add_argument('--valores', nargs='+', default=['DEP_DELAY', 'ARR_DELAY'])
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Número de processos (padrão: número de CPUs)')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Compara o resultado com o groupby do pandas')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Mede a escalabilidade com o número de workers')
+    args = parser.parse_args()
+
+    if args.verificar:
+        verificar(args.arquivo, args.chaves, args.valores, args.workers)
+    elif args.benchmark:
+        benchmark(args.arquivo, args.chaves, args.valores, args.workers)
+    else:
+        inicio = time.perf_counter()
+        tabela = agrupar(args.arquivo, args.chaves, args.valores, workers=args.workers)
+        print(tabela.round(2).to_string())
+        print(f"\nTempo: {time.perf_counter() - inicio:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Índice de rotas codificadas como inteiros
+UC02 - Laboratório 3
+
+Nos notebooks as rotas são montadas por concatenação de strings
+(df['ORIGIN'] + ' → ' + df['DEST']) e contadas com value_counts(), o que cria
+uma string Python por linha. Aqui cada rota é o inteiro
+origem * num_aeroportos + destino, calculado sobre os códigos categóricos do
+cache colunar; as contagens saem de um np.bincount e os rótulos legíveis são
+montados apenas para as k rotas do resultado.
+
+Uso:
+    python indice_rotas.py "atividade3 - Dataset_sint_tico_de_voos.csv" --top 10
+    python indice_rotas.py voos.csv --top 20 --verificar
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from agregacao_voos import SEPARADOR_ROTA
+from cache_colunar import SENTINELAS, abrir_colunas
+from groupby_paralelo import EsbocoGrupos
+
+
+class IndiceRotas:
+    """
+    Rotas (origem, destino) empacotadas em um único inteiro por voo
+    """
+
+    def __init__(self, aeroportos, rotas, atrasos=None):
+        """
+        Args:
+            aeroportos (list): Vocabulário único de aeroportos (origem e destino)
+            rotas (numpy.ndarray): Id da rota de cada voo (-1 se origem/destino nulos)
+            atrasos (dict): {coluna: numpy.ndarray int64} mais '_validos', a
+                máscara dos voos sem atrasos nulos (opcional)
+        """
+        self.aeroportos = list(aeroportos)
+        self.num_aeroportos = len(self.aeroportos)
+        self.rotas = rotas
+        self.atrasos = atrasos or {}
+        self._contagens = None
+
+    @classmethod
+    def de_csv(cls, caminho_csv, colunas_atraso=('DEP_DELAY', 'ARR_DELAY')):
+        """
+        Monta o índice a partir do cache colunar do CSV
+        """
+        colunas_atraso = list(colunas_atraso)
+        manifesto, arrays = abrir_colunas(caminho_csv, colunas=['ORIGIN', 'DEST'] + colunas_atraso)
+        categorias_origem = manifesto['colunas']['ORIGIN']['categorias']
+        categorias_destino = manifesto['colunas']['DEST']['categorias']
+
+        # Vocabulário comum: traduz os códigos de ORIGIN e DEST por tabela
+        aeroportos = list(dict.fromkeys(categorias_origem + categorias_destino))
+        posicao = {aeroporto: i for i, aeroporto in enumerate(aeroportos)}
+        mapa_origem = np.array([posicao[a] for a in categorias_origem] + [-1], dtype=np.int64)
+        mapa_destino = np.array([posicao[a] for a in categorias_destino] + [-1], dtype=np.int64)
+
+        # O código -1 (nulo) indexa o último elemento do mapa, que é -1
+        origens = mapa_origem[np.asarray(arrays['ORIGIN'])]
+        destinos = mapa_destino[np.asarray(arrays['DEST'])]
+        rotas = np.where((origens >= 0) & (destinos >= 0),
+                         origens * len(aeroportos) + destinos, -1)
+
+        # Estatísticas de atraso como no notebook: só voos sem nulos nos atrasos
+        atrasos = {}
+        validos = rotas >= 0
+        for nome in colunas_atraso:
+            info = manifesto['colunas'][nome]
+            coluna = np.asarray(arrays[nome])
+            validos &= coluna != SENTINELAS[info['tipo']]
+            atrasos[nome] = coluna.astype(np.int64)
+        atrasos['_validos'] = validos
+
+        return cls(aeroportos, rotas, atrasos)
+
+    def contagens(self):
+        """
+        Número de voos de cada rota (vetor indexado pelo id da rota)
+        """
+        if self._contagens is None:
+            rotas = self.rotas[self.rotas >= 0]
+            self._contagens = np.bincount(rotas, minlength=self.num_aeroportos ** 2)
+        return self._contagens
+
+    def num_rotas(self):
+        """
+        Número de rotas distintas (df['ROTA'].nunique())
+        """
+        return int(np.count_nonzero(self.contagens()))
+
+    def rotulo(self, rota):
+        """
+        Rótulo legível de uma rota ('GRU → SFO')
+        """
+        origem, destino = divmod(int(rota), self.num_aeroportos)
+        return f"{self.aeroportos[origem]}{SEPARADOR_ROTA}{self.aeroportos[destino]}"
+
+    def codificar(self, origem, destino):
+        """
+        Id da rota a partir dos códigos IATA
+        """
+        return self.aeroportos.index(origem) * self.num_aeroportos + self.aeroportos.index(destino)
+
+    def top_k_ids(self, k=10):
+        """
+        Ids das k rotas com mais voos
+
+        Empates são desfeitos pela ordem da primeira ocorrência, como em
+        value_counts().head(k).
+        """
+        contagens = self.contagens()
+        k = min(k, self.num_rotas())
+        if k == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # Candidatas: todas as rotas com contagem >= k-ésima maior contagem
+        limite = np.partition(contagens, -k)[-k]
+        candidatas = np.flatnonzero(contagens >= max(limite, 1))
+
+        marcadas = np.zeros(len(contagens), dtype=bool)
+        marcadas[candidatas] = True
+        posicoes = np.flatnonzero(marcadas[np.maximum(self.rotas, 0)] & (self.rotas >= 0))
+        ids, primeira = np.unique(self.rotas[posicoes], return_index=True)
+
+        ordem = np.lexsort((primeira, -contagens[ids]))
+        return ids[ordem][:k]
+
+    def estatisticas(self, ids):
+        """
+        Média, mediana, desvio e contagem dos atrasos para as rotas pedidas
+
+        Returns:
+            pandas.DataFrame: Uma linha por rota, na ordem de 'ids'
+        """
+        colunas = [nome for nome in self.atrasos if nome != '_validos']
+        ids = np.asarray(ids, dtype=np.int64)
+
+        marcadas = np.zeros(self.num_aeroportos ** 2, dtype=bool)
+        marcadas[ids] = True
+        selecionadas = self.atrasos['_validos'] & marcadas[np.maximum(self.rotas, 0)]
+
+        esboco = EsbocoGrupos.de_valores(self.rotas[selecionadas],
+                                         {nome: self.atrasos[nome][selecionadas] for nome in colunas})
+
+        tabela = {}
+        if esboco.grupos.size:
+            for nome in colunas:
+                tabela[(nome, 'mean')] = esboco.media(nome)
+                tabela[(nome, 'median')] = esboco.mediana(nome)
+                tabela[(nome, 'std')] = esboco.desvio(nome)
+                tabela[(nome, 'count')] = esboco.n
+        resultado = pd.DataFrame(tabela, index=esboco.grupos)
+        return resultado.reindex(ids)
+
+    def top_k(self, k=10, com_atrasos=True):
+        """
+        As k rotas mais frequentes com rótulo, número de voos e atrasos
+
+        Returns:
+            pandas.DataFrame: Índice 'ROTA' com os rótulos legíveis
+        """
+        ids = self.top_k_ids(k)
+        tabela = pd.DataFrame({'Num_Voos': self.contagens()[ids]}, index=ids)
+
+        if com_atrasos and len(self.atrasos) > 1:
+            atrasos = self.estatisticas(ids)
+            atrasos.columns = [f'{nome}_{estatistica}' for nome, estatistica in atrasos.columns]
+            tabela = tabela.join(atrasos)
+
+        tabela.index = pd.Index([self.rotulo(rota) for rota in ids], name='ROTA')
+        return tabela
+
+
+def verificar(caminho_csv, k=10):
+    """
+    Compara o top-k com o value_counts() de strings do notebook
+    """
+    df = pd.read_csv(caminho_csv)
+    esperado = (df['ORIGIN'] + SEPARADOR_ROTA + df['DEST']).value_counts().head(k)
+
+    indice = IndiceRotas.de_csv(caminho_csv)
+    obtido = indice.top_k(k, com_atrasos=False)['Num_Voos']
+
+    iguais = (list(obtido.index) == list(esperado.index)
+              and list(obtido.values) == list(esperado.values))
+    print(f"Top {k} rotas: {'OK' if iguais else 'DIVERGENTE'}")
+    return iguais
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Top-k de rotas com índice inteiro')
+    parser.add_argument('arquivo', help='CSV de voos')
+    parser.add_argument('--top', type=int, default=10, help='Número de rotas (padrão: 10)')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Compara com value_counts() sobre strings')
+    args = parser.parse_args()
+
+    if args.verificar:
+        verificar(args.arquivo, args.top)
+        return
+
+    inicio = time.perf_counter()
+    indice = IndiceRotas.de_csv(args.arquivo)
+    tabela = indice.top_k(args.top)
+    duracao = time.perf_counter() - inicio
+
+    print(f"Top {args.top} rotas ({indice.num_rotas()} rotas distintas):")
+    print(tabela.round(2).to_string())
+    print(f"\nTempo: {duracao:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""
+Registro local de datasets com cache tipado
+UC02 - Laboratório 3
+
+O notebook Atv1 baixa o zip da coluna vertebral a cada execução, guarda tudo
+em memória (io.BytesIO), extrai e interpreta column_2C_weka.arff com
+scipy.io.arff; a coluna 'class' ainda chega como bytes e precisa ser
+remapeada. Aqui o arquivo é baixado uma única vez para .cache_datasets/,
+conferido por SHA-256 e extraído/interpretado uma única vez para um cache
+binário (numpy .npz + manifesto JSON) com as classes já decodificadas.
+As cargas seguintes só leem esse cache.
+
+Sem rede, o dataset 'vertebral_column_amostra' usa o zip reduzido em
+dados_exemplo/, e qualquer dataset aceita um zip local via --arquivo.
+--verificar também exercita o caminho offline de ponta a ponta com essa
+amostra, em uma pasta de cache temporária.
+
+Desempenho: o ganho real é não baixar o zip a cada execução. A leitura em
+si já é rápida com o ARFF original (~1.3 ms para a amostra contra ~0.9 ms
+pelo cache tipado, 1.5x), então para arquivos deste tamanho o cache tipado
+não muda a ordem de grandeza da carga local.
+
+Uso:
+    python registro_datasets.py --listar
+    python registro_datasets.py vertebral_column_2c
+    python registro_datasets.py vertebral_column_2c --arquivo vertebral_column_data.zip --offline
+    python registro_datasets.py vertebral_column_amostra --verificar --benchmark
+
+No notebook:
+    from registro_datasets import carregar
+    df = carregar('vertebral_column_2c', codificar_classe=True)
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+VERSAO_FORMATO = 1
+PASTA_MODULO = os.path.dirname(os.path.abspath(__file__))
+PASTA_CACHE = os.path.join(PASTA_MODULO, '.cache_datasets')
+
+URL_VERTEBRAL = 'https://archive.ics.uci.edu/ml/machine-learning-databases/00212/vertebral_column_data.zip'
+
+# 'sha256' fixa o conteúdo esperado do arquivo; quando é None, o hash do
+# primeiro download fica registrado em checksums.json e passa a ser exigido
+REGISTRO = {
+    'vertebral_column_2c': {
+        'descricao': 'Coluna vertebral (UCI), classes Normal/Abnormal',
+        'url': URL_VERTEBRAL,
+        'arquivo': 'vertebral_column_data.zip',
+        'sha256': None,
+        'membro': 'column_2C_weka.arff',
+        'classe': 'class',
+        'codigos_classe': {'Abnormal': 1, 'Normal': 0}
+    },
+    'vertebral_column_3c': {
+        'descricao': 'Coluna vertebral (UCI), classes Hernia/Spondylolisthesis/Normal',
+        'url': URL_VERTEBRAL,
+        'arquivo': 'vertebral_column_data.zip',
+        'sha256': None,
+        'membro': 'column_3C_weka.arff',
+        'classe': 'class',
+        'codigos_classe': {'Hernia': 1, 'Spondylolisthesis': 2, 'Normal': 0}
+    },
+    'vertebral_column_amostra': {
+        'descricao': 'Amostra local de 12 pacientes (uso offline)',
+        'local': os.path.join(PASTA_MODULO, 'dados_exemplo', 'vertebral_column_amostra.zip'),
+        'arquivo': 'vertebral_column_amostra.zip',
+        'sha256': '1b883222784baeb8a684f5a4ce89482dd75d9ae27fcce8437cd2e552a5277371',
+        'membro': 'column_2C_weka.arff',
+        'classe': 'class',
+        'codigos_classe': {'Abnormal': 1, 'Normal': 0}
+    }
+}
+
+
+def _entrada(nome):
+    if nome not in REGISTRO:
+        raise KeyError(f"Dataset não registrado: {nome}. "
+                       f"Disponíveis: {', '.join(sorted(REGISTRO))}")
+    return REGISTRO[nome]
+
+
+def _sha256(caminho, tamanho_bloco=1 << 20):
+    resumo = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def _assinatura(caminho):
+    estado = os.stat(caminho)
+    return {'tamanho': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+
+
+def _checksums_registrados(pasta_cache):
+    caminho = os.path.join(pasta_cache, 'checksums.json')
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def _registrar_checksum(pasta_cache, arquivo_zip, digest):
+    checksums = _checksums_registrados(pasta_cache)
+    checksums[arquivo_zip] = digest
+    caminho = os.path.join(pasta_cache, 'checksums.json')
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as arquivo:
+        json.dump(checksums, arquivo, indent=2, sort_keys=True)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def checksum_esperado(nome, pasta_cache=PASTA_CACHE):
+    """
+    SHA-256 exigido para o arquivo do dataset (fixo no registro ou do primeiro download)
+    """
+    entrada = _entrada(nome)
+    return entrada['sha256'] or _checksums_registrados(pasta_cache).get(entrada['arquivo'])
+
+
+def verificar_checksum(nome, caminho, pasta_cache=PASTA_CACHE):
+    """
+    Confere o SHA-256 de um arquivo contra o esperado para o dataset
+
+    Returns:
+        str: Digest calculado
+
+    Raises:
+        ValueError: Se o conteúdo não corresponde ao esperado
+    """
+    digest = _sha256(caminho)
+    esperado = checksum_esperado(nome, pasta_cache)
+    if esperado is not None and digest != esperado:
+        raise ValueError(f"Checksum inválido para {caminho}: {digest} (esperado {esperado}). "
+                         "Apague o arquivo para baixá-lo novamente.")
+    return digest
+
+
+def _baixar(url, destino, tamanho_bloco=1 << 16):
+    import requests
+
+    with requests.get(url, stream=True, timeout=60) as resposta:
+        resposta.raise_for_status()
+        with open(destino, 'wb') as arquivo:
+            for bloco in resposta.iter_content(tamanho_bloco):
+                arquivo.write(bloco)
+
+
+def obter_arquivo(nome, arquivo=None, offline=False, pasta_cache=PASTA_CACHE):
+    """
+    Caminho do arquivo do dataset no cache, copiando ou baixando se preciso
+
+    Args:
+        nome (str): Nome no registro
+        arquivo (str): Zip local a usar no lugar do download (opcional)
+        offline (bool): Se True, nunca acessa a rede
+        pasta_cache (str): Pasta do cache
+
+    Returns:
+        str: Caminho do arquivo conferido no cache
+    """
+    entrada = _entrada(nome)
+    os.makedirs(pasta_cache, exist_ok=True)
+    destino = os.path.join(pasta_cache, entrada['arquivo'])
+    if os.path.exists(destino):
+        return destino
+
+    temporario = destino + '.tmp'
+    origem = arquivo or entrada.get('local')
+    try:
+        if origem:
+            shutil.copyfile(origem, temporario)
+        elif offline or not entrada.get('url'):
+            raise FileNotFoundError(f"{entrada['arquivo']} não está em {pasta_cache} e o "
+                                    "download está desabilitado; informe um zip local.")
+        else:
+            print(f"Baixando {entrada['url']}...")
+            _baixar(entrada['url'], temporario)
+
+        digest = verificar_checksum(nome, temporario, pasta_cache)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    if checksum_esperado(nome, pasta_cache) is None:
+        _registrar_checksum(pasta_cache, entrada['arquivo'], digest)
+    os.replace(temporario, destino)
+    return destino
+
+
+def _ler_arff(texto):
+    """
+    Interpreta o ARFF, decodificando os atributos nominais para str
+    """
+    from scipy.io import arff
+
+    dados, meta = arff.loadarff(io.StringIO(texto))
+    colunas = {}
+    categorias = {}
+    for nome, tipo in zip(meta.names(), meta.types()):
+        if tipo == 'nominal':
+            categorias[nome] = list(meta[nome][1])
+            valores = np.char.decode(dados[nome].astype(bytes), 'utf-8')
+            codigos = pd.Categorical(valores, categories=categorias[nome]).codes
+            colunas[nome] = codigos.astype(np.int8)
+        else:
+            colunas[nome] = dados[nome].astype(np.float64)
+    return colunas, categorias
+
+
+def pasta_do_dataset(nome, pasta_cache=PASTA_CACHE):
+    """
+    Pasta com o ARFF extraído e o cache tipado de um dataset
+    """
+    return os.path.join(pasta_cache, nome)
+
+
+def _ler_manifesto(nome, pasta_cache):
+    caminho = os.path.join(pasta_do_dataset(nome, pasta_cache), 'manifesto.json')
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def cache_valido(nome, pasta_cache=PASTA_CACHE):
+    """
+    Indica se o cache tipado existe e corresponde ao arquivo atual do dataset
+    """
+    manifesto = _ler_manifesto(nome, pasta_cache)
+    if manifesto is None or manifesto.get('versao') != VERSAO_FORMATO:
+        return False
+
+    caminho_zip = os.path.join(pasta_cache, _entrada(nome)['arquivo'])
+    return os.path.exists(caminho_zip) and manifesto.get('origem') == _assinatura(caminho_zip)
+
+
+def preparar(nome, arquivo=None, offline=False, pasta_cache=PASTA_CACHE):
+    """
+    Confere o arquivo, extrai o ARFF e grava o cache tipado
+
+    Returns:
+        dict: Manifesto do cache gerado
+    """
+    entrada = _entrada(nome)
+    caminho_zip = obter_arquivo(nome, arquivo, offline, pasta_cache)
+    digest = verificar_checksum(nome, caminho_zip, pasta_cache)
+
+    destino = pasta_do_dataset(nome, pasta_cache)
+    temporario = destino + '.tmp'
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+
+    with zipfile.ZipFile(caminho_zip) as pacote:
+        texto = pacote.read(entrada['membro']).decode('utf-8')
+    with open(os.path.join(temporario, entrada['membro']), 'w', encoding='utf-8') as saida:
+        saida.write(texto)
+
+    colunas, categorias = _ler_arff(texto)
+    np.savez(os.path.join(temporario, 'dados.npz'), **colunas)
+
+    manifesto = {
+        'versao': VERSAO_FORMATO,
+        'origem': _assinatura(caminho_zip),
+        'sha256': digest,
+        'membro': entrada['membro'],
+        'linhas': len(next(iter(colunas.values()))),
+        'colunas': {nome_coluna: {'dtype': str(valores.dtype)}
+                    for nome_coluna, valores in colunas.items()}
+    }
+    for nome_coluna, lista in categorias.items():
+        manifesto['colunas'][nome_coluna]['categorias'] = lista
+
+    with open(os.path.join(temporario, 'manifesto.json'), 'w', encoding='utf-8') as saida:
+        json.dump(manifesto, saida, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporario, destino)
+    return manifesto
+
+
+def carregar(nome, codificar_classe=False, arquivo=None, offline=False, pasta_cache=PASTA_CACHE):
+    """
+    Carrega o dataset a partir do cache tipado, preparando-o se necessário
+
+    Args:
+        nome (str): Nome no registro
+        codificar_classe (bool): Se True, a classe vem como inteiro segundo
+            'codigos_classe' do registro (ex.: Abnormal=1, Normal=0, como o
+            class_mapper do notebook); caso contrário, como categoria de str
+        arquivo (str): Zip local a usar no lugar do download (opcional)
+        offline (bool): Se True, nunca acessa a rede
+        pasta_cache (str): Pasta do cache
+
+    Returns:
+        pandas.DataFrame: Atributos em float64 e a coluna de classe decodificada
+            (com classes ausentes, a versão codificada usa Int64 com NA)
+    """
+    if not cache_valido(nome, pasta_cache):
+        preparar(nome, arquivo, offline, pasta_cache)
+
+    manifesto = _ler_manifesto(nome, pasta_cache)
+    entrada = _entrada(nome)
+
+    dados = {}
+    with np.load(os.path.join(pasta_do_dataset(nome, pasta_cache), 'dados.npz')) as arrays:
+        for nome_coluna, info in manifesto['colunas'].items():
+            valores = arrays[nome_coluna]
+            if 'categorias' not in info:
+                dados[nome_coluna] = valores
+            elif codificar_classe and nome_coluna == entrada['classe']:
+                mapa = np.array([entrada['codigos_classe'][c] for c in info['categorias']],
+                                dtype=np.int64)
+                # Classe ausente ('?' no ARFF) tem código -1: vira NA, como no
+                # map() do notebook, em vez de indexar o último rótulo
+                faltantes = valores < 0
+                codigos = mapa[np.where(faltantes, 0, valores)]
+                if faltantes.any():
+                    codigos = pd.arrays.IntegerArray(codigos, faltantes)
+                dados[nome_coluna] = codigos
+            else:
+                dados[nome_coluna] = pd.Categorical.from_codes(valores, categories=info['categorias'])
+
+    return pd.DataFrame(dados, copy=False)
+
+
+def listar(pasta_cache=PASTA_CACHE):
+    """
+    Datasets registrados e se já estão no cache
+
+    Returns:
+        pandas.DataFrame: Uma linha por dataset
+    """
+    linhas = []
+    for nome, entrada in REGISTRO.items():
+        linhas.append({
+            'dataset': nome,
+            'descricao': entrada['descricao'],
+            'arquivo': entrada['arquivo'],
+            'em_cache': cache_valido(nome, pasta_cache)
+        })
+    return pd.DataFrame(linhas).set_index('dataset')
+
+
+def _carregar_como_notebook(nome, pasta_cache=PASTA_CACHE):
+    """
+    Caminho original do notebook: zip em memória, scipy.io.arff e replace()
+    """
+    from scipy.io import arff
+
+    entrada = _entrada(nome)
+    with open(os.path.join(pasta_cache, entrada['arquivo']), 'rb') as arquivo:
+        pacote = zipfile.ZipFile(io.BytesIO(arquivo.read()))
+    texto = pacote.read(entrada['membro']).decode('utf-8')
+    df = pd.DataFrame(arff.loadarff(io.StringIO(texto))[0])
+    mapa = {rotulo.encode(): codigo for rotulo, codigo in entrada['codigos_classe'].items()}
+    df[entrada['classe']] = df[entrada['classe']].map(mapa)
+    return df
+
+
+def verificar(nome, arquivo=None, offline=False, pasta_cache=PASTA_CACHE):
+    """
+    Compara a carga pelo cache com o caminho original do notebook
+    """
+    obtido = carregar(nome, codificar_classe=True, arquivo=arquivo, offline=offline,
+                      pasta_cache=pasta_cache)
+    esperado = _carregar_como_notebook(nome, pasta_cache)
+
+    iguais = (list(obtido.columns) == list(esperado.columns)
+              and obtido.equals(esperado.astype(obtido.dtypes.to_dict())))
+    print(f"{nome}: {'OK' if iguais else 'DIVERGENTE'} ({len(obtido)} linhas)")
+    return iguais
+
+
+def verificar_offline(nome='vertebral_column_amostra'):
+    """
+    Exercita o caminho offline com o zip local do dataset, sem acessar a rede
+
+    Usa uma pasta de cache temporária e confere: carga sem cache, releitura
+    pelo cache, reconstrução do cache apagado, zip com checksum errado e
+    um dataset remoto sem cache nem arquivo local.
+
+    Returns:
+        bool: True se todas as etapas se comportaram como esperado
+    """
+    entrada = _entrada(nome)
+    if not entrada.get('local'):
+        raise ValueError(f"{nome} não tem zip local para a verificação offline")
+
+    etapas = {}
+    with tempfile.TemporaryDirectory() as pasta_temporaria:
+        pasta_cache = os.path.join(pasta_temporaria, 'cache')
+
+        etapas['carga sem cache'] = (not cache_valido(nome, pasta_cache)
+                                     and len(carregar(nome, offline=True, pasta_cache=pasta_cache)) > 0
+                                     and cache_valido(nome, pasta_cache))
+
+        manifesto = _ler_manifesto(nome, pasta_cache)
+        caminho_npz = os.path.join(pasta_do_dataset(nome, pasta_cache), 'dados.npz')
+        gravado = os.stat(caminho_npz).st_mtime_ns
+        obtido = carregar(nome, codificar_classe=True, offline=True, pasta_cache=pasta_cache)
+        esperado = _carregar_como_notebook(nome, pasta_cache)
+        etapas['releitura pelo cache'] = (os.stat(caminho_npz).st_mtime_ns == gravado
+                                          and obtido.equals(esperado.astype(obtido.dtypes.to_dict())))
+
+        shutil.rmtree(pasta_do_dataset(nome, pasta_cache))
+        etapas['cache apagado'] = (len(carregar(nome, offline=True, pasta_cache=pasta_cache))
+                                   == manifesto['linhas'] and cache_valido(nome, pasta_cache))
+
+        corrompido = os.path.join(pasta_temporaria, entrada['arquivo'])
+        shutil.copyfile(entrada['local'], corrompido)
+        with open(corrompido, 'ab') as arquivo:
+            arquivo.write(b'\0')
+        outra_pasta = os.path.join(pasta_temporaria, 'cache_corrompido')
+        try:
+            carregar(nome, arquivo=corrompido, offline=True, pasta_cache=outra_pasta)
+            etapas['checksum errado'] = False
+        except ValueError:
+            etapas['checksum errado'] = not os.listdir(outra_pasta)
+
+        # Um dataset só com URL, cache vazio e offline=True deve falhar sem baixar
+        remoto = next(outro for outro, dados in REGISTRO.items() if not dados.get('local'))
+        try:
+            carregar(remoto, offline=True, pasta_cache=os.path.join(pasta_temporaria, 'cache_vazio'))
+            etapas['sem arquivo e sem rede'] = False
+        except FileNotFoundError:
+            etapas['sem arquivo e sem rede'] = True
+
+    for etapa, ok in etapas.items():
+        print(f"Offline - {etapa}: {'OK' if ok else 'FALHOU'}")
+    return all(etapas.values())
+
+
+def benchmark(nome, repeticoes=20, arquivo=None, offline=False, pasta_cache=PASTA_CACHE):
+    """
+    Compara a carga pelo cache tipado com zip + scipy.io.arff + replace()
+    """
+    carregar(nome, arquivo=arquivo, offline=offline, pasta_cache=pasta_cache)
+
+    tempos = {}
+    for rotulo, funcao in (('notebook', lambda: _carregar_como_notebook(nome, pasta_cache)),
+                           ('cache', lambda: carregar(nome, codificar_classe=True,
+                                                      pasta_cache=pasta_cache))):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            funcao()
+        tempos[rotulo] = (time.perf_counter() - inicio) / repeticoes * 1000
+
+    print(f"zip + arff + replace: {tempos['notebook']:.2f} ms")
+    print(f"cache tipado:         {tempos['cache']:.2f} ms")
+    print(f"Ganho:                {tempos['notebook'] / tempos['cache']:.1f}x")
+    return tempos
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Registro local de datasets com cache tipado')
+    parser.add_argument('dataset', nargs='?', default='vertebral_column_2c',
+                        help='Nome no registro (padrão: vertebral_column_2c)')
+    parser.add_argument('--arquivo', help='Zip local a usar no lugar do download')
+    parser.add_argument('--offline', action='store_true', help='Não acessa a rede')
+    parser.add_argument('--cache', default=PASTA_CACHE, help='Pasta do cache')
+    parser.add_argument('--listar', action='store_true', help='Lista os datasets registrados')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Compara com o carregamento do notebook e exercita o caminho '
+                             'offline com a amostra local')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Mede o tempo de carga com e sem o cache')
+    args = parser.parse_args()
+
+    if args.listar:
+        print(listar(args.cache).to_string())
+        return
+
+    if args.verificar:
+        verificar_offline()
+        verificar(args.dataset, args.arquivo, args.offline, args.cache)
+    if args.benchmark:
+        benchmark(args.dataset, arquivo=args.arquivo, offline=args.offline, pasta_cache=args.cache)
+    if args.verificar or args.benchmark:
+        return
+
+    inicio = time.perf_counter()
+    df = carregar(args.dataset, arquivo=args.arquivo, offline=args.offline, pasta_cache=args.cache)
+    duracao = time.perf_counter() - inicio
+
+    print(f"{args.dataset}: {df.shape[0]} linhas x {df.shape[1]} colunas ({duracao * 1000:.1f} ms)")
+    print(df.head().to_string())
+    print(df[_entrada(args.dataset)['classe']].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
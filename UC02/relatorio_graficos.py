@@ -0,0 +1,413 @@
+"""
+Relatório gráfico de EDA com renderização por caixas (bins)
+UC02 - Laboratório 3
+
+Os gráficos dos notebooks (df.plot(), densidades, scatter_matrix, dispersão
+DISTANCE x ARR_DELAY, boxplots por companhia) desenham ponto a ponto e ficam
+inutilizáveis com centenas de milhares de voos. Aqui os dados do cache
+colunar são pré-agregados com NumPy, em blocos, em histogramas 1D/2D e
+grades de KDE; o custo de desenhar depende do número de caixas, não do
+número de linhas. Todas as figuras são gravadas em PNG, sem janela.
+
+Uso:
+    python relatorio_graficos.py "atividade3 - Dataset_sint_tico_de_voos.csv"
+    python relatorio_graficos.py voos.csv --saida figuras --caixas 200
+"""
+
+import argparse
+import json
+import os
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+import numpy as np
+
+from cache_colunar import SENTINELAS, abrir_colunas
+from groupby_paralelo import calcular_esboco, indice_grupos
+
+COLUNAS_NUMERICAS = ['CRS_DEP_TIME', 'DEP_DELAY', 'ARR_DELAY', 'DISTANCE']
+
+ROTULOS = {
+    'CRS_DEP_TIME': 'Horário Programado (HHMM)',
+    'DEP_DELAY': 'Atraso de Partida (minutos)',
+    'ARR_DELAY': 'Atraso de Chegada (minutos)',
+    'DISTANCE': 'Distância (milhas)'
+}
+
+# Linhas lidas do memory map por vez
+LINHAS_BLOCO = 5_000_000
+
+
+class DadosBinados:
+    """
+    Acesso em blocos às colunas numéricas do cache, com nulos como NaN
+    """
+
+    def __init__(self, caminho_csv, colunas=COLUNAS_NUMERICAS):
+        self.manifesto, self.arrays = abrir_colunas(caminho_csv, colunas=colunas)
+        self.colunas = [nome for nome in colunas if nome in self.arrays]
+        self.linhas = self.manifesto['linhas']
+        self._limites = {}
+
+    def blocos(self, colunas):
+        """
+        Gera dicionários {coluna: float64 com NaN} de até LINHAS_BLOCO linhas
+        """
+        for inicio in range(0, self.linhas, LINHAS_BLOCO):
+            fim = min(inicio + LINHAS_BLOCO, self.linhas)
+            bloco = {}
+            for nome in colunas:
+                coluna = np.asarray(self.arrays[nome][inicio:fim])
+                valores = coluna.astype(np.float64)
+                tipo = self.manifesto['colunas'][nome]['tipo']
+                if tipo in SENTINELAS:
+                    valores[coluna == SENTINELAS[tipo]] = np.nan
+                bloco[nome] = valores
+            yield bloco
+
+    def limites(self, nome):
+        """
+        (mínimo, máximo) da coluna, ignorando nulos
+        """
+        if nome not in self._limites:
+            minimo, maximo = np.inf, -np.inf
+            for bloco in self.blocos([nome]):
+                valores = bloco[nome]
+                if np.isfinite(valores).any():
+                    minimo = min(minimo, np.nanmin(valores))
+                    maximo = max(maximo, np.nanmax(valores))
+            if minimo == maximo:
+                maximo = minimo + 1
+            self._limites[nome] = (minimo, maximo)
+        return self._limites[nome]
+
+    def bordas(self, nome, caixas):
+        minimo, maximo = self.limites(nome)
+        return np.linspace(minimo, maximo, caixas + 1)
+
+    def histograma(self, nome, caixas):
+        """
+        Histograma 1D acumulado bloco a bloco
+        """
+        bordas = self.bordas(nome, caixas)
+        contagens = np.zeros(caixas, dtype=np.int64)
+        for bloco in self.blocos([nome]):
+            valores = bloco[nome]
+            contagens += np.histogram(valores[~np.isnan(valores)], bins=bordas)[0]
+        return contagens, bordas
+
+    def histograma2d(self, nome_x, nome_y, caixas):
+        """
+        Histograma 2D acumulado bloco a bloco (linhas com nulos descartadas)
+        """
+        bordas_x, bordas_y = self.bordas(nome_x, caixas), self.bordas(nome_y, caixas)
+        contagens = np.zeros((caixas, caixas), dtype=np.int64)
+        for bloco in self.blocos([nome_x, nome_y]):
+            x, y = bloco[nome_x], bloco[nome_y]
+            validos = ~(np.isnan(x) | np.isnan(y))
+            contagens += np.histogram2d(x[validos], y[validos], bins=[bordas_x, bordas_y])[0] \
+                .astype(np.int64)
+        return contagens, bordas_x, bordas_y
+
+    def momentos(self, colunas):
+        """
+        Somas para médias, covariâncias e regressão (linhas sem nulos)
+
+        Returns:
+            tuple: (n, vetor de somas, matriz de produtos cruzados)
+        """
+        k = len(colunas)
+        n, somas, produtos = 0, np.zeros(k), np.zeros((k, k))
+        for bloco in self.blocos(colunas):
+            matriz = np.column_stack([bloco[nome] for nome in colunas])
+            matriz = matriz[~np.isnan(matriz).any(axis=1)]
+            n += len(matriz)
+            somas += matriz.sum(axis=0)
+            produtos += matriz.T @ matriz
+        return n, somas, produtos
+
+
+def kde_binado(contagens, bordas):
+    """
+    KDE gaussiana sobre o histograma (convolução), banda pela regra de Scott
+
+    Returns:
+        tuple: (centros das caixas, densidade)
+    """
+    centros = (bordas[:-1] + bordas[1:]) / 2
+    largura = bordas[1] - bordas[0]
+    n = contagens.sum()
+    if n < 2:
+        return centros, np.zeros_like(centros)
+
+    media = (contagens * centros).sum() / n
+    desvio = np.sqrt((contagens * (centros - media) ** 2).sum() / (n - 1))
+    banda = max(1.06 * desvio * n ** (-1 / 5), largura)
+
+    raio = int(np.ceil(4 * banda / largura))
+    deslocamentos = np.arange(-raio, raio + 1) * largura
+    nucleo = np.exp(-0.5 * (deslocamentos / banda) ** 2)
+    nucleo /= nucleo.sum()
+
+    densidade = np.convolve(contagens, nucleo, mode='full')[raio:raio + len(centros)]
+    return centros, densidade / (n * largura)
+
+
+def _imagem_2d(ax, contagens, bordas_x, bordas_y):
+    imagem = np.ma.masked_equal(contagens.T, 0)
+    return ax.pcolormesh(bordas_x, bordas_y, imagem, norm=LogNorm(vmin=1, vmax=max(imagem.max(), 1)),
+                         cmap='viridis', shading='flat')
+
+
+def figura_series(dados, caixas):
+    """
+    Equivalente de df.plot(): envoltória min/max e média por faixa de linhas
+    """
+    fig, ax = plt.subplots(figsize=(14, 6))
+    limites = np.linspace(0, dados.linhas, min(caixas, max(dados.linhas, 1)) + 1).astype(np.int64)
+
+    for nome in dados.colunas:
+        coluna = np.asarray(dados.arrays[nome])
+        tipo = dados.manifesto['colunas'][nome]['tipo']
+        medias, minimos, maximos = [], [], []
+        for inicio, fim in zip(limites[:-1], limites[1:]):
+            valores = coluna[inicio:fim].astype(np.float64)
+            if tipo in SENTINELAS:
+                valores[coluna[inicio:fim] == SENTINELAS[tipo]] = np.nan
+            if np.isfinite(valores).any():
+                medias.append(np.nanmean(valores))
+                minimos.append(np.nanmin(valores))
+                maximos.append(np.nanmax(valores))
+            else:
+                medias.append(np.nan)
+                minimos.append(np.nan)
+                maximos.append(np.nan)
+
+        posicoes = (limites[:-1] + limites[1:]) / 2
+        linha, = ax.plot(posicoes, medias, label=nome)
+        ax.fill_between(posicoes, minimos, maximos, color=linha.get_color(), alpha=0.2)
+
+    ax.set_xlabel('Linha')
+    ax.set_title('Séries por faixa de linhas (média e mín./máx.)', fontweight='bold')
+    ax.legend()
+    return fig
+
+
+def figura_densidades(dados, caixas):
+    """
+    Equivalente de df.plot(kind='density', subplots=True)
+    """
+    linhas = int(np.ceil(len(dados.colunas) / 2))
+    fig, axes = plt.subplots(linhas, 2, figsize=(12, 3 * linhas), squeeze=False)
+
+    for ax, nome in zip(axes.flat, dados.colunas):
+        centros, densidade = kde_binado(*dados.histograma(nome, caixas * 4))
+        ax.plot(centros, densidade)
+        ax.set_title(nome)
+        ax.set_ylabel('Densidade')
+        ax.grid(alpha=0.3)
+    for ax in list(axes.flat)[len(dados.colunas):]:
+        ax.axis('off')
+
+    fig.tight_layout()
+    return fig
+
+
+def figura_histograma(dados, caixas, nome='DEP_DELAY'):
+    """
+    Equivalente de df['DEP_DELAY'].plot.hist() com linha da média
+    """
+    contagens, bordas = dados.histograma(nome, caixas)
+    n, somas, _ = dados.momentos([nome])
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.stairs(contagens, bordas, fill=True, color='lightblue', edgecolor='black')
+    if n:
+        media = somas[0] / n
+        ax.axvline(media, color='red', linestyle='--', label=f'Média: {media:.1f} min')
+        ax.legend()
+    ax.set_title(f'Distribuição de {nome}', fontweight='bold')
+    ax.set_xlabel(ROTULOS.get(nome, nome))
+    ax.set_ylabel('Frequência')
+    ax.grid(alpha=0.3)
+    return fig
+
+
+def figura_matriz_dispersao(dados, caixas):
+    """
+    Equivalente de pd.plotting.scatter_matrix com histogramas 2D
+    """
+    k = len(dados.colunas)
+    fig, axes = plt.subplots(k, k, figsize=(12, 12), squeeze=False)
+
+    for i, nome_y in enumerate(dados.colunas):
+        for j, nome_x in enumerate(dados.colunas):
+            ax = axes[i, j]
+            if i == j:
+                contagens, bordas = dados.histograma(nome_x, caixas)
+                ax.stairs(contagens, bordas, fill=True, color='gray')
+            else:
+                _imagem_2d(ax, *dados.histograma2d(nome_x, nome_y, caixas))
+            if i == k - 1:
+                ax.set_xlabel(nome_x)
+            else:
+                ax.set_xticklabels([])
+            if j == 0:
+                ax.set_ylabel(nome_y)
+            else:
+                ax.set_yticklabels([])
+
+    fig.tight_layout()
+    return fig
+
+
+def figura_dispersao(dados, caixas, nome_x, nome_y, tendencia=False):
+    """
+    Equivalente de plt.scatter(x, y) como mapa de densidade 2D
+    """
+    contagens, bordas_x, bordas_y = dados.histograma2d(nome_x, nome_y, caixas)
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+    malha = _imagem_2d(ax, contagens, bordas_x, bordas_y)
+    fig.colorbar(malha, ax=ax, label='Voos por caixa')
+
+    n, somas, produtos = dados.momentos([nome_x, nome_y])
+    if n > 1:
+        medias = somas / n
+        covariancia = produtos / n - np.outer(medias, medias)
+        correlacao = covariancia[0, 1] / np.sqrt(covariancia[0, 0] * covariancia[1, 1])
+        ax.text(0.05, 0.95, f'Correlação: {correlacao:.3f}', transform=ax.transAxes,
+                bbox=dict(boxstyle='round', facecolor='white', alpha=0.8), fontsize=12)
+
+        if tendencia:
+            inclinacao = covariancia[0, 1] / covariancia[0, 0]
+            intercepto = medias[1] - inclinacao * medias[0]
+            ax.plot(bordas_x, inclinacao * bordas_x + intercepto, 'r--', linewidth=2)
+
+    ax.set_xlabel(ROTULOS.get(nome_x, nome_x))
+    ax.set_ylabel(ROTULOS.get(nome_y, nome_y))
+    ax.set_title(f'Relação entre {nome_x} e {nome_y}', fontweight='bold')
+    return fig
+
+
+def figura_correlacao(dados):
+    """
+    Matriz de correlação calculada a partir dos momentos
+    """
+    n, somas, produtos = dados.momentos(dados.colunas)
+    medias = somas / max(n, 1)
+    covariancia = produtos / max(n, 1) - np.outer(medias, medias)
+    desvios = np.sqrt(np.diag(covariancia))
+    correlacao = covariancia / np.outer(desvios, desvios)
+
+    fig, ax = plt.subplots(figsize=(10, 8))
+    imagem = ax.imshow(correlacao, cmap='coolwarm', vmin=-1, vmax=1)
+    fig.colorbar(imagem, ax=ax)
+    ax.set_xticks(range(len(dados.colunas)), dados.colunas, rotation=45)
+    ax.set_yticks(range(len(dados.colunas)), dados.colunas)
+    for i in range(len(dados.colunas)):
+        for j in range(len(dados.colunas)):
+            ax.text(j, i, f'{correlacao[i, j]:.3f}', ha='center', va='center')
+    ax.set_title('Matriz de Correlação - Variáveis Numéricas', fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+def figura_boxplot_companhias(caminho_csv, valores=('DEP_DELAY', 'ARR_DELAY')):
+    """
+    Boxplot por companhia a partir de quantis do esboço (sem desenhar outliers)
+    """
+    valores = list(valores)
+    esboco, manifesto = calcular_esboco(caminho_csv, ['OP_UNIQUE_CARRIER'], valores, workers=1)
+
+    fig, axes = plt.subplots(1, len(valores), figsize=(16, 6), squeeze=False)
+    if esboco is None:
+        return fig
+
+    companhias = indice_grupos(manifesto, ['OP_UNIQUE_CARRIER'], esboco.grupos)
+    for ax, nome in zip(axes.flat, valores):
+        q1, mediana, q3 = (esboco.quantil(nome, q) for q in (0.25, 0.5, 0.75))
+        minimo, maximo = esboco.quantil(nome, 0.0), esboco.quantil(nome, 1.0)
+        iqr = q3 - q1
+        estatisticas = [{
+            'label': companhia,
+            'q1': q1[i], 'med': mediana[i], 'q3': q3[i],
+            'whislo': max(minimo[i], q1[i] - 1.5 * iqr[i]),
+            'whishi': min(maximo[i], q3[i] + 1.5 * iqr[i]),
+            'fliers': []
+        } for i, companhia in enumerate(companhias)]
+
+        ax.bxp(estatisticas, patch_artist=True)
+        ax.set_title(f'{nome} por Companhia Aérea', fontweight='bold')
+        ax.set_ylabel(ROTULOS.get(nome, nome))
+        ax.grid(axis='y', alpha=0.3)
+
+    fig.tight_layout()
+    return fig
+
+
+def gerar_relatorio(caminho_csv, pasta_saida='figuras', caixas=100, dpi=100):
+    """
+    Gera todas as figuras de EDA em PNG e retorna os tempos de cada uma
+
+    Returns:
+        dict: {arquivo: segundos (cálculo + renderização)}
+    """
+    os.makedirs(pasta_saida, exist_ok=True)
+
+    inicio = time.perf_counter()
+    dados = DadosBinados(caminho_csv)
+    tempos = {'carga_cache': time.perf_counter() - inicio}
+
+    figuras = {
+        'series.png': lambda: figura_series(dados, caixas * 5),
+        'densidades.png': lambda: figura_densidades(dados, caixas),
+        'histograma_dep_delay.png': lambda: figura_histograma(dados, caixas),
+        'matriz_dispersao.png': lambda: figura_matriz_dispersao(dados, caixas),
+        'distancia_vs_atraso.png': lambda: figura_dispersao(dados, caixas, 'DISTANCE', 'ARR_DELAY'),
+        'partida_vs_chegada.png': lambda: figura_dispersao(dados, caixas, 'DEP_DELAY', 'ARR_DELAY',
+                                                           tendencia=True),
+        'correlacao.png': lambda: figura_correlacao(dados),
+        'boxplot_companhias.png': lambda: figura_boxplot_companhias(caminho_csv)
+    }
+
+    for arquivo, criar in figuras.items():
+        inicio = time.perf_counter()
+        fig = criar()
+        fig.savefig(os.path.join(pasta_saida, arquivo), dpi=dpi)
+        plt.close(fig)
+        tempos[arquivo] = time.perf_counter() - inicio
+
+    with open(os.path.join(pasta_saida, 'tempos.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump({'linhas': dados.linhas, 'caixas': caixas, 'tempos_s': tempos},
+                  arquivo, ensure_ascii=False, indent=2)
+
+    return tempos
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Relatório gráfico de EDA por caixas')
+    parser.add_argument('arquivo', help='CSV de voos')
+    parser.add_argument('--saida', default='figuras', help='Pasta dos PNGs (padrão: figuras)')
+    parser.add_argument('--caixas', type=int, default=100,
+                        help='Caixas por eixo nos histogramas (padrão: 100)')
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tempos = gerar_relatorio(args.arquivo, args.saida, args.caixas, args.dpi)
+
+    print(f"{'Etapa':<28} {'Tempo (s)':>10}")
+    for etapa, tempo in tempos.items():
+        print(f"{etapa:<28} {tempo:>10.3f}")
+    print(f"\nTotal: {time.perf_counter() - inicio:.2f}s — figuras em '{args.saida}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Análise facial em lote (sem interface gráfica)
+Atividade 2 - Visão Computacional UC04
+
+Percorre uma pasta de imagens, distribui as imagens entre processos que
+mantêm os modelos do DeepFace já carregados e grava um registro JSONL por
+imagem. Imagens já presentes no arquivo de saída são puladas, permitindo
+retomar uma execução interrompida.
+
+Uso:
+    python analise_em_lote.py imagens --saida resultados.jsonl --workers 4
+    python analise_em_lote.py imagens --anotar imagens_anotadas
+    python analise_em_lote.py imagens --cache-distancia 4
+    python analise_em_lote.py imagens --cache-arquivo cache_rostos.pkl
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+EXTENSOES = ['.jpg', '.jpeg', '.png', '.bmp']
+
+# Espera máxima pela carga dos modelos em cada worker (a primeira execução
+# do DeepFace ainda baixa os pesos)
+TEMPO_MAX_INICIALIZACAO = 600
+
+# Analisador de cada processo worker (criado em _inicializar_worker)
+_analisador = None
+_config = {}
+
+
+def listar_imagens(pasta, extensoes=EXTENSOES):
+    """
+    Lista recursivamente as imagens da pasta, em ordem
+    """
+    pasta = Path(pasta)
+    return sorted(str(caminho) for caminho in pasta.rglob('*')
+                  if caminho.is_file() and caminho.suffix.lower() in extensoes)
+
+
+def carregar_processados(caminho_saida):
+    """
+    Lê o JSONL existente e retorna o conjunto de arquivos já analisados
+    """
+    processados = set()
+    if not os.path.exists(caminho_saida):
+        return processados
+
+    with open(caminho_saida, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            try:
+                processados.add(json.loads(linha)['arquivo'])
+            except (json.JSONDecodeError, KeyError):
+                # Linha incompleta de uma execução interrompida
+                continue
+
+    return processados
+
+
+def _serializavel(valor):
+    """
+    Converte tipos do NumPy para tipos nativos do JSON
+    """
+    if isinstance(valor, dict):
+        return {chave: _serializavel(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_serializavel(v) for v in valor]
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+
+def _inicializar_worker(acoes, pasta_raiz, pasta_anotadas, cache_distancia, cache_arquivo,
+                        prontos):
+    """
+    Carrega os modelos uma única vez por processo e aquece a inferência
+
+    O cache do worker parte do arquivo salvo (se houver); as entradas novas
+    voltam ao processo principal junto de cada registro, e só ele grava o
+    arquivo. Ao terminar, avisa o processo principal pela fila 'prontos'
+    com (pid, None), ou (pid, erro) se a carga falhar.
+    """
+    try:
+        _carregar_worker(acoes, pasta_raiz, pasta_anotadas, cache_distancia, cache_arquivo)
+    except Exception as erro:
+        prontos.put((os.getpid(), f"{type(erro).__name__}: {erro}"))
+        raise
+    prontos.put((os.getpid(), None))
+
+
+def _carregar_worker(acoes, pasta_raiz, pasta_anotadas, cache_distancia, cache_arquivo):
+    """
+    Cria o analisador do processo, carrega os modelos e faz uma análise de aquecimento
+    """
+    global _analisador, _config
+    from reconhecimento_facial import AnalisadorFacial
+    from cache_facial import CacheFacial
+
+    cache = None
+    if cache_distancia is not None:
+        cache = CacheFacial(distancia_max=cache_distancia, caminho=cache_arquivo)
+
+    _analisador = AnalisadorFacial(cache=cache)
+    _config = {'acoes': acoes, 'pasta_raiz': pasta_raiz, 'pasta_anotadas': pasta_anotadas}
+
+    for acao in acoes:
+        _analisador.obter_modelo(acao)
+
+    # Aquece sem o cache para não guardar o rosto de exemplo
+    _analisador.cache = None
+    _analisador.analisar_face(cv2.cvtColor(_analisador.criar_imagem_exemplo(), cv2.COLOR_RGB2BGR),
+                              acoes=acoes, silencioso=True)
+    _analisador.cache = cache
+
+
+def _aguardar_workers(prontos, workers, tempo_max=TEMPO_MAX_INICIALIZACAO):
+    """
+    Espera todos os workers carregarem os modelos
+
+    Raises:
+        RuntimeError: Se algum initializer falhou ou não terminou a tempo
+            (o pool recriaria o worker indefinidamente)
+    """
+    for _ in range(workers):
+        try:
+            pid, erro = prontos.get(timeout=tempo_max)
+        except queue.Empty:
+            raise RuntimeError(f"Os workers não carregaram os modelos em {tempo_max}s") from None
+        if erro is not None:
+            raise RuntimeError(f"Falha ao carregar os modelos no worker {pid}: {erro}")
+
+
+def _analisar_arquivo(caminho):
+    """
+    Analisa uma imagem e retorna o registro que será gravado no JSONL
+    """
+    inicio = time.perf_counter()
+    registro = {'arquivo': caminho, 'rostos': [], 'erro': None}
+    cache = _analisador.cache
+    uso_antes = cache.uso() if cache is not None else None
+
+    img_bgr = cv2.imread(caminho)
+    if img_bgr is None:
+        registro['erro'] = f"Erro ao carregar imagem: {caminho}"
+    else:
+        resultados = _analisador.analisar_face(img_bgr, acoes=_config['acoes'], silencioso=True)
+        registro['rostos'] = _serializavel(resultados)
+
+        if _config['pasta_anotadas'] and resultados:
+            img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+            img_resultado = _analisador.desenhar_deteccoes(img_rgb, resultados)
+            # Espelha as subpastas da entrada para não sobrescrever nomes repetidos
+            destino = os.path.join(_config['pasta_anotadas'],
+                                   os.path.relpath(caminho, _config['pasta_raiz']))
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            cv2.imwrite(destino, cv2.cvtColor(img_resultado, cv2.COLOR_RGB2BGR))
+
+    registro['tempo_total'] = time.perf_counter() - inicio
+
+    # Removido pelo processo principal antes de gravar o JSONL
+    if cache is not None:
+        uso = cache.uso()
+        registro['_cache'] = {
+            'novas': cache.exportar_novas(),
+            'uso': {chave: uso[chave] - uso_antes[chave] for chave in uso}
+        }
+    return registro
+
+
+def analisar_pasta(pasta, caminho_saida='resultados.jsonl', workers=None,
+                   acoes=('age', 'gender', 'emotion'), pasta_anotadas=None,
+                   cache_distancia=None, cache_arquivo=None):
+    """
+    Analisa todas as imagens ainda não processadas da pasta
+
+    Args:
+        pasta (str): Pasta com as imagens (percorrida recursivamente)
+        caminho_saida (str): Arquivo JSONL de saída (acrescentado)
+        workers (int): Número de processos; padrão é o número de CPUs
+        acoes (tuple): Ações do DeepFace executadas em cada imagem
+        pasta_anotadas (str): Se informado, salva as imagens anotadas nela
+        cache_distancia (int): Ativa o cache por hash perceptual em cada
+            worker, com esta distância de Hamming máxima
+        cache_arquivo (str): Arquivo do cache, carregado pelos workers no
+            início e salvo (com as entradas de todos eles) ao final
+
+    Returns:
+        int: Número de imagens analisadas nesta execução
+    """
+    imagens = listar_imagens(pasta)
+    processados = carregar_processados(caminho_saida)
+    pendentes = [caminho for caminho in imagens if caminho not in processados]
+
+    print(f"Imagens encontradas: {len(imagens)}")
+    print(f"Já processadas: {len(imagens) - len(pendentes)}")
+
+    if not pendentes:
+        print("Nada a fazer.")
+        return 0
+
+    if pasta_anotadas:
+        os.makedirs(pasta_anotadas, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(pendentes))
+
+    # TensorFlow não é seguro com fork; cada worker é um processo novo
+    contexto = mp.get_context('spawn')
+
+    cache = None
+    if cache_distancia is not None:
+        from cache_facial import CacheFacial
+        cache = CacheFacial(distancia_max=cache_distancia, caminho=cache_arquivo)
+
+    prontos = contexto.Queue()
+    inicio = time.perf_counter()
+    concluidas = 0
+    rostos = 0
+    with open(caminho_saida, 'a', encoding='utf-8') as saida, \
+            contexto.Pool(workers, initializer=_inicializar_worker,
+                          initargs=(tuple(acoes), pasta, pasta_anotadas, cache_distancia,
+                                    cache_arquivo, prontos)) as pool:
+        # Os initializers rodam em paralelo e de forma assíncrona: a vazão só
+        # começa a contar depois que todos os workers carregaram os modelos
+        _aguardar_workers(prontos, workers)
+        inicio_analise = time.perf_counter()
+        for registro in pool.imap_unordered(_analisar_arquivo, pendentes):
+            dados_cache = registro.pop('_cache', None)
+            if dados_cache is not None:
+                cache.importar(dados_cache['novas'])
+                cache.acumular(dados_cache['uso'])
+            saida.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            saida.flush()
+            concluidas += 1
+            rostos += len(registro['rostos'])
+
+            if registro['erro']:
+                print(f"[{concluidas}/{len(pendentes)}] {registro['arquivo']}: {registro['erro']}")
+            else:
+                print(f"[{concluidas}/{len(pendentes)}] {registro['arquivo']}: "
+                      f"{len(registro['rostos'])} rosto(s)")
+
+    duracao = time.perf_counter() - inicio
+    duracao_analise = time.perf_counter() - inicio_analise
+    print(f"\nImagens analisadas: {concluidas} com {workers} worker(s)")
+    print(f"Tempo total: {duracao:.1f}s (inicialização dos modelos: {duracao - duracao_analise:.1f}s)")
+    print(f"Vazão: {concluidas / max(duracao_analise, 1e-6):.2f} imagens/s (sem a inicialização)")
+    print(f"Rostos: {rostos}")
+    if cache is not None:
+        print(cache.resumo())
+        if cache.caminho:
+            cache.salvar()
+            print(f"Cache salvo em: {cache.caminho}")
+
+    return concluidas
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description='Análise facial em lote com DeepFace')
+    parser.add_argument('pasta', help='Pasta com as imagens')
+    parser.add_argument('--saida', default='resultados.jsonl',
+                        help='Arquivo JSONL de saída (padrão: resultados.jsonl)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Número de processos (padrão: número de CPUs)')
+    parser.add_argument('--acoes', nargs='+', default=['age', 'gender', 'emotion'],
+                        choices=['age', 'gender', 'race', 'emotion'],
+                        help='Ações do DeepFace a executar')
+    parser.add_argument('--anotar', metavar='PASTA', default=None,
+                        help='Salva as imagens anotadas nesta pasta (desativado por padrão)')
+    parser.add_argument('--cache-distancia', type=int, default=None,
+                        help='Ativa o cache por hash perceptual com esta distância de Hamming')
+    parser.add_argument('--cache-arquivo', default=None,
+                        help='Arquivo do cache: carregado no início e salvo ao final '
+                             '(ativa o cache com distância 4 se --cache-distancia não for dado)')
+    args = parser.parse_args()
+
+    cache_distancia = args.cache_distancia
+    if cache_distancia is None and args.cache_arquivo:
+        cache_distancia = 4
+
+    analisar_pasta(args.pasta, args.saida, args.workers, args.acoes, args.anotar,
+                   cache_distancia, args.cache_arquivo)
+
+
+if __name__ == "__main__":
+    main()
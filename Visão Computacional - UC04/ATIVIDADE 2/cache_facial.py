@@ -0,0 +1,228 @@
+"""
+Cache de resultados da análise facial por hash perceptual
+Atividade 2 - Visão Computacional UC04
+
+Rostos quase idênticos (quadros consecutivos de câmera, uploads duplicados)
+geram o mesmo hash perceptual ou hashes a poucos bits de distância. O cache
+reaproveita o resultado da análise nesses casos, evitando nova inferência.
+"""
+
+import copy
+import os
+import pickle
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def hash_perceptual(face):
+    """
+    Calcula o pHash (64 bits) de um recorte de rosto
+
+    Args:
+        face (numpy.ndarray): Rosto BGR, uint8 ou float em [0, 1], com ou
+            sem a dimensão de lote retornada pelo DeepFace
+
+    Returns:
+        int: Hash perceptual de 64 bits
+    """
+    if face.ndim == 4:
+        face = face[0]
+    if face.dtype != np.uint8:
+        face = np.clip(face * 255, 0, 255).astype(np.uint8)
+    if face.ndim == 3:
+        face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+
+    reduzida = cv2.resize(face, (32, 32), interpolation=cv2.INTER_AREA)
+    dct = cv2.dct(np.float32(reduzida))[:8, :8]
+    bits = (dct > np.median(dct)).flatten()
+
+    return int(sum(1 << i for i, bit in enumerate(bits) if bit))
+
+
+def distancia_hamming(hash_a, hash_b):
+    """
+    Número de bits diferentes entre dois hashes
+    """
+    return bin(hash_a ^ hash_b).count('1')
+
+
+class CacheFacial:
+    """
+    Cache LRU em memória, opcionalmente persistido em disco
+    """
+
+    def __init__(self, capacidade=1024, distancia_max=4, caminho=None):
+        """
+        Inicializa o cache
+
+        Args:
+            capacidade (int): Número máximo de rostos guardados
+            distancia_max (int): Distância de Hamming máxima para considerar acerto
+            caminho (str): Arquivo para persistir o cache (carregado se existir)
+        """
+        self.capacidade = capacidade
+        self.distancia_max = distancia_max
+        self.caminho = caminho
+
+        # hash -> {'acoes': set, 'valores': dict, 'tempos': {acao: segundos}}
+        self._entradas = OrderedDict()
+        self._novas = set()
+
+        self.consultas = 0
+        self.acertos = 0
+        self.tempo_economizado = 0.0
+
+        if caminho and os.path.exists(caminho):
+            self.carregar()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def buscar(self, hash_face, acoes):
+        """
+        Procura um rosto próximo que já tenha todas as ações pedidas
+
+        Returns:
+            dict | None: Cópia do resultado guardado (sem a região) ou None
+        """
+        self.consultas += 1
+
+        melhor, melhor_distancia = None, self.distancia_max + 1
+        for chave, entrada in self._entradas.items():
+            if not set(acoes) <= entrada['acoes']:
+                continue
+            distancia = distancia_hamming(chave, hash_face)
+            if distancia < melhor_distancia:
+                melhor, melhor_distancia = chave, distancia
+                if distancia == 0:
+                    break
+
+        if melhor is None:
+            return None
+
+        self._entradas.move_to_end(melhor)
+        entrada = self._entradas[melhor]
+        self.acertos += 1
+        self.tempo_economizado += sum(entrada['tempos'].get(acao, 0.0) for acao in acoes)
+        # Cópia: quem recebe pode alterar o resultado sem corromper o cache
+        return copy.deepcopy(entrada['valores'])
+
+    def guardar(self, hash_face, acoes, valores, tempos):
+        """
+        Guarda o resultado das ações bem-sucedidas de um rosto
+
+        Se o hash já estiver no cache, as ações e os valores novos são
+        mesclados à entrada existente. Sem nenhuma ação, nada é gravado.
+
+        Args:
+            hash_face (int): Hash perceptual do rosto
+            acoes (iterable): Ações cobertas por 'valores'
+            valores (dict): Chaves produzidas pelas ações (age, emotion, ...)
+            tempos (dict): Tempo de inferência de cada ação em 'acoes'
+        """
+        acoes = set(acoes)
+        if not acoes:
+            return
+
+        entrada = self._entradas.get(hash_face)
+        if entrada is None:
+            entrada = {'acoes': set(), 'valores': {}, 'tempos': {}}
+            self._entradas[hash_face] = entrada
+
+        entrada['acoes'] |= acoes
+        entrada['valores'].update(copy.deepcopy(valores))
+        entrada['tempos'].update({acao: tempos.get(acao, 0.0) for acao in acoes})
+        self._entradas.move_to_end(hash_face)
+        self._novas.add(hash_face)
+
+        while len(self._entradas) > self.capacidade:
+            self._entradas.popitem(last=False)
+
+    def exportar_novas(self):
+        """
+        Entradas gravadas desde a última exportação, para mesclar em outro cache
+
+        Returns:
+            list: [(hash, entrada), ...]
+        """
+        novas = [(chave, copy.deepcopy(self._entradas[chave]))
+                 for chave in self._novas if chave in self._entradas]
+        self._novas = set()
+        return novas
+
+    def importar(self, entradas):
+        """
+        Mescla entradas vindas de exportar_novas (ex.: de outro processo)
+        """
+        for chave, entrada in entradas:
+            self.guardar(chave, entrada['acoes'], entrada['valores'], entrada['tempos'])
+
+    def uso(self):
+        """
+        Contadores de uso, para somar com acumular() em outro cache
+        """
+        return {'consultas': self.consultas, 'acertos': self.acertos,
+                'tempo_economizado': self.tempo_economizado}
+
+    def acumular(self, uso):
+        """
+        Soma contadores de uso de outro cache (ex.: de um worker)
+        """
+        self.consultas += uso['consultas']
+        self.acertos += uso['acertos']
+        self.tempo_economizado += uso['tempo_economizado']
+
+    def taxa_acertos(self):
+        """
+        Proporção de consultas atendidas pelo cache
+        """
+        if self.consultas == 0:
+            return 0.0
+        return self.acertos / self.consultas
+
+    def estatisticas(self):
+        """
+        Retorna um resumo de uso do cache
+        """
+        return {
+            'entradas': len(self._entradas),
+            'consultas': self.consultas,
+            'acertos': self.acertos,
+            'taxa_acertos': self.taxa_acertos(),
+            'tempo_economizado': self.tempo_economizado
+        }
+
+    def resumo(self):
+        """
+        Estatísticas em uma linha, para exibir ao final de uma execução
+        """
+        estatisticas = self.estatisticas()
+        return (f"Cache: {estatisticas['acertos']}/{estatisticas['consultas']} consultas atendidas "
+                f"({100 * estatisticas['taxa_acertos']:.1f}%), "
+                f"{estatisticas['tempo_economizado']:.2f}s de inferência economizados, "
+                f"{estatisticas['entradas']} entradas")
+
+    def salvar(self, caminho=None):
+        """
+        Persiste as entradas do cache em disco
+        """
+        caminho = caminho or self.caminho
+        if not caminho:
+            raise ValueError("Nenhum caminho informado para salvar o cache")
+
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as arquivo:
+            pickle.dump(list(self._entradas.items()), arquivo)
+        os.replace(temporario, caminho)
+
+    def carregar(self, caminho=None):
+        """
+        Carrega entradas persistidas, respeitando a capacidade
+        """
+        caminho = caminho or self.caminho
+        with open(caminho, 'rb') as arquivo:
+            entradas = pickle.load(arquivo)
+
+        self._entradas = OrderedDict(entradas[-self.capacidade:])
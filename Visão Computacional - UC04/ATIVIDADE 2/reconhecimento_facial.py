@@ -6,11 +6,17 @@ Este script pode ser executado independentemente do notebook
 para realizar análise facial com DeepFace
 """
 
+import argparse
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 from deepface import DeepFace
+from deepface.commons import functions
+from deepface.extendedmodels import Age, Gender, Race, Emotion
+from cache_facial import CacheFacial, hash_perceptual
 import os
+import threading
+import time
 from pathlib import Path
 import warnings
 
@@ -21,9 +27,12 @@ class AnalisadorFacial:
     Classe para análise facial usando DeepFace
     """
     
-    def __init__(self):
+    def __init__(self, cache=None):
         """
         Inicializa o analisador facial
+        
+        Args:
+            cache (CacheFacial): Cache por hash perceptual dos rostos (opcional)
         """
         self.traducao_emocoes = {
             'angry': 'Raiva',
@@ -39,6 +48,18 @@ class AnalisadorFacial:
             'Man': 'Homem',
             'Woman': 'Mulher'
         }
+        
+        # Ações disponíveis e nome do modelo DeepFace correspondente
+        self.modelos_acoes = {
+            'age': 'Age',
+            'gender': 'Gender',
+            'race': 'Race',
+            'emotion': 'Emotion'
+        }
+        
+        self.detector_backend = 'opencv'
+        self._modelos = {}
+        self.cache = cache
     
     def carregar_imagem(self, caminho):
         """
@@ -80,39 +101,133 @@ class AnalisadorFacial:
         
         return img
     
-    def analisar_face(self, caminho_imagem):
+    def obter_modelo(self, acao):
+        """
+        Retorna o modelo da ação, construindo-o apenas na primeira chamada
+        """
+        if acao not in self._modelos:
+            self._modelos[acao] = DeepFace.build_model(self.modelos_acoes[acao])
+        return self._modelos[acao]
+    
+    def detectar_faces(self, imagem):
+        """
+        Detecta e alinha os rostos uma única vez
+        
+        Retorna lista de (face_224x224, regiao) compartilhada entre as ações
+        """
+        faces = functions.extract_faces(
+            img=imagem,
+            target_size=(224, 224),
+            detector_backend=self.detector_backend,
+            grayscale=False,
+            enforce_detection=False,
+            align=True
+        )
+        
+        return [(face, regiao) for face, regiao, _ in faces
+                if face.shape[0] > 0 and face.shape[1] > 0]
+    
+    def executar_acao(self, acao, face):
+        """
+        Executa uma única ação sobre um rosto já recortado
+        """
+        modelo = self.obter_modelo(acao)
+        resultado = {}
+        
+        if acao == 'emotion':
+            face_cinza = cv2.cvtColor(face[0], cv2.COLOR_BGR2GRAY)
+            face_cinza = cv2.resize(face_cinza, (48, 48))
+            face_cinza = np.expand_dims(face_cinza, axis=0)
+            
+            predicoes = modelo.predict(face_cinza, verbose=0)[0, :]
+            soma = predicoes.sum()
+            resultado['emotion'] = {
+                rotulo: 100 * predicoes[i] / soma
+                for i, rotulo in enumerate(Emotion.labels)
+            }
+            resultado['dominant_emotion'] = Emotion.labels[np.argmax(predicoes)]
+        
+        elif acao == 'age':
+            predicoes = modelo.predict(face, verbose=0)[0, :]
+            resultado['age'] = int(Age.findApparentAge(predicoes))
+        
+        elif acao == 'gender':
+            predicoes = modelo.predict(face, verbose=0)[0, :]
+            resultado['gender'] = {
+                rotulo: 100 * predicoes[i]
+                for i, rotulo in enumerate(Gender.labels)
+            }
+            resultado['dominant_gender'] = Gender.labels[np.argmax(predicoes)]
+        
+        elif acao == 'race':
+            predicoes = modelo.predict(face, verbose=0)[0, :]
+            soma = predicoes.sum()
+            resultado['race'] = {
+                rotulo: 100 * predicoes[i] / soma
+                for i, rotulo in enumerate(Race.labels)
+            }
+            resultado['dominant_race'] = Race.labels[np.argmax(predicoes)]
+        
+        return resultado
+    
+    def analisar_face(self, caminho_imagem, acoes=('age', 'gender', 'race', 'emotion'),
+                      silencioso=False):
         """
         Realiza análise facial completa
+        
+        A detecção é feita uma única vez; cada ação roda de forma independente
+        sobre os mesmos recortes. Falhas ficam registradas em 'erros' e o
+        tempo de cada etapa em 'tempos', devolvendo resultados parciais.
         """
-        try:
+        if not silencioso:
             print("Iniciando análise facial...")
             print("Primeira execução pode demorar (download de modelos)...")
+        
+        inicio = time.perf_counter()
+        try:
+            faces = self.detectar_faces(caminho_imagem)
+        except Exception as e:
+            if not silencioso:
+                print(f"Erro na detecção: {str(e)}")
+            return []
+        tempo_deteccao = time.perf_counter() - inicio
+        
+        resultados = []
+        for face, regiao in faces:
+            resultado = {
+                'region': regiao,
+                'tempos': {'deteccao': tempo_deteccao},
+                'erros': {}
+            }
             
-            resultados = DeepFace.analyze(
-                img_path=caminho_imagem,
-                actions=['age', 'gender', 'race', 'emotion'],
-                enforce_detection=False
-            )
+            if self.cache is not None:
+                hash_face = hash_perceptual(face)
+                valores = self.cache.buscar(hash_face, acoes)
+                if valores is not None:
+                    resultado.update(valores)
+                    resultado['cache'] = True
+                    resultados.append(resultado)
+                    continue
             
-            if not isinstance(resultados, list):
-                resultados = [resultados]
+            for acao in acoes:
+                inicio = time.perf_counter()
+                try:
+                    resultado.update(self.executar_acao(acao, face))
+                except Exception as e:
+                    if not silencioso:
+                        print(f"Erro na ação '{acao}': {str(e)}")
+                    resultado['erros'][acao] = str(e)
+                resultado['tempos'][acao] = time.perf_counter() - inicio
             
-            return resultados
+            acoes_ok = [acao for acao in acoes if acao not in resultado['erros']]
+            if self.cache is not None and acoes_ok:
+                valores = {chave: valor for chave, valor in resultado.items()
+                           if chave not in ('region', 'tempos', 'erros')}
+                self.cache.guardar(hash_face, acoes_ok, valores, resultado['tempos'])
             
-        except Exception as e:
-            print(f"Erro na análise: {str(e)}")
-            try:
-                # Tentativa alternativa
-                resultados = DeepFace.analyze(
-                    img_path=caminho_imagem,
-                    actions=['emotion'],
-                    enforce_detection=False
-                )
-                if not isinstance(resultados, list):
-                    resultados = [resultados]
-                return resultados
-            except:
-                return []
+            resultados.append(resultado)
+        
+        return resultados
     
     def desenhar_deteccoes(self, img_rgb, resultados):
         """
@@ -224,17 +339,205 @@ class AnalisadorFacial:
                 regiao = resultado['region']
                 print(f"Posição: x={regiao['x']}, y={regiao['y']}, tamanho={regiao['w']}x{regiao['h']}")
 
-def processar_imagem_webcam():
+            for acao, erro in resultado.get('erros', {}).items():
+                print(f"Falha em '{acao}': {erro}")
+
+class AnalisadorAssincrono:
     """
-    Processa imagem da webcam em tempo real
+    Executa a análise facial em uma thread separada, sempre sobre o
+    quadro mais recente recebido (quadros intermediários são descartados)
     """
-    analisador = AnalisadorFacial()
     
-    cap = cv2.VideoCapture(0)
+    def __init__(self, analisador, acoes=('emotion',)):
+        """
+        Inicializa o worker de análise em segundo plano
+        """
+        self.analisador = analisador
+        self.acoes = acoes
+        
+        self._condicao = threading.Condition()
+        self._quadro_pendente = None
+        self._ultimo = (None, [])
+        self._ativo = True
+        
+        self.total_analises = 0
+        self.tempo_analises = 0.0
+        self._inicio = time.perf_counter()
+        
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+    
+    def enviar(self, frame_bgr):
+        """
+        Substitui o quadro pendente pelo mais recente
+        """
+        with self._condicao:
+            self._quadro_pendente = frame_bgr.copy()
+            self._condicao.notify()
+    
+    def ocupado(self):
+        """
+        Indica se ainda há quadro aguardando análise
+        """
+        with self._condicao:
+            return self._quadro_pendente is not None
+    
+    def obter_resultados(self):
+        """
+        Retorna (quadro analisado, resultados) da última análise concluída
+        """
+        with self._condicao:
+            return self._ultimo
+    
+    def analises_por_segundo(self):
+        """
+        Análises concluídas por segundo desde o início do worker
+        """
+        duracao = time.perf_counter() - self._inicio
+        if duracao <= 0:
+            return 0.0
+        return self.total_analises / duracao
+    
+    def latencia_media(self):
+        """
+        Tempo médio (s) de uma análise
+        """
+        if self.total_analises == 0:
+            return 0.0
+        return self.tempo_analises / self.total_analises
+    
+    def parar(self):
+        """
+        Encerra a thread de análise
+        """
+        with self._condicao:
+            self._ativo = False
+            self._condicao.notify()
+        self._thread.join(timeout=5)
+    
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while self._ativo and self._quadro_pendente is None:
+                    self._condicao.wait()
+                if not self._ativo:
+                    return
+                frame_bgr = self._quadro_pendente
+            
+            inicio = time.perf_counter()
+            resultados = self.analisador.analisar_face(frame_bgr, acoes=self.acoes,
+                                                       silencioso=True)
+            duracao = time.perf_counter() - inicio
+            
+            with self._condicao:
+                self._ultimo = (frame_bgr, resultados)
+                self._quadro_pendente = None
+                self.total_analises += 1
+                self.tempo_analises += duracao
+
+
+class RastreadorCaixas:
+    """
+    Desloca as regiões da última análise para o quadro atual usando
+    template matching em uma janela de busca ao redor de cada rosto
+    """
+    
+    def __init__(self, margem=0.5, escala=0.5):
+        """
+        Inicializa o rastreador
+        
+        Args:
+            margem (float): Tamanho da janela de busca em proporção da caixa
+            escala (float): Fator de redução aplicado antes do matching
+        """
+        self.margem = margem
+        self.escala = escala
+        self._modelos = []
+        self._resultados = []
+    
+    def _reduzir(self, frame_bgr):
+        cinza = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(cinza, None, fx=self.escala, fy=self.escala,
+                          interpolation=cv2.INTER_AREA)
+    
+    def atualizar_referencia(self, frame_bgr, resultados):
+        """
+        Guarda os recortes dos rostos do quadro que foi analisado
+        """
+        cinza = self._reduzir(frame_bgr)
+        self._modelos = []
+        self._resultados = resultados
+        
+        for resultado in resultados:
+            regiao = resultado['region']
+            x, y = int(regiao['x'] * self.escala), int(regiao['y'] * self.escala)
+            w, h = int(regiao['w'] * self.escala), int(regiao['h'] * self.escala)
+            recorte = cinza[y:y + h, x:x + w]
+            self._modelos.append((recorte, x, y) if recorte.size > 0 else None)
+    
+    def rastrear(self, frame_bgr):
+        """
+        Retorna cópias dos resultados com as regiões ajustadas ao quadro atual
+        """
+        if not self._resultados:
+            return []
+        
+        cinza = self._reduzir(frame_bgr)
+        altura, largura = cinza.shape[:2]
+        rastreados = []
+        
+        for resultado, modelo in zip(self._resultados, self._modelos):
+            novo = dict(resultado)
+            if modelo is not None:
+                recorte, x, y = modelo
+                h, w = recorte.shape[:2]
+                dx, dy = int(w * self.margem), int(h * self.margem)
+                x0, y0 = max(x - dx, 0), max(y - dy, 0)
+                x1, y1 = min(x + w + dx, largura), min(y + h + dy, altura)
+                janela = cinza[y0:y1, x0:x1]
+                
+                if janela.shape[0] >= h and janela.shape[1] >= w:
+                    mapa = cv2.matchTemplate(janela, recorte, cv2.TM_CCOEFF_NORMED)
+                    _, _, _, (mx, my) = cv2.minMaxLoc(mapa)
+                    regiao = dict(resultado['region'])
+                    regiao['x'] = int((x0 + mx) / self.escala)
+                    regiao['y'] = int((y0 + my) / self.escala)
+                    novo['region'] = regiao
+            rastreados.append(novo)
+        
+        return rastreados
+
+
+def processar_imagem_webcam(fonte=0, intervalo_analise=0.2, acoes=('emotion',), cache=None):
+    """
+    Processa imagem da webcam (ou arquivo de vídeo) em tempo real
+    
+    A exibição roda na velocidade da câmera; a análise acontece em segundo
+    plano sobre o quadro mais recente e as caixas são deslocadas por
+    rastreamento leve até a próxima análise ficar pronta.
+    
+    Args:
+        fonte (int | str): Índice da webcam ou caminho de arquivo de vídeo
+        intervalo_analise (float): Intervalo mínimo (s) entre envios para análise
+        acoes (tuple): Ações do DeepFace executadas em cada análise
+        cache (CacheFacial): Cache por hash perceptual dos rostos (opcional);
+            salvo ao final se tiver caminho
+    """
+    analisador = AnalisadorFacial(cache=cache)
+    
+    cap = cv2.VideoCapture(fonte)
     if not cap.isOpened():
-        print("Erro: Webcam não disponível")
+        print(f"Erro: Fonte de vídeo não disponível ({fonte})")
         return
     
+    worker = AnalisadorAssincrono(analisador, acoes=acoes)
+    rastreador = RastreadorCaixas()
+    quadro_referencia = None
+    ultimo_envio = 0.0
+    
+    total_quadros = 0
+    inicio = time.perf_counter()
+    
     print("Pressione 'q' para sair, 's' para salvar análise")
     
     while True:
@@ -242,26 +545,29 @@ def processar_imagem_webcam():
         if not ret:
             break
         
-        # Converte para RGB
+        agora = time.perf_counter()
+        if agora - ultimo_envio >= intervalo_analise and not worker.ocupado():
+            worker.enviar(frame)
+            ultimo_envio = agora
+        
+        frame_analisado, resultados = worker.obter_resultados()
+        if frame_analisado is not None and frame_analisado is not quadro_referencia:
+            rastreador.atualizar_referencia(frame_analisado, resultados)
+            quadro_referencia = frame_analisado
+        
+        resultados = rastreador.rastrear(frame)
+        
+        # Converte para RGB e desenha os últimos resultados
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame_resultado = analisador.desenhar_deteccoes(frame_rgb, resultados)
+        frame_resultado_bgr = cv2.cvtColor(frame_resultado, cv2.COLOR_RGB2BGR)
         
-        try:
-            # Análise rápida (apenas emoção para performance)
-            resultados = DeepFace.analyze(
-                img_path=frame_rgb,
-                actions=['emotion'],
-                enforce_detection=False
-            )
-            
-            if not isinstance(resultados, list):
-                resultados = [resultados]
-            
-            # Desenha resultados
-            frame_resultado = analisador.desenhar_deteccoes(frame_rgb, resultados)
-            frame_resultado_bgr = cv2.cvtColor(frame_resultado, cv2.COLOR_RGB2BGR)
-            
-        except:
-            frame_resultado_bgr = frame
+        total_quadros += 1
+        fps_exibicao = total_quadros / max(time.perf_counter() - inicio, 1e-6)
+        cv2.putText(frame_resultado_bgr,
+                    f"Exibicao: {fps_exibicao:.1f} FPS | Analises: {worker.analises_por_segundo():.1f}/s "
+                    f"({1000 * worker.latencia_media():.0f} ms)",
+                    (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
         
         cv2.imshow('Análise Facial - Webcam', frame_resultado_bgr)
         
@@ -272,16 +578,60 @@ def processar_imagem_webcam():
             cv2.imwrite('captura_analise.jpg', frame_resultado_bgr)
             print("Captura salva!")
     
+    worker.parar()
     cap.release()
     cv2.destroyAllWindows()
+    
+    duracao = time.perf_counter() - inicio
+    print(f"\nQuadros exibidos: {total_quadros} ({total_quadros / max(duracao, 1e-6):.1f} FPS)")
+    print(f"Análises concluídas: {worker.total_analises} ({worker.analises_por_segundo():.1f}/s, "
+          f"latência média {1000 * worker.latencia_media():.0f} ms)")
+    finalizar_cache(cache)
+
+
+def finalizar_cache(cache):
+    """
+    Exibe as estatísticas do cache e o persiste em disco, se configurado
+    
+    Args:
+        cache (CacheFacial): Cache usado na execução (ou None)
+    """
+    if cache is None:
+        return
+    print(cache.resumo())
+    if cache.caminho:
+        cache.salvar()
+        print(f"Cache salvo em: {cache.caminho}")
 
 def main():
     """
     Função principal
     """
+    parser = argparse.ArgumentParser(description='Reconhecimento facial com DeepFace')
+    parser.add_argument('--video', metavar='FONTE', default=None,
+                        help='Analisa um arquivo de vídeo ou o índice de uma webcam (ex.: 0) '
+                             'em vez das imagens da pasta')
+    parser.add_argument('--cache-distancia', type=int, default=None,
+                        help='Reaproveita análises de rostos com hash perceptual a até N bits '
+                             'de distância')
+    parser.add_argument('--cache-arquivo', default=None,
+                        help='Arquivo do cache: carregado no início e salvo ao final '
+                             '(ativa o cache com distância 4 se --cache-distancia não for dado)')
+    args = parser.parse_args()
+    
+    cache = None
+    if args.cache_distancia is not None or args.cache_arquivo:
+        distancia = args.cache_distancia if args.cache_distancia is not None else 4
+        cache = CacheFacial(distancia_max=distancia, caminho=args.cache_arquivo)
+    
     print("=== Reconhecimento Facial com DeepFace ===\n")
     
-    analisador = AnalisadorFacial()
+    if args.video is not None:
+        fonte = int(args.video) if args.video.isdigit() else args.video
+        processar_imagem_webcam(fonte, cache=cache)
+        return
+    
+    analisador = AnalisadorFacial(cache=cache)
     
     # Procura imagens na pasta
     pasta_imagens = "imagens"
@@ -335,7 +685,9 @@ def main():
     # Opção webcam
     opcao = input("\nTestar com webcam? (s/n): ").lower().strip()
     if opcao == 's':
-        processar_imagem_webcam()
+        processar_imagem_webcam(cache=cache)
+    else:
+        finalizar_cache(cache)
     
     print("\nAnálise concluída!")
 